@@ -132,12 +132,14 @@ const PLURAL_MAPPING = {
     'supervisor': 'supervisors'
 };
 
-const getCatalogWrapper = (cat) => {
-    const dbKey = PLURAL_MAPPING[cat] || cat;
-    return offlineRead(`/master-data/catalogs/${cat}`, dbKey, async () => (await api.get(`/master-data/catalogs/${cat}`)).data);
+const getCatalogWrapper = (cat, includeInactive = false) => {
+    // Los listados con inactivos (pantalla de administración) van en otra clave para no mezclarlos con los activos
+    const dbKey = (PLURAL_MAPPING[cat] || cat) + (includeInactive ? '_all' : '');
+    const params = includeInactive ? { include_inactive: true } : {};
+    return offlineRead(`/master-data/catalogs/${cat}`, dbKey, async () => (await api.get(`/master-data/catalogs/${cat}`, { params })).data);
 };
 
-export const getCatalogItems = (category) => getCatalogWrapper(category);
+export const getCatalogItems = (category, includeInactive = false) => getCatalogWrapper(category, includeInactive);
 
 export const createCatalogItem = async (data) => {
     const response = await api.post('/master-data/catalogs', data);
@@ -194,6 +196,9 @@ export const getGradesByProduct = async (productId) => {
     return offlineRead(`/master-data/products/${productId}/grades`, key, async () => (await api.get(`/master-data/products/${productId}/grades`)).data);
 };
 
+// Jerarquía completa (productos -> grados -> defectos), mercados y catálogos activos en una sola solicitud
+export const getMasterDataBootstrap = async () => offlineRead('/master-data/bootstrap', 'bootstrap', async () => (await api.get('/master-data/bootstrap')).data);
+
 export const createGrade = async (data) => {
     const response = await api.post('/master-data/grades', data);
     return response.data;
@@ -274,7 +279,8 @@ export const getInspectionResults = async (inspectionId) => {
 
 export const getInspectionsList = async () => {
     const response = await api.get('/api/inspections');
-    return response.data;
+    // El backend de escritorio responde con una página { items, next_cursor }
+    return Array.isArray(response.data) ? response.data : response.data.items;
 };
 
 export const deleteInspection = async (id) => {
@@ -309,9 +315,10 @@ export const createScannerStep = async (data) => {
     return response.data;
 };
 
-export const getScannerSteps = async () => {
-    const response = await api.get('/api/scanner/steps');
-    return response.data;
+export const getScannerSteps = async (params = {}) => {
+    // Listado liviano (encabezado + conteos); el detalle con piezas se pide con getScannerStep
+    const response = await api.get('/api/scanner/steps/summary', { params });
+    return response.data.items;
 };
 
 export const getScannerStep = async (id) => {
@@ -329,6 +336,14 @@ export const getScannerStats = async (stepId) => {
     return response.data;
 };
 
+// Estadísticas en vivo del estudio (Server-Sent Events). Retorna una función para cerrar la conexión.
+// Los eventos no traen `weighted` (estadísticas ponderadas por valor): para eso usar getScannerStats.
+export const subscribeScannerStats = (stepId, onStats) => {
+    const source = new EventSource(`${api.defaults.baseURL}/api/scanner/steps/${stepId}/live`);
+    source.addEventListener('stats', (event) => onStats(JSON.parse(event.data)));
+    return () => source.close();
+};
+
 export const downloadInspectionsCsv = async (filters) => {
     try {
         const response = await api.get('/api/exports/inspections/csv', {
@@ -2,8 +2,8 @@
 import React, { useState, useEffect } from 'react';
 import { useAuth } from '../context/AuthContext';
 import {
-    getScannerSteps, createScannerStep, getScannerStep, addScannerItem, getScannerStats,
-    getProducts, getGradesByProduct, getCatalogItems, getMarkets
+    getScannerSteps, createScannerStep, getScannerStep, addScannerItem, getScannerStats, subscribeScannerStats,
+    getMasterDataBootstrap, getProducts, getGradesByProduct, getCatalogItems, getMarkets
 } from '../api';
 import {
     Plus, Search, BarChart2, CheckCircle2, AlertTriangle, XCircle,
@@ -49,12 +49,16 @@ export default function FinscanStudy() {
         loadStudies();
     }, []);
 
-    // Load Grades when Active Study is set
+    // Grades of the active study's product (included in the bootstrap payload, read per product otherwise)
     useEffect(() => {
         if (activeStudy?.product_name && products.length > 0) {
             const product = products.find(p => p.name === activeStudy.product_name);
             if (product) {
-                getGradesByProduct(product.id).then(setGrades);
+                if (product.grades) {
+                    setGrades(product.grades);
+                } else {
+                    getGradesByProduct(product.id).then(setGrades);
+                }
             }
         }
     }, [activeStudy, products]);
@@ -66,19 +70,32 @@ export default function FinscanStudy() {
         }
     }, [activeStudy, lastAdded]);
 
+    // Stats pushed by the server while the study is open (other devices adding pieces)
+    useEffect(() => {
+        if (!activeStudy?.id) return;
+        return subscribeScannerStats(activeStudy.id, setStats);
+    }, [activeStudy?.id]);
+
     const loadMasterData = async () => {
-        const [p, m, s, a, ma, sup, l] = await Promise.all([
-            getProducts(), getMarkets(), getCatalogItems('shift'),
-            getCatalogItems('area'), getCatalogItems('machine'), getCatalogItems('supervisor'),
-            getCatalogItems('length')
-        ]);
+        // Products (with grades), markets and active catalogs in a single request
+        let { products: p, markets: m, catalogs } = await getMasterDataBootstrap();
+        if (!p) {
+            // Offline with no cached bootstrap yet: the per-endpoint reads are covered by the seeded data
+            const categories = ['shift', 'area', 'machine', 'supervisor', 'length'];
+            const [items, fallbackProducts, fallbackMarkets] = await Promise.all([
+                Promise.all(categories.map(c => getCatalogItems(c))), getProducts(), getMarkets()
+            ]);
+            p = fallbackProducts;
+            m = fallbackMarkets;
+            catalogs = Object.fromEntries(categories.map((c, i) => [c, items[i]]));
+        }
         setProducts(p);
         setMarkets(m);
-        setShifts(s);
-        setAreas(a);
-        setMachines(ma);
-        setSupervisors(sup);
-        setLengths(l.sort((a, b) => parseFloat(a.name) - parseFloat(b.name)));
+        setShifts(catalogs.shift || []);
+        setAreas(catalogs.area || []);
+        setMachines(catalogs.machine || []);
+        setSupervisors(catalogs.supervisor || []);
+        setLengths((catalogs.length || []).sort((a, b) => parseFloat(a.name) - parseFloat(b.name)));
     };
 
     const loadStudies = async () => {
@@ -197,7 +214,7 @@ export default function FinscanStudy() {
                                 <div>
                                     <h3 className="text-xl font-bold text-white">{study.product_name}</h3>
                                     <div className="flex gap-4 text-sm text-slate-400 mt-2">
-                                        <span>📅 {new Date(study.date).toLocaleDateString()}</span>
+                                        <span>📅 {study.date ? new Date(study.date).toLocaleDateString() : 'Sin fecha'}</span>
                                         <span>👤 {study.responsible}</span>
                                         <span>🏭 {study.shift}</span>
                                     </div>
@@ -0,0 +1,46 @@
+"""inspection_totals
+
+Revision ID: 4e8a2c6d0f17
+Revises: 9c4d1e7f2b58
+Create Date: 2026-10-17 13:41:08.662051
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e8a2c6d0f17'
+down_revision: Union[str, Sequence[str], None] = '9c4d1e7f2b58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'inspection_totals',
+        sa.Column('inspection_id', sa.Integer(), sa.ForeignKey('inspections.id'), primary_key=True),
+        sa.Column('total_pieces', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('rejected_pieces', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('best_grade_pieces', sa.Integer(), nullable=False, server_default='0'),
+    )
+    # Poblar desde las filas existentes (mismo cálculo que services/inspection_totals.py)
+    op.execute("""
+        INSERT INTO inspection_totals (inspection_id, total_pieces, rejected_pieces, best_grade_pieces)
+        SELECT r.inspection_id,
+               COALESCE(SUM(COALESCE(r.pieces_count, 0)), 0),
+               COALESCE(SUM(CASE WHEN g.name = 'RECHAZO' THEN COALESCE(r.pieces_count, 0) ELSE 0 END), 0),
+               COALESCE(SUM(CASE WHEN g.grade_rank = 1 THEN COALESCE(r.pieces_count, 0) ELSE 0 END), 0)
+        FROM inspection_results r
+        LEFT OUTER JOIN grades g ON r.grade_id = g.id
+        WHERE r.inspection_id IS NOT NULL
+        GROUP BY r.inspection_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('inspection_totals')
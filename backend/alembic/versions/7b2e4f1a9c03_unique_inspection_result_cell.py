@@ -0,0 +1,55 @@
+"""unique_inspection_result_cell
+
+Revision ID: 7b2e4f1a9c03
+Revises: 341c590c9d66
+Create Date: 2026-10-17 09:12:41.208314
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b2e4f1a9c03'
+down_revision: Union[str, Sequence[str], None] = '341c590c9d66'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Fusionar celdas duplicadas (sumando piezas en la fila más antigua) antes de crear el índice único
+    op.execute("""
+        UPDATE inspection_results
+        SET pieces_count = (
+            SELECT SUM(r2.pieces_count) FROM inspection_results r2
+            WHERE r2.inspection_id = inspection_results.inspection_id
+              AND r2.grade_id = inspection_results.grade_id
+              AND coalesce(r2.defect_id, 0) = coalesce(inspection_results.defect_id, 0)
+        )
+        WHERE id IN (
+            SELECT MIN(id) FROM inspection_results
+            GROUP BY inspection_id, grade_id, coalesce(defect_id, 0)
+            HAVING COUNT(*) > 1
+        )
+    """)
+    op.execute("""
+        DELETE FROM inspection_results
+        WHERE id NOT IN (
+            SELECT MIN(id) FROM inspection_results
+            GROUP BY inspection_id, grade_id, coalesce(defect_id, 0)
+        )
+    """)
+    op.create_index(
+        'ux_inspection_results_cell',
+        'inspection_results',
+        ['inspection_id', 'grade_id', sa.text('coalesce(defect_id, 0)')],
+        unique=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ux_inspection_results_cell', table_name='inspection_results')
@@ -0,0 +1,41 @@
+"""inspection_list_indexes
+
+Revision ID: 9c4d1e7f2b58
+Revises: 7b2e4f1a9c03
+Create Date: 2026-10-17 11:03:27.519840
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c4d1e7f2b58'
+down_revision: Union[str, Sequence[str], None] = '7b2e4f1a9c03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_inspections_date_id', ['date', 'id']),
+    ('ix_inspections_type_date_id', ['type', 'date', 'id']),
+    ('ix_inspections_area_date_id', ['area', 'date', 'id']),
+    ('ix_inspections_machine_date_id', ['machine', 'date', 'id']),
+    ('ix_inspections_shift_date_id', ['shift', 'date', 'id']),
+    ('ix_inspections_market_date_id', ['market_id', 'date', 'id']),
+    ('ix_inspections_lot', ['lot']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, columns in INDEXES:
+        op.create_index(name, 'inspections', columns)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, _ in reversed(INDEXES):
+        op.drop_index(name, table_name='inspections')
@@ -0,0 +1,30 @@
+"""scanner_step_list_indexes
+
+Revision ID: a8d4e2f7c619
+Revises: f3c8d1a6b472
+Create Date: 2026-10-17 20:21:37.604918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8d4e2f7c619'
+down_revision: Union[str, Sequence[str], None] = 'f3c8d1a6b472'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_scanner_steps_date_id', 'scanner_steps', ['date', 'id'])
+    op.create_index('ix_scanner_steps_supervisor_date_id', 'scanner_steps', ['supervisor', 'date', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_scanner_steps_supervisor_date_id', table_name='scanner_steps')
+    op.drop_index('ix_scanner_steps_date_id', table_name='scanner_steps')
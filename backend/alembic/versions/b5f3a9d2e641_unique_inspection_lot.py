@@ -0,0 +1,44 @@
+"""unique_inspection_lot
+
+Revision ID: b5f3a9d2e641
+Revises: 4e8a2c6d0f17
+Create Date: 2026-10-17 15:02:55.187403
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5f3a9d2e641'
+down_revision: Union[str, Sequence[str], None] = '4e8a2c6d0f17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Lotes repetidos anteriores a la validación: la inspección más antigua conserva el lote,
+    # las demás quedan marcadas como '<lote>-DUP-<id>' para poder crear el índice único
+    op.execute("""
+        UPDATE inspections
+        SET lot = lot || '-DUP-' || id
+        WHERE lot <> ''
+          AND id NOT IN (SELECT MIN(id) FROM inspections WHERE lot <> '' GROUP BY lot)
+    """)
+    op.drop_index('ix_inspections_lot', table_name='inspections')
+    op.create_index(
+        'ux_inspections_lot',
+        'inspections',
+        ['lot'],
+        unique=True,
+        sqlite_where=sa.text("lot != ''")
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ux_inspections_lot', table_name='inspections')
+    op.create_index('ix_inspections_lot', 'inspections', ['lot'])
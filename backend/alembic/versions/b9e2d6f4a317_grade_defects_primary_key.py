@@ -0,0 +1,45 @@
+"""grade_defects_primary_key
+
+Revision ID: b9e2d6f4a317
+Revises: c7e5b3a1d824
+Create Date: 2026-10-17 23:48:12.530614
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9e2d6f4a317'
+down_revision: Union[str, Sequence[str], None] = 'c7e5b3a1d824'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Asociaciones repetidas o incompletas impiden la llave primaria: se conserva una por par
+    op.execute("""
+        DELETE FROM grade_defects
+        WHERE grade_id IS NULL
+           OR defect_id IS NULL
+           OR rowid NOT IN (SELECT MIN(rowid) FROM grade_defects GROUP BY grade_id, defect_id)
+    """)
+    with op.batch_alter_table('grade_defects', recreate='always') as batch_op:
+        batch_op.alter_column('grade_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.alter_column('defect_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_primary_key('pk_grade_defects', ['grade_id', 'defect_id'])
+    op.create_index('ix_grade_defects_defect_grade', 'grade_defects', ['defect_id', 'grade_id'])
+    op.create_index('ix_grades_product_id', 'grades', ['product_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_grades_product_id', table_name='grades')
+    op.drop_index('ix_grade_defects_defect_grade', table_name='grade_defects')
+    with op.batch_alter_table('grade_defects', recreate='always') as batch_op:
+        batch_op.drop_constraint('pk_grade_defects', type_='primary')
+        batch_op.alter_column('grade_id', existing_type=sa.Integer(), nullable=True)
+        batch_op.alter_column('defect_id', existing_type=sa.Integer(), nullable=True)
@@ -0,0 +1,56 @@
+"""scanner_rollups
+
+Revision ID: c7e5b3a1d824
+Revises: a8d4e2f7c619
+Create Date: 2026-10-17 21:03:12.881406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e5b3a1d824'
+down_revision: Union[str, Sequence[str], None] = 'a8d4e2f7c619'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'scanner_rollups',
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('shift', sa.String(), primary_key=True),
+        sa.Column('machine', sa.String(), primary_key=True),
+        sa.Column('product_name', sa.String(), primary_key=True),
+        sa.Column('pieces_evaluated', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('pieces_in_grade', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('pieces_over_grade', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('pieces_under_grade', sa.Integer(), nullable=False, server_default='0'),
+    )
+    op.create_index('ix_scanner_rollups_machine_day', 'scanner_rollups', ['machine', 'day'])
+    op.create_index('ix_scanner_rollups_product_day', 'scanner_rollups', ['product_name', 'day'])
+    # Poblar desde las piezas existentes (mismo cálculo que services/scanner_rollups.py)
+    op.execute("""
+        INSERT INTO scanner_rollups (day, shift, machine, product_name,
+                                     pieces_evaluated, pieces_in_grade, pieces_over_grade, pieces_under_grade)
+        SELECT date(s.date), COALESCE(s.shift, ''), COALESCE(s.machine, ''), COALESCE(s.product_name, ''),
+               COUNT(i.id),
+               COUNT(CASE WHEN i.winner = 'Match' THEN 1 END),
+               COUNT(CASE WHEN i.winner = 'Overgrade' THEN 1 END),
+               COUNT(CASE WHEN i.winner = 'Undergrade' THEN 1 END)
+        FROM scanner_items i
+        JOIN scanner_steps s ON i.step_id = s.id
+        WHERE s.date IS NOT NULL
+        GROUP BY date(s.date), COALESCE(s.shift, ''), COALESCE(s.machine, ''), COALESCE(s.product_name, '')
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_scanner_rollups_product_day', table_name='scanner_rollups')
+    op.drop_index('ix_scanner_rollups_machine_day', table_name='scanner_rollups')
+    op.drop_table('scanner_rollups')
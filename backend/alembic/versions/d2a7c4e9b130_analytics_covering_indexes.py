@@ -0,0 +1,38 @@
+"""analytics_covering_indexes
+
+Revision ID: d2a7c4e9b130
+Revises: b5f3a9d2e641
+Create Date: 2026-10-17 17:25:40.903118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a7c4e9b130'
+down_revision: Union[str, Sequence[str], None] = 'b5f3a9d2e641'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_inspections_analytics',
+        'inspections',
+        ['production_date', 'machine', 'shift', 'area', 'type', 'market_id', 'product_name']
+    )
+    op.create_index(
+        'ix_inspection_results_analytics',
+        'inspection_results',
+        ['inspection_id', 'defect_id', 'grade_id', 'pieces_count']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_inspection_results_analytics', table_name='inspection_results')
+    op.drop_index('ix_inspections_analytics', table_name='inspections')
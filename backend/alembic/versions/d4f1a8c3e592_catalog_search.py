@@ -0,0 +1,52 @@
+"""catalog_search
+
+Revision ID: d4f1a8c3e592
+Revises: b9e2d6f4a317
+Create Date: 2026-10-18 00:37:45.108273
+
+"""
+from typing import Sequence, Union
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f1a8c3e592'
+down_revision: Union[str, Sequence[str], None] = 'b9e2d6f4a317'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _normalize(name) -> str:
+    # Copia de models.normalize_catalog_name: la migración no depende del código de la aplicación
+    text = unicodedata.normalize("NFKD", str(name or ""))
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(text.casefold().split())
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('catalog_items') as batch_op:
+        batch_op.add_column(sa.Column('normalized_name', sa.String(), nullable=True))
+
+    # SQLite no quita tildes: el nombre normalizado se calcula en Python
+    bind = op.get_bind()
+    rows = [
+        {"item_id": item_id, "normalized_name": _normalize(name)}
+        for item_id, name in bind.execute(sa.text("SELECT id, name FROM catalog_items"))
+    ]
+    if rows:
+        bind.execute(sa.text("UPDATE catalog_items SET normalized_name = :normalized_name WHERE id = :item_id"), rows)
+
+    op.create_index('ix_catalog_items_category_active_name', 'catalog_items', ['category', 'active', 'name'])
+    op.create_index('ix_catalog_items_category_active_normalized', 'catalog_items', ['category', 'active', 'normalized_name'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_catalog_items_category_active_normalized', table_name='catalog_items')
+    op.drop_index('ix_catalog_items_category_active_name', table_name='catalog_items')
+    with op.batch_alter_table('catalog_items') as batch_op:
+        batch_op.drop_column('normalized_name')
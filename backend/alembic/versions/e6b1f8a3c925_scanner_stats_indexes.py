@@ -0,0 +1,30 @@
+"""scanner_stats_indexes
+
+Revision ID: e6b1f8a3c925
+Revises: d2a7c4e9b130
+Create Date: 2026-10-17 18:12:09.437552
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6b1f8a3c925'
+down_revision: Union[str, Sequence[str], None] = 'd2a7c4e9b130'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_scanner_items_step_winner', 'scanner_items', ['step_id', 'winner'])
+    op.create_index('ix_scanner_steps_machine_date', 'scanner_steps', ['machine', 'date'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_scanner_steps_machine_date', table_name='scanner_steps')
+    op.drop_index('ix_scanner_items_step_winner', table_name='scanner_items')
@@ -0,0 +1,40 @@
+"""grade_prices
+
+Revision ID: f3c8d1a6b472
+Revises: e6b1f8a3c925
+Create Date: 2026-10-17 19:04:51.218734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3c8d1a6b472'
+down_revision: Union[str, Sequence[str], None] = 'e6b1f8a3c925'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('grade_prices',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('grade_id', sa.Integer(), nullable=False),
+    sa.Column('market_id', sa.Integer(), nullable=False),
+    sa.Column('price', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['grade_id'], ['grades.id'], ),
+    sa.ForeignKeyConstraint(['market_id'], ['markets.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_grade_prices_id'), 'grade_prices', ['id'], unique=False)
+    op.create_index('ux_grade_prices_grade_market', 'grade_prices', ['grade_id', 'market_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ux_grade_prices_grade_market', table_name='grade_prices')
+    op.drop_index(op.f('ix_grade_prices_id'), table_name='grade_prices')
+    op.drop_table('grade_prices')
@@ -0,0 +1,37 @@
+import sys
+import os
+from datetime import date
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import database
+from services.archive import run_archive, DEFAULT_CHUNK_SIZE
+from config import settings
+
+# Uso:
+#   python archive_old_data.py 2024-01-01 [--chunk 200]
+# Mueve inspecciones y estudios de escáner anteriores a la fecha al archivo anual (ARCHIVE_DIR).
+
+def main(argv):
+    if not argv:
+        print("Uso: python archive_old_data.py <AAAA-MM-DD> [--chunk N]")
+        return 2
+
+    cutoff = date.fromisoformat(argv[0])
+    chunk_size = int(argv[argv.index("--chunk") + 1]) if "--chunk" in argv else DEFAULT_CHUNK_SIZE
+
+    db = database.SessionLocal()
+    try:
+        report = run_archive(db, cutoff, chunk_size=chunk_size)
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        return 2
+    finally:
+        db.close()
+
+    print(f"Inspecciones archivadas: {report['inspections']}")
+    print(f"Estudios de escáner archivados: {report['scanner_steps']}")
+    print(f"Años: {', '.join(str(y) for y in report['years']) or '-'} en {settings.ARCHIVE_DIR}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
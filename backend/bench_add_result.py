@@ -0,0 +1,114 @@
+import sys
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+# Base de datos temporal para no tocar grading.db
+DB_FILE = os.path.join(tempfile.mkdtemp(), "bench_grading.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_FILE}"
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import database, models
+from routers.registry import add_inspection_result
+from services import inspection_totals
+import schemas
+
+CLIENTS = int(os.getenv("BENCH_CLIENTS", 8))
+CLICKS_PER_CLIENT = int(os.getenv("BENCH_CLICKS", 200))
+
+
+def setup():
+    models.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    try:
+        market = models.Market(name="Bench")
+        product = models.Product(name="Bench")
+        db.add_all([market, product])
+        db.flush()
+        grade = models.Grade(product_id=product.id, name="Bench", grade_rank=1)
+        db.add(grade)
+        db.flush()
+        inspection = models.Inspection(
+            production_date=datetime.now().date(), shift="A", journey="A", supervisor="Bench",
+            responsible="Bench", area="Bench", machine="Bench", origin="Bench", lot="BENCH-001",
+            market_id=market.id, product_name="Bench", state="Bench", termination="Bench",
+            thickness="1", width="1", length="1"
+        )
+        db.add(inspection)
+        db.commit()
+        return inspection.id, grade.id
+    finally:
+        db.close()
+
+
+def legacy_click(inspection_id, result):
+    # Lectura-modificación-escritura en Python (comportamiento anterior), con la misma actualización de
+    # totales que hace el endpoint para que ambas cargas de trabajo escriban lo mismo
+    db = database.SessionLocal()
+    try:
+        existing = db.query(models.InspectionResult).filter(
+            models.InspectionResult.inspection_id == inspection_id,
+            models.InspectionResult.grade_id == result.grade_id,
+            models.InspectionResult.defect_id == None
+        ).first()
+        if existing:
+            existing.pieces_count += result.pieces_count
+        else:
+            db.add(models.InspectionResult(inspection_id=inspection_id, **result.model_dump()))
+        inspection_totals.apply_result_delta(db, inspection_id, result.grade_id, result.pieces_count)
+        db.commit()
+    finally:
+        db.close()
+
+
+def atomic_click(inspection_id, result):
+    db = database.SessionLocal()
+    try:
+        add_inspection_result(inspection_id, result, db)
+    finally:
+        db.close()
+
+
+def run(name, click, inspection_id, grade_id):
+    db = database.SessionLocal()
+    db.query(models.InspectionResult).delete()
+    db.query(models.InspectionTotals).delete()
+    db.commit()
+    db.close()
+
+    result = schemas.InspectionResultCreate(grade_id=grade_id, defect_id=None, pieces_count=1)
+    errors = []
+
+    def worker():
+        for _ in range(CLICKS_PER_CLIENT):
+            try:
+                click(inspection_id, result)
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(CLIENTS)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    db = database.SessionLocal()
+    total = sum(r.pieces_count for r in db.query(models.InspectionResult).all())
+    db.close()
+
+    expected = CLIENTS * CLICKS_PER_CLIENT
+    # clics/s es el rendimiento bruto; perdidos son incrementos que se pisaron entre clientes
+    return (f"{name:<8} clics={expected} contados={total} perdidos={expected - total} "
+            f"errores={len(errors)} tiempo={elapsed:.2f}s clics/s={expected / elapsed:.0f}")
+
+
+if __name__ == "__main__":
+    inspection_id, grade_id = setup()
+    print(f"{CLIENTS} clientes x {CLICKS_PER_CLIENT} clics sobre la misma celda ({DB_FILE})")
+    for name, click in (("legacy", legacy_click), ("atomic", atomic_click)):
+        print(run(name, click, inspection_id, grade_id))
@@ -13,6 +13,9 @@ class Settings:
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./grading.db")
 
+    # Archivo histórico (una base SQLite por año)
+    ARCHIVE_DIR: str = os.getenv("ARCHIVE_DIR", "./archive")
+
     # CORS
     CORS_ORIGINS: list = os.getenv("CORS_ORIGINS", "*").split(",")
 
@@ -1,11 +1,14 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Date, DateTime, Float, Table
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Date, DateTime, Float, Table, Index, func, literal_column
 from sqlalchemy.orm import relationship
 from datetime import datetime
+import unicodedata
 from .database import Base
 # Tabla de asociación para Grado-Defecto
 grade_defects = Table('grade_defects', Base.metadata,
-    Column('grade_id', Integer, ForeignKey('grades.id')),
-    Column('defect_id', Integer, ForeignKey('defects.id'))
+    Column('grade_id', Integer, ForeignKey('grades.id'), primary_key=True),
+    Column('defect_id', Integer, ForeignKey('defects.id'), primary_key=True),
+    # La llave primaria cubre grado -> defectos; este índice cubre defecto -> grados
+    Index('ix_grade_defects_defect_grade', 'defect_id', 'grade_id')
 )
 
 class Product(Base):
@@ -14,7 +17,8 @@ class Product(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, index=True)
     
-    grades = relationship("Grade", back_populates="product")
+    # Del mejor al peor grado (grade_rank 1 es el mejor)
+    grades = relationship("Grade", back_populates="product", order_by="(Grade.grade_rank, Grade.id)")
 
 class Market(Base):
     __tablename__ = "markets"
@@ -29,13 +33,35 @@ class Grade(Base):
     __tablename__ = "grades"
     
     id = Column(Integer, primary_key=True, index=True)
-    product_id = Column(Integer, ForeignKey("products.id")) # Cambiado de market_id a product_id
+    product_id = Column(Integer, ForeignKey("products.id"), index=True) # Cambiado de market_id a product_id
     name = Column(String)
     grade_rank = Column(Integer)  # 1 es mejor, mayor es peor
     
     product = relationship("Product", back_populates="grades")
     defects = relationship("Defect", secondary=grade_defects, back_populates="grades")
 
+class GradePrice(Base):
+    __tablename__ = "grade_prices"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    grade_id = Column(Integer, ForeignKey("grades.id"), nullable=False)
+    market_id = Column(Integer, ForeignKey("markets.id"), nullable=False)
+    price = Column(Float, nullable=False) # Precio por m³ del grado en el mercado
+    
+    grade = relationship("Grade")
+    market = relationship("Market")
+
+Index("ux_grade_prices_grade_market", GradePrice.grade_id, GradePrice.market_id, unique=True)
+
+def normalize_catalog_name(name) -> str:
+    """Nombre sin tildes, en minúsculas y con espacios simples (búsqueda por prefijo en catálogos)."""
+    text = unicodedata.normalize("NFKD", str(name or ""))
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(text.casefold().split())
+
+def _default_normalized_name(context):
+    return normalize_catalog_name(context.get_current_parameters().get("name"))
+
 class CatalogItem(Base):
     __tablename__ = "catalog_items"
     
@@ -43,6 +69,12 @@ class CatalogItem(Base):
     category = Column(String, index=True) # ej., "Área", "Máquina", "Producto", "Turno"
     name = Column(String)
     active = Column(Boolean, default=True)
+    # Se calcula al insertar (también en inserciones masivas); ver normalize_catalog_name
+    normalized_name = Column(String, default=_default_normalized_name)
+
+# Listas activas ordenadas por nombre y autocompletado por prefijo normalizado
+Index("ix_catalog_items_category_active_name", CatalogItem.category, CatalogItem.active, CatalogItem.name)
+Index("ix_catalog_items_category_active_normalized", CatalogItem.category, CatalogItem.active, CatalogItem.normalized_name)
 
 class Defect(Base):
     __tablename__ = "defects"
@@ -90,6 +122,23 @@ class Inspection(Base):
         "polymorphic_identity": "inspection",
     }
 
+# Índices compuestos para el listado paginado por (fecha, id) con filtros del servidor
+Index("ix_inspections_date_id", Inspection.date, Inspection.id)
+Index("ix_inspections_type_date_id", Inspection.type, Inspection.date, Inspection.id)
+Index("ix_inspections_area_date_id", Inspection.area, Inspection.date, Inspection.id)
+Index("ix_inspections_machine_date_id", Inspection.machine, Inspection.date, Inspection.id)
+Index("ix_inspections_shift_date_id", Inspection.shift, Inspection.date, Inspection.id)
+Index("ix_inspections_market_date_id", Inspection.market_id, Inspection.date, Inspection.id)
+# Lote único entre inspecciones; los lotes vacíos quedan fuera del índice (se permiten repetidos)
+Index("ux_inspections_lot", Inspection.lot, unique=True, sqlite_where=Inspection.lot != "")
+
+# Índice cubridor para analítica: rango de fecha de producción y columnas de filtro (id va implícito)
+Index(
+    "ix_inspections_analytics",
+    Inspection.production_date, Inspection.machine, Inspection.shift, Inspection.area,
+    Inspection.type, Inspection.market_id, Inspection.product_name
+)
+
 class FinishedProductInspection(Inspection):
     __mapper_args__ = {
         "polymorphic_identity": "finished_product",
@@ -120,8 +169,40 @@ class InspectionResult(Base):
     grade = relationship("Grade")
     defect = relationship("Defect")
 
+# Una celda (grado, defecto) por inspección. defect_id NULL ("Grado Base") se normaliza a 0
+# porque SQLite trata los NULL como distintos dentro de un índice único.
+INSPECTION_RESULT_CELL = (
+    InspectionResult.inspection_id,
+    InspectionResult.grade_id,
+    func.coalesce(InspectionResult.defect_id, literal_column("0")),
+)
+Index("ux_inspection_results_cell", *INSPECTION_RESULT_CELL, unique=True)
+# Índice cubridor para analítica: agrega por defecto o grado sin leer la tabla
+Index(
+    "ix_inspection_results_analytics",
+    InspectionResult.inspection_id, InspectionResult.defect_id, InspectionResult.grade_id, InspectionResult.pieces_count
+)
+
 # Extender Inspección para enlazar resultados
 Inspection.results = relationship("InspectionResult", back_populates="inspection")
+class InspectionTotals(Base):
+    """Totales desnormalizados por inspección, mantenidos en la misma transacción que inspection_results."""
+    __tablename__ = "inspection_totals"
+
+    inspection_id = Column(Integer, ForeignKey("inspections.id"), primary_key=True)
+    total_pieces = Column(Integer, nullable=False, default=0)
+    rejected_pieces = Column(Integer, nullable=False, default=0)
+    best_grade_pieces = Column(Integer, nullable=False, default=0)
+
+    @property
+    def rejection_percentage(self):
+        return (self.rejected_pieces / self.total_pieces * 100) if self.total_pieces else 0.0
+
+    @property
+    def best_grade_percentage(self):
+        return (self.best_grade_pieces / self.total_pieces * 100) if self.total_pieces else 0.0
+
+Inspection.totals = relationship("InspectionTotals", uselist=False, viewonly=True)
 class ScannerStep(Base):
     __tablename__ = "scanner_steps"
     
@@ -173,6 +254,33 @@ class ScannerItem(Base):
     scanner_grade = relationship("Grade", foreign_keys=[scanner_grade_id])
     optimized_grade = relationship("Grade", foreign_keys=[optimized_grade_id])
 
+# Conteos por estado de un estudio sin leer la tabla; estudios por máquina y fecha
+Index("ix_scanner_items_step_winner", ScannerItem.step_id, ScannerItem.winner)
+Index("ix_scanner_steps_machine_date", ScannerStep.machine, ScannerStep.date)
+# Listado de estudios paginado por (date, id), con o sin filtro de supervisor
+Index("ix_scanner_steps_date_id", ScannerStep.date, ScannerStep.id)
+Index("ix_scanner_steps_supervisor_date_id", ScannerStep.supervisor, ScannerStep.date, ScannerStep.id)
+
+class ScannerRollup(Base):
+    """Conteos de precisión del escáner por día x turno x máquina x producto, para tendencias.
+
+    Se actualiza en la misma transacción que las piezas; los campos vacíos se guardan como ''.
+    """
+    __tablename__ = "scanner_rollups"
+
+    day = Column(Date, primary_key=True)
+    shift = Column(String, primary_key=True, default="")
+    machine = Column(String, primary_key=True, default="")
+    product_name = Column(String, primary_key=True, default="")
+    pieces_evaluated = Column(Integer, nullable=False, default=0)
+    pieces_in_grade = Column(Integer, nullable=False, default=0)
+    pieces_over_grade = Column(Integer, nullable=False, default=0)
+    pieces_under_grade = Column(Integer, nullable=False, default=0)
+
+# Series por máquina (o producto) en un rango de días
+Index("ix_scanner_rollups_machine_day", ScannerRollup.machine, ScannerRollup.day)
+Index("ix_scanner_rollups_product_day", ScannerRollup.product_name, ScannerRollup.day)
+
 class User(Base):
     __tablename__ = "users"
     
@@ -0,0 +1,54 @@
+import sys
+import os
+import csv
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import database, models
+from services.inspection_import import import_inspections, DEFAULT_CHUNK_SIZE
+
+# Uso:
+#   python import_inspections.py historial.csv [--chunk 5000] [--errors errores.csv]
+# El archivo (CSV o XLSX) lleva una fila por celda de resultado: columnas de la inspección
+# (date, production_date, shift, ..., lot, type) más grade_id, defect_id y pieces_count.
+
+def main(argv):
+    if not argv:
+        print("Uso: python import_inspections.py <archivo.csv|xlsx> [--chunk N] [--errors salida.csv]")
+        return 2
+
+    path = argv[0]
+    chunk_size = int(argv[argv.index("--chunk") + 1]) if "--chunk" in argv else DEFAULT_CHUNK_SIZE
+    errors_path = argv[argv.index("--errors") + 1] if "--errors" in argv else None
+
+    models.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    start = time.perf_counter()
+    try:
+        with open(path, "rb") as f:
+            report = import_inspections(db, f, path, chunk_size=chunk_size)
+    finally:
+        db.close()
+    elapsed = time.perf_counter() - start
+
+    print(f"Filas leídas: {report['rows_read']}")
+    print(f"Inspecciones creadas: {report['inspections_created']}")
+    print(f"Resultados escritos: {report['results_written']}")
+    print(f"Errores: {report['error_count']}")
+    print(f"Tiempo: {elapsed:.1f}s ({report['rows_read'] / elapsed * 60 if elapsed else 0:.0f} filas/min)")
+
+    if errors_path and report["errors"]:
+        with open(errors_path, "w", newline="", encoding="utf-8") as out:
+            writer = csv.writer(out)
+            writer.writerow(["row", "error"])
+            for e in report["errors"]:
+                writer.writerow([e["row"], e["error"]])
+        print(f"Detalle de errores en {errors_path}")
+    else:
+        for e in report["errors"][:20]:
+            print(f"  Fila {e['row']}: {e['error']}")
+
+    return 0 if report["error_count"] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
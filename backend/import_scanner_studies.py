@@ -0,0 +1,41 @@
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import database, models
+from services.scanner_excel import load_directory
+
+# Uso:
+#   python import_scanner_studies.py <directorio> [--workers 4]
+# Carga las planillas históricas "ÍNDICE DE CLASIFICACIÓN" (.xlsx) del directorio como estudios de escáner.
+# Las planillas se leen en paralelo; los estudios ya cargados (misma fecha, supervisor y producto) se omiten.
+
+def main(argv):
+    if not argv:
+        print("Uso: python import_scanner_studies.py <directorio> [--workers N]")
+        return 2
+
+    directory = argv[0]
+    workers = int(argv[argv.index("--workers") + 1]) if "--workers" in argv else None
+
+    models.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    start = time.perf_counter()
+    try:
+        report = load_directory(db, directory, workers=workers)
+    finally:
+        db.close()
+    elapsed = time.perf_counter() - start
+
+    print(f"Planillas: {report['workbooks']}")
+    print(f"Estudios creados: {report['created']} (omitidos por ya existir: {report['skipped']})")
+    print(f"Piezas: {report['items']}")
+    print(f"Tiempo: {elapsed:.1f}s")
+    for failure in report["failed"][:50]:
+        print(f"  {failure['path']}: {failure['error']}")
+
+    return 0 if not report["failed"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
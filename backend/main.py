@@ -1,13 +1,14 @@
 from fastapi import FastAPI, Depends
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
 import os
 
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from database import models, database
-from routers import registry, auth, users, master_data, scanner, exports
+from routers import registry, auth, users, master_data, scanner, exports, archive, analytics
 from config import settings
+import metrics
 from loguru import logger
 import sys
 
@@ -20,6 +21,10 @@ models.Base.metadata.create_all(bind=database.engine)
 
 app = FastAPI(title="Grading App Backend")
 
+# Métricas por ruta: latencia, sentencias SQL y tiempo de BD por request
+metrics.instrument_engine(database.engine)
+app.add_middleware(metrics.MetricsMiddleware)
+
 # Configuración CORS
 app.add_middleware(
     CORSMiddleware,
@@ -35,6 +40,12 @@ app.include_router(registry.router)
 app.include_router(master_data.router)
 app.include_router(scanner.router)
 app.include_router(exports.router)
+app.include_router(archive.router)
+app.include_router(analytics.router)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def read_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
 
 
 import sys
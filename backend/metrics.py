@@ -0,0 +1,153 @@
+import threading
+import time
+from contextvars import ContextVar
+from sqlalchemy import event
+
+# Métricas por ruta (plantilla, ej. /api/inspections/{inspection_id}) en formato de texto Prometheus.
+# Sin dependencias externas: histogramas acumulativos en memoria protegidos por un lock.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class RequestStats:
+    __slots__ = ("statements", "db_time")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_time = 0.0
+
+
+# Estadísticas del request en curso. El objeto es mutable para que los hilos del threadpool
+# (donde corren los endpoints síncronos) actualicen el mismo contador que ve el middleware.
+current_request = ContextVar("current_request", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = {}       # (method, route) -> Histogram
+        self.statements = {}    # (method, route) -> Histogram
+        self.requests = {}      # (method, route, status) -> int
+        self.db_time = {}       # (method, route) -> float
+        self.db_statements_outside_requests = 0
+
+    def record_request(self, method, route, status, duration, stats):
+        key = (method, route)
+        with self.lock:
+            self.latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(duration)
+            self.statements.setdefault(key, Histogram(STATEMENT_BUCKETS)).observe(stats.statements)
+            self.db_time[key] = self.db_time.get(key, 0.0) + stats.db_time
+            status_key = (method, route, str(status))
+            self.requests[status_key] = self.requests.get(status_key, 0) + 1
+
+    def record_orphan_statement(self):
+        with self.lock:
+            self.db_statements_outside_requests += 1
+
+    def render(self):
+        lines = []
+        with self.lock:
+            lines.append("# HELP http_requests_total Requests handled, by route template and status.")
+            lines.append("# TYPE http_requests_total counter")
+            for (method, route, status), value in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{{method="{method}",route="{_escape(route)}",status="{status}"}} {value}')
+
+            _render_histogram(lines, "http_request_duration_seconds",
+                              "Request latency in seconds, by route template.", self.latency)
+            _render_histogram(lines, "db_statements_per_request",
+                              "SQL statements executed per request, by route template.", self.statements)
+
+            lines.append("# HELP db_time_seconds_total Time spent executing SQL, by route template.")
+            lines.append("# TYPE db_time_seconds_total counter")
+            for (method, route), value in sorted(self.db_time.items()):
+                lines.append(f'db_time_seconds_total{{method="{method}",route="{_escape(route)}"}} {value:.6f}')
+
+            lines.append("# HELP db_statements_outside_requests_total SQL statements executed outside any request.")
+            lines.append("# TYPE db_statements_outside_requests_total counter")
+            lines.append(f"db_statements_outside_requests_total {self.db_statements_outside_requests}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _render_histogram(lines, name, help_text, histograms):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for (method, route), hist in sorted(histograms.items()):
+        labels = f'method="{method}",route="{_escape(route)}"'
+        for bound, count in zip(hist.buckets, hist.counts):
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {hist.count}')
+        lines.append(f"{name}_sum{{{labels}}} {hist.sum:.6f}")
+        lines.append(f"{name}_count{{{labels}}} {hist.count}")
+
+
+registry = MetricsRegistry()
+
+
+def instrument_engine(engine):
+    """Cuenta sentencias y tiempo de BD del request en curso mediante eventos del engine."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+        stats = current_request.get()
+        if stats is None:
+            registry.record_orphan_statement()
+            return
+        stats.statements += 1
+        stats.db_time += elapsed
+
+
+class MetricsMiddleware:
+    """Middleware ASGI: mide latencia y consultas por request, agrupando por plantilla de ruta."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            current_request.reset(token)
+            route = scope.get("route")
+            # Sin ruta resuelta (404 del router) se agrupa para no crear una serie por URL
+            route_path = getattr(route, "path", None) or "<unmatched>"
+            registry.record_request(scope["method"], route_path, status["code"], duration, stats)
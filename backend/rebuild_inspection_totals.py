@@ -0,0 +1,33 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import database, models
+from services.inspection_totals import rebuild_all_totals, find_totals_mismatches
+
+# Uso:
+#   python rebuild_inspection_totals.py          -> reconstruye inspection_totals y verifica
+#   python rebuild_inspection_totals.py --check  -> solo verifica contra inspection_results
+
+def main(check_only=False):
+    models.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    try:
+        if not check_only:
+            written = rebuild_all_totals(db)
+            print(f"inspection_totals reconstruida: {written} inspecciones")
+
+        mismatches = find_totals_mismatches(db)
+        if not mismatches:
+            print("OK: inspection_totals coincide con inspection_results")
+            return 0
+
+        print(f"ERROR: {len(mismatches)} inspecciones no coinciden (total, rechazo, mejor grado)")
+        for inspection_id, stored, expected in mismatches[:50]:
+            print(f"  Insp {inspection_id}: almacenado={stored} esperado={expected}")
+        return 1
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(main(check_only="--check" in sys.argv))
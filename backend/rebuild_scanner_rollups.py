@@ -0,0 +1,35 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import database, models
+from services.scanner_rollups import rebuild_all_rollups, find_rollup_mismatches
+
+# Uso:
+#   python rebuild_scanner_rollups.py          -> reconstruye scanner_rollups y verifica
+#   python rebuild_scanner_rollups.py --check  -> solo verifica contra scanner_items
+# Solo se reconstruyen y verifican los días con estudios en la base activa; los días ya movidos al
+# archivo anual conservan sus filas de rollup.
+
+def main(check_only=False):
+    models.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    try:
+        if not check_only:
+            written = rebuild_all_rollups(db)
+            print(f"scanner_rollups reconstruida: {written} filas (día x turno x máquina x producto)")
+
+        mismatches = find_rollup_mismatches(db)
+        if not mismatches:
+            print("OK: scanner_rollups coincide con scanner_items")
+            return 0
+
+        print(f"ERROR: {len(mismatches)} llaves no coinciden (evaluadas, en grado, sobre grado, bajo grado)")
+        for key, stored, expected in mismatches[:50]:
+            print(f"  {' / '.join(key)}: almacenado={stored} esperado={expected}")
+        return 1
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(main(check_only="--check" in sys.argv))
@@ -0,0 +1,122 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from typing import Optional
+from datetime import date
+from database import database, models
+import schemas
+
+router = APIRouter(
+    prefix="/api/analytics",
+    tags=["Analytics"],
+)
+
+class AnalyticsFilters:
+    """Filtros comunes sobre inspections; respaldados por ix_inspections_analytics."""
+
+    def __init__(
+        self,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        area: Optional[str] = None,
+        machine: Optional[str] = None,
+        shift: Optional[str] = None,
+        product_name: Optional[str] = None,
+        market_id: Optional[int] = None,
+        type: Optional[str] = None,
+    ):
+        self.date_from = date_from
+        self.date_to = date_to
+        self.area = area
+        self.machine = machine
+        self.shift = shift
+        self.product_name = product_name
+        self.market_id = market_id
+        self.type = type
+
+    def apply(self, query):
+        Inspection = models.Inspection
+        if self.date_from:
+            query = query.filter(Inspection.production_date >= self.date_from)
+        if self.date_to:
+            query = query.filter(Inspection.production_date <= self.date_to)
+        if self.area:
+            query = query.filter(Inspection.area == self.area)
+        if self.machine:
+            query = query.filter(Inspection.machine == self.machine)
+        if self.shift:
+            query = query.filter(Inspection.shift == self.shift)
+        if self.product_name:
+            query = query.filter(Inspection.product_name == self.product_name)
+        if self.market_id is not None:
+            query = query.filter(Inspection.market_id == self.market_id)
+        if self.type and self.type != 'all':
+            query = query.filter(Inspection.type == self.type)
+        return query
+
+
+def _results_query(db: Session, filters: AnalyticsFilters, *columns):
+    query = db.query(*columns).select_from(models.InspectionResult).join(
+        models.Inspection, models.InspectionResult.inspection_id == models.Inspection.id
+    )
+    return filters.apply(query)
+
+
+def _percentage(count, total):
+    return (count / total * 100) if total else 0.0
+
+
+@router.get("/defects", response_model=schemas.DefectParetoResponse)
+def get_defect_pareto(limit: int = 20, filters: AnalyticsFilters = Depends(), db: Session = Depends(database.get_db)):
+    pieces = func.sum(models.InspectionResult.pieces_count)
+
+    # Una sola pasada sobre el índice cubridor: el grupo sin defecto (NULL) aporta al total de piezas;
+    # los nombres se unen después del GROUP BY
+    by_defect = _results_query(
+        db, filters, models.InspectionResult.defect_id.label("defect_id"), pieces.label("pieces")
+    ).group_by(models.InspectionResult.defect_id).subquery()
+
+    all_rows = db.query(by_defect.c.defect_id, models.Defect.name, by_defect.c.pieces).outerjoin(
+        models.Defect, models.Defect.id == by_defect.c.defect_id
+    ).order_by(by_defect.c.pieces.desc()).all()
+
+    total_pieces = sum(count or 0 for _, _, count in all_rows)
+    rows = [row for row in all_rows if row[0] is not None and row[1] is not None]
+    defect_pieces = sum(count or 0 for _, _, count in rows)
+    cumulative = 0
+    items = []
+    for defect_id, name, count in rows[:max(1, min(limit, 200))]:
+        count = count or 0
+        cumulative += count
+        items.append({
+            "defect_id": defect_id,
+            "name": name,
+            "count": count,
+            "percentage": _percentage(count, total_pieces),
+            "share_of_defects": _percentage(count, defect_pieces),
+            "cumulative_percentage": _percentage(cumulative, defect_pieces),
+        })
+
+    return {"total_pieces": total_pieces, "defect_pieces": defect_pieces, "items": items}
+
+
+@router.get("/grades", response_model=schemas.GradeDistributionResponse)
+def get_grade_distribution(filters: AnalyticsFilters = Depends(), db: Session = Depends(database.get_db)):
+    pieces = func.sum(models.InspectionResult.pieces_count)
+
+    by_grade = _results_query(
+        db, filters, models.InspectionResult.grade_id.label("grade_id"), pieces.label("pieces")
+    ).group_by(models.InspectionResult.grade_id).subquery()
+
+    rows = db.query(by_grade.c.grade_id, models.Grade.name, models.Grade.grade_rank, by_grade.c.pieces).join(
+        models.Grade, models.Grade.id == by_grade.c.grade_id
+    ).order_by(models.Grade.grade_rank, models.Grade.name).all()
+
+    total_pieces = sum(count or 0 for _, _, _, count in rows)
+    return {
+        "total_pieces": total_pieces,
+        "items": [
+            {"grade_id": grade_id, "name": name, "grade_rank": rank, "count": count or 0, "percentage": _percentage(count or 0, total_pieces)}
+            for grade_id, name, rank, count in rows
+        ],
+    }
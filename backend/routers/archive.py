@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from datetime import date
+from database import database
+from routers.auth import get_current_admin_user
+from services import archive
+
+router = APIRouter(
+    prefix="/api/archive",
+    tags=["Archive"],
+)
+
+@router.post("/run")
+def run_archive(cutoff: date, chunk_size: int = archive.DEFAULT_CHUNK_SIZE, db: Session = Depends(database.get_db), current_user = Depends(get_current_admin_user)):
+    """
+    Mueve inspecciones y estudios de escáner con fecha anterior a `cutoff` al archivo anual.
+    Los datos archivados siguen disponibles (solo lectura) con include_archive=true en /api/exports/inspections/csv,
+    /api/exports/inspection-results/csv y /api/exports/scanner-items/csv
+    """
+    if cutoff >= date.today():
+        raise HTTPException(status_code=400, detail="La fecha de corte debe ser anterior a hoy")
+    chunk_size = max(1, min(chunk_size, 5000))
+    try:
+        report = archive.run_archive(db, cutoff, chunk_size=chunk_size)
+    except Exception as e:
+        db.rollback()
+        print(f"ERROR archiving data: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"status": "success", "cutoff": cutoff, **report}
+
+@router.get("/years")
+def get_archive_years(current_user = Depends(get_current_admin_user)):
+    return {"years": archive.archive_years()}
@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import StreamingResponse
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from database import database, models
 from routers.auth import get_current_active_user
+from services import archive
 import csv
 import io
 from datetime import datetime, date
@@ -26,6 +28,7 @@ def export_inspections_csv(
     start_date: str = None, 
     end_date: str = None, 
     type: str = None, 
+    include_archive: bool = False,
     db: Session = Depends(database.get_db)
 ):
     query = db.query(models.Inspection)
@@ -60,6 +63,14 @@ def export_inspections_csv(
         output.seek(0)
         output.truncate(0)
         
+        # Las inspecciones archivadas (más antiguas) se leen en solo lectura desde los archivos anuales
+        if include_archive:
+            for i in archive.iter_archived_inspections(start_date, end_date, type):
+                writer.writerow(mapper(i))
+                yield output.getvalue()
+                output.seek(0)
+                output.truncate(0)
+
         for i in inspections:
             writer.writerow(mapper(i))
             yield output.getvalue()
@@ -73,15 +84,128 @@ def export_inspections_csv(
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
 
+def stream_csv_rows(headers, row_groups):
+    """Genera el CSV fila por fila: primero el encabezado, luego cada fila de cada iterable de `row_groups`."""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(headers)
+    yield output.getvalue()
+    output.seek(0)
+    output.truncate(0)
+    for rows in row_groups:
+        for row in rows:
+            writer.writerow(row)
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate(0)
+
+def csv_response(rows, filename_prefix):
+    filename = f"{filename_prefix}_{datetime.now().strftime('%Y%m%d_%H%M')}.csv"
+    return StreamingResponse(
+        rows,
+        media_type="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+@router.get("/inspection-results/csv")
+def export_inspection_results_csv(
+    start_date: str = None,
+    end_date: str = None,
+    type: str = None,
+    include_archive: bool = False,
+    db: Session = Depends(database.get_db)
+):
+    """Celdas de resultados (inspección x grado x defecto) con los datos de su inspección."""
+    query = db.query(
+        models.InspectionResult, models.Inspection.date, models.Inspection.type,
+        models.Inspection.product_name, models.Inspection.lot
+    ).join(models.Inspection, models.InspectionResult.inspection_id == models.Inspection.id)
+    if start_date:
+        query = query.filter(models.Inspection.date >= start_date)
+    if end_date:
+        query = query.filter(models.Inspection.date <= end_date)
+    if type and type != 'all':
+        query = query.filter(models.Inspection.type == type)
+    query = query.order_by(models.Inspection.date, models.Inspection.id, models.InspectionResult.id)
+
+    # Los datos maestros no se archivan: los nombres se resuelven con la base activa
+    grade_names = dict(db.query(models.Grade.id, models.Grade.name))
+    defect_names = dict(db.query(models.Defect.id, models.Defect.name))
+
+    def row(r, inspection_date, inspection_type, product_name, lot):
+        return [
+            r.inspection_id, inspection_date, inspection_type, product_name, lot,
+            grade_names.get(r.grade_id, r.grade_id), defect_names.get(r.defect_id, r.defect_id or ""), r.pieces_count
+        ]
+
+    groups = []
+    if include_archive:
+        groups.append(
+            row(r, r.date, r.type, r.product_name, r.lot)
+            for r in archive.iter_archived_inspection_results(start_date, end_date, type)
+        )
+    groups.append(row(*r) for r in query.yield_per(1000))
+
+    headers = ["Inspección ID", "Fecha", "Tipo", "Producto", "Lote", "Grado", "Defecto", "Piezas"]
+    return csv_response(stream_csv_rows(headers, groups), "resultados_inspeccion")
+
+@router.get("/scanner-items/csv")
+def export_scanner_items_csv(
+    start_date: str = None,
+    end_date: str = None,
+    include_archive: bool = False,
+    db: Session = Depends(database.get_db)
+):
+    """Piezas de los estudios de escáner con el encabezado de su estudio."""
+    step = models.ScannerStep
+    query = db.query(
+        models.ScannerItem, step.date, step.supervisor, step.machine, step.product_name
+    ).join(step, models.ScannerItem.step_id == step.id)
+    if start_date:
+        query = query.filter(func.date(step.date) >= start_date)
+    if end_date:
+        query = query.filter(func.date(step.date) <= end_date)
+    query = query.order_by(step.date, step.id, models.ScannerItem.item_number)
+
+    grade_names = dict(db.query(models.Grade.id, models.Grade.name))
+
+    def row(i, step_date, supervisor, machine, product_name):
+        return [
+            i.step_id, step_date, supervisor, machine, product_name, i.item_number,
+            grade_names.get(i.inspector_grade_id, i.inspector_grade_id),
+            grade_names.get(i.scanner_grade_id, i.scanner_grade_id),
+            i.winner, i.thickness, i.width, i.length
+        ]
+
+    groups = []
+    if include_archive:
+        groups.append(
+            row(i, i.date, i.supervisor, i.machine, i.product_name)
+            for i in archive.iter_archived_scanner_items(start_date, end_date)
+        )
+    groups.append(row(*r) for r in query.yield_per(1000))
+
+    headers = [
+        "Estudio ID", "Fecha", "Supervisor", "Máquina", "Producto", "Pieza",
+        "Grado Inspector", "Grado Escáner", "Estado", "Espesor", "Ancho", "Largo"
+    ]
+    return csv_response(stream_csv_rows(headers, groups), "piezas_escaner")
+
 @router.get("/template/csv")
 def get_bulk_template():
-    # Plantilla de ejemplo para Productos/Grados
-    headers = ["category", "name", "active"]
+    # Plantilla de ejemplo para la carga masiva (POST /master-data/upload): catálogos, mercados,
+    # productos, grados, defectos y asociaciones grado-defecto
+    headers = ["category", "name", "active", "product", "grade_rank", "description", "grade", "defect"]
     output = io.StringIO()
     writer = csv.writer(output)
     writer.writerow(headers)
-    writer.writerow(["area", "Ejemplo Area", "true"])
-    writer.writerow(["machine", "Ejemplo Maquina", "true"])
+    writer.writerow(["area", "Ejemplo Area", "true", "", "", "", "", ""])
+    writer.writerow(["machine", "Ejemplo Maquina", "true", "", "", "", "", ""])
+    writer.writerow(["market", "Ejemplo Mercado", "", "", "", "", "", ""])
+    writer.writerow(["product", "Ejemplo Producto", "", "", "", "", "", ""])
+    writer.writerow(["grade", "Ejemplo Grado", "", "Ejemplo Producto", "1", "", "", ""])
+    writer.writerow(["defect", "Ejemplo Defecto", "", "", "", "Descripción del defecto", "", ""])
+    writer.writerow(["grade_defect", "", "", "Ejemplo Producto", "", "", "Ejemplo Grado", "Ejemplo Defecto"])
     
     output.seek(0)
     
@@ -1,12 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Request, Response
+from sqlalchemy.orm import Session, selectinload
+from typing import Dict, List, Optional
+from pydantic import BaseModel, TypeAdapter
 from database import database, models
 from routers.auth import get_current_admin_user, get_current_active_user
+from services.grade_ranks import grade_ranks
+from services.prefix_search import prefix_upper_bound
+from services import master_data_import
 
 import csv
 import io
+import threading
+from collections import OrderedDict
+import uuid
 
 router = APIRouter(
     prefix="/master-data",
@@ -15,6 +21,78 @@ router = APIRouter(
 )
 
 
+# --- Caché de Datos Maestros ---
+EMPTY_LIST = b"[]"
+
+class MasterDataCache:
+    """Respuestas JSON ya serializadas de los GET de datos maestros, bajo un número de versión.
+
+    Los datos maestros cambian pocas veces al mes: toda escritura de administrador llama a bump(),
+    que incrementa la versión y vacía la caché. La versión es también la ETag de las respuestas.
+    Las claves incluyen valores de la ruta (categoría, id de producto o grado): la caché es LRU acotada y
+    las listas vacías (ids o categorías inexistentes) no se guardan, para que no crezca con cada valor pedido.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self._lock = threading.Lock()
+        self._version = 1
+        self._entries = OrderedDict()
+        self.max_entries = max_entries
+        # Distingue este proceso: tras reiniciar el servidor las ETag anteriores dejan de coincidir
+        self._instance = uuid.uuid4().hex[:8]
+
+    def get(self, key, build):
+        """Retorna (versión, cuerpo JSON); build() solo se llama si la clave no está en caché."""
+        with self._lock:
+            version = self._version
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+        if body is None:
+            body = build()
+            with self._lock:
+                # Si hubo una escritura mientras se leía, el resultado no se guarda
+                if self._version == version and body != EMPTY_LIST:
+                    self._entries[key] = body
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+        return version, body
+
+    def etag(self, version: int) -> str:
+        return f'"{self._instance}-{version}"'
+
+    def bump(self):
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+        grade_ranks.invalidate()
+
+
+master_cache = MasterDataCache()
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def cached_response(request: Request, key, response_model, load):
+    """Responde desde la caché de datos maestros con ETag; 304 si el cliente ya tiene la versión actual."""
+    adapter = TypeAdapter(response_model)
+    version, body = master_cache.get(
+        key, lambda: adapter.dump_json(adapter.validate_python(load(), from_attributes=True))
+    )
+    etag = master_cache.etag(version)
+    # no-cache: el navegador guarda la respuesta pero revalida siempre con If-None-Match
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 # Esquemas
 class CatalogItemBase(BaseModel):
     category: str
@@ -40,9 +118,32 @@ class DefectResponse(BaseModel):
 
 # --- Ítems de Catálogo (Listas Genéricas) ---
 @router.get("/catalogs/{category}", response_model=List[CatalogItemResponse])
-def get_catalog_items(category: str, db: Session = Depends(database.get_db), current_user = Depends(get_current_active_user)):
-
-    return db.query(models.CatalogItem).filter(models.CatalogItem.category == category).all()
+def get_catalog_items(category: str, request: Request, include_inactive: bool = False, db: Session = Depends(database.get_db), current_user = Depends(get_current_active_user)):
+
+    def load():
+        query = db.query(models.CatalogItem).filter(models.CatalogItem.category == category)
+        if not include_inactive:
+            query = query.filter(models.CatalogItem.active == True)
+        return query.order_by(models.CatalogItem.name).all()
+
+    return cached_response(request, ("catalogs", category, include_inactive), List[CatalogItemResponse], load)
+
+@router.get("/catalogs/{category}/search", response_model=List[CatalogItemResponse])
+def search_catalog_items(category: str, q: str = "", limit: int = 20, db: Session = Depends(database.get_db), current_user = Depends(get_current_active_user)):
+    """Autocompletado: ítems activos cuyo nombre empieza con `q`, sin distinguir mayúsculas ni tildes."""
+    limit = max(1, min(limit, 100))
+    query = db.query(models.CatalogItem).filter(
+        models.CatalogItem.category == category,
+        models.CatalogItem.active == True
+    )
+    prefix = models.normalize_catalog_name(q)
+    if prefix:
+        # Rango [prefijo, prefijo siguiente) para que SQLite recorra ix_catalog_items_category_active_normalized
+        query = query.filter(models.CatalogItem.normalized_name >= prefix)
+        upper = prefix_upper_bound(prefix)
+        if upper is not None:
+            query = query.filter(models.CatalogItem.normalized_name < upper)
+    return query.order_by(models.CatalogItem.normalized_name).limit(limit).all()
 
 @router.post("/catalogs", response_model=CatalogItemResponse)
 def create_catalog_item(item: CatalogItemCreate, db: Session = Depends(database.get_db), current_user = Depends(get_current_admin_user)):
@@ -50,6 +151,7 @@ def create_catalog_item(item: CatalogItemCreate, db: Session = Depends(database.
     db_item = models.CatalogItem(**item.model_dump())
     db.add(db_item)
     db.commit()
+    master_cache.bump()
     db.refresh(db_item)
     return db_item
 
@@ -60,13 +162,14 @@ def delete_catalog_item(id: int, db: Session = Depends(database.get_db), current
     if item:
         db.delete(item)
         db.commit()
+        master_cache.bump()
     return {"detail": "Item deleted"}
 
 # --- Defectos ---
 @router.get("/defects", response_model=List[DefectResponse])
-def get_defects(db: Session = Depends(database.get_db), current_user = Depends(get_current_active_user)):
+def get_defects(request: Request, db: Session = Depends(database.get_db), current_user = Depends(get_current_active_user)):
 
-    return db.query(models.Defect).all()
+    return cached_response(request, "defects", List[DefectResponse], lambda: db.query(models.Defect).all())
 
 @router.post("/defects", response_model=DefectResponse)
 def create_defect(defect: DefectCreate, db: Session = Depends(database.get_db), current_user = Depends(get_current_admin_user)):
@@ -74,6 +177,7 @@ def create_defect(defect: DefectCreate, db: Session = Depends(database.get_db),
     db_defect = models.Defect(name=defect.name)
     db.add(db_defect)
     db.commit()
+    master_cache.bump()
     db.refresh(db_defect)
     return db_defect
 
@@ -84,20 +188,29 @@ def delete_defect(id: int, db: Session = Depends(database.get_db), current_user
     if item:
         db.delete(item)
         db.commit()
+        master_cache.bump()
     return {"detail": "Defect deleted"}
 
 
 # --- Código auxiliar de Carga Masiva ---
 @router.post("/upload")
-async def upload_master_data(type: str, file: UploadFile = File(...), db: Session = Depends(database.get_db), current_user = Depends(get_current_admin_user)):
+def upload_master_data(type: Optional[str] = None, file: UploadFile = File(...), db: Session = Depends(database.get_db), current_user = Depends(get_current_admin_user)):
 
     """
-    El tipo puede ser: 'catalog', 'markets', 'defects'
-    El archivo debe ser CSV.
+    Carga masiva desde CSV o XLSX con el formato de /api/exports/template/csv.
+    La columna 'category' indica el tipo de cada fila (market, product, grade, defect, grade_defect
+    o una categoría de catálogo); si falta, se usa `type` (ej. 'catalog', 'markets', 'defects').
+    Retorna los conteos creados/actualizados por tipo y los errores por fila.
     """
-    content = await file.read()
-    # Lógica para analizar CSV y poblar tablas
-    # Por ahora, solo un éxito de marcador de posición
+    try:
+        report = master_data_import.import_master_data(db, file.filename, file.file, type)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="El archivo CSV debe estar en UTF-8 o Windows-1252")
+    except Exception as e:
+        print(f"ERROR uploading master data: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    master_cache.bump()
+    return report
 
 # --- Jerarquía de Clasificación (Producto -> Grado -> Defecto) ---
 
@@ -127,9 +240,9 @@ class GradeResponse(BaseModel):
 
 # Productos
 @router.get("/products", response_model=List[ProductResponse])
-def get_products(db: Session = Depends(database.get_db), current_user = Depends(get_current_active_user)):
+def get_products(request: Request, db: Session = Depends(database.get_db), current_user = Depends(get_current_active_user)):
 
-    return db.query(models.Product).all()
+    return cached_response(request, "products", List[ProductResponse], lambda: db.query(models.Product).all())
 
 @router.post("/products", response_model=ProductResponse)
 def create_product(product: ProductCreate, db: Session = Depends(database.get_db), current_user = Depends(get_current_admin_user)):
@@ -137,6 +250,7 @@ def create_product(product: ProductCreate, db: Session = Depends(database.get_db
     db_prod = models.Product(**product.model_dump())
     db.add(db_prod)
     db.commit()
+    master_cache.bump()
     db.refresh(db_prod)
     return db_prod
 
@@ -147,13 +261,18 @@ def delete_product(id: int, db: Session = Depends(database.get_db), current_user
     if item:
         db.delete(item)
         db.commit()
+        master_cache.bump()
     return {"detail": "Product deleted"}
 
 # Grados (Cascadas)
 @router.get("/products/{product_id}/grades", response_model=List[GradeResponse])
-def get_grades_by_product(product_id: int, db: Session = Depends(database.get_db), current_user = Depends(get_current_active_user)):
+def get_grades_by_product(product_id: int, request: Request, db: Session = Depends(database.get_db), current_user = Depends(get_current_active_user)):
 
-    return db.query(models.Grade).filter(models.Grade.product_id == product_id).all()
+    return cached_response(
+        request, ("grades", product_id), List[GradeResponse],
+        lambda: db.query(models.Grade).options(selectinload(models.Grade.defects))
+            .filter(models.Grade.product_id == product_id).order_by(models.Grade.grade_rank, models.Grade.id).all()
+    )
 
 @router.post("/grades", response_model=GradeResponse)
 def create_grade(grade: GradeCreate, db: Session = Depends(database.get_db), current_user = Depends(get_current_admin_user)):
@@ -163,6 +282,7 @@ def create_grade(grade: GradeCreate, db: Session = Depends(database.get_db), cur
         db_grade = models.Grade(**grade.model_dump())
         db.add(db_grade)
         db.commit()
+        master_cache.bump()
         db.refresh(db_grade)
         print(f"DEBUG: Successfully created grade: {db_grade.id}")
         return db_grade
@@ -178,6 +298,7 @@ def delete_grade(id: int, db: Session = Depends(database.get_db), current_user =
     if item:
         db.delete(item)
         db.commit()
+        master_cache.bump()
     return {"detail": "Grade deleted"}
 
 # Asociación Grado-Defecto
@@ -199,6 +320,7 @@ def add_defect_to_grade(link: GradeDefectLink, db: Session = Depends(database.ge
         
     grade.defects.append(defect)
     db.commit()
+    master_cache.bump()
     return {"detail": "Defect added to grade"}
 
 @router.delete("/grades/{grade_id}/defects/{defect_id}")
@@ -211,17 +333,21 @@ def remove_defect_from_grade(grade_id: int, defect_id: int, db: Session = Depend
         if defect in grade.defects:
             grade.defects.remove(defect)
             db.commit()
+            master_cache.bump()
             return {"detail": "Defect removed"}
             
     raise HTTPException(status_code=404, detail="Association not found")
 
 @router.get("/grades/{grade_id}/defects", response_model=List[DefectResponse])
-def get_defects_by_grade(grade_id: int, db: Session = Depends(database.get_db), current_user = Depends(get_current_active_user)):
+def get_defects_by_grade(grade_id: int, request: Request, db: Session = Depends(database.get_db), current_user = Depends(get_current_active_user)):
 
-    grade = db.query(models.Grade).filter(models.Grade.id == grade_id).first()
-    if not grade:
-        raise HTTPException(status_code=404, detail="Grade not found")
-    return grade.defects
+    def load():
+        grade = db.query(models.Grade).filter(models.Grade.id == grade_id).first()
+        if not grade:
+            raise HTTPException(status_code=404, detail="Grade not found")
+        return grade.defects
+
+    return cached_response(request, ("grade_defects", grade_id), List[DefectResponse], load)
 
 # --- Mercados ---
 class MarketCreate(BaseModel):
@@ -234,9 +360,9 @@ class MarketResponse(BaseModel):
         from_attributes = True
 
 @router.get("/markets", response_model=List[MarketResponse])
-def get_markets(db: Session = Depends(database.get_db), current_user = Depends(get_current_active_user)):
+def get_markets(request: Request, db: Session = Depends(database.get_db), current_user = Depends(get_current_active_user)):
 
-    return db.query(models.Market).all()
+    return cached_response(request, "markets", List[MarketResponse], lambda: db.query(models.Market).all())
 
 @router.post("/markets", response_model=MarketResponse)
 def create_market(market: MarketCreate, db: Session = Depends(database.get_db), current_user = Depends(get_current_admin_user)):
@@ -244,6 +370,7 @@ def create_market(market: MarketCreate, db: Session = Depends(database.get_db),
     db_market = models.Market(name=market.name)
     db.add(db_market)
     db.commit()
+    master_cache.bump()
     db.refresh(db_market)
     return db_market
 
@@ -254,4 +381,80 @@ def delete_market(id: int, db: Session = Depends(database.get_db), current_user
     if item:
         db.delete(item)
         db.commit()
+        master_cache.bump()
     return {"detail": "Market deleted"}
+
+
+# --- Carga Inicial (jerarquía completa en una sola respuesta) ---
+class BootstrapProduct(ProductResponse):
+    grades: List[GradeResponse] = []
+
+class MasterDataBootstrap(BaseModel):
+    products: List[BootstrapProduct]
+    markets: List[MarketResponse]
+    catalogs: Dict[str, List[CatalogItemResponse]]  # categoría -> ítems activos
+
+@router.get("/bootstrap", response_model=MasterDataBootstrap)
+def get_bootstrap(request: Request, db: Session = Depends(database.get_db), current_user = Depends(get_current_active_user)):
+
+    def load():
+        # Número fijo de consultas: productos, grados, defectos (selectinload), mercados y catálogos
+        products = db.query(models.Product).options(
+            selectinload(models.Product.grades).selectinload(models.Grade.defects)
+        ).all()
+        catalogs = {}
+        for item in db.query(models.CatalogItem).filter(models.CatalogItem.active == True).order_by(models.CatalogItem.category, models.CatalogItem.name):
+            catalogs.setdefault(item.category, []).append(item)
+        return {"products": products, "markets": db.query(models.Market).all(), "catalogs": catalogs}
+
+    return cached_response(request, "bootstrap", MasterDataBootstrap, load)
+
+
+# --- Precios por Grado y Mercado (valorización de estudios de escáner) ---
+class GradePriceBase(BaseModel):
+    grade_id: int
+    market_id: int
+    price: float
+
+class GradePriceResponse(GradePriceBase):
+    id: int
+    class Config:
+        from_attributes = True
+
+@router.get("/grade-prices", response_model=List[GradePriceResponse])
+def get_grade_prices(market_id: Optional[int] = None, db: Session = Depends(database.get_db), current_user = Depends(get_current_active_user)):
+
+    query = db.query(models.GradePrice)
+    if market_id is not None:
+        query = query.filter(models.GradePrice.market_id == market_id)
+    return query.all()
+
+@router.put("/grade-prices", response_model=GradePriceResponse)
+def set_grade_price(item: GradePriceBase, db: Session = Depends(database.get_db), current_user = Depends(get_current_admin_user)):
+
+    grade = db.query(models.Grade).filter(models.Grade.id == item.grade_id).first()
+    market = db.query(models.Market).filter(models.Market.id == item.market_id).first()
+    if not grade or not market:
+        raise HTTPException(status_code=404, detail="Grade or Market not found")
+
+    db_price = db.query(models.GradePrice).filter(
+        models.GradePrice.grade_id == item.grade_id,
+        models.GradePrice.market_id == item.market_id
+    ).first()
+    if db_price:
+        db_price.price = item.price
+    else:
+        db_price = models.GradePrice(**item.model_dump())
+        db.add(db_price)
+    db.commit()
+    db.refresh(db_price)
+    return db_price
+
+@router.delete("/grade-prices/{id}")
+def delete_grade_price(id: int, db: Session = Depends(database.get_db), current_user = Depends(get_current_admin_user)):
+
+    item = db.query(models.GradePrice).filter(models.GradePrice.id == id).first()
+    if item:
+        db.delete(item)
+        db.commit()
+    return {"detail": "Grade price deleted"}
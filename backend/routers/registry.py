@@ -1,8 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Request
 from sqlalchemy.orm import Session, joinedload
-from typing import List
+from sqlalchemy import and_, or_, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from typing import List, Optional
+import base64
 from database import database, models
 import schemas
+from services import inspection_totals, inspection_import
+from services.prefix_search import prefix_upper_bound
+from routers.auth import get_current_admin_user
+from routers.master_data import cached_response
 
 router = APIRouter(
     prefix="/api",
@@ -10,28 +18,135 @@ router = APIRouter(
 )
 
 @router.get("/markets", response_model=List[schemas.MarketBase])
-def read_markets(db: Session = Depends(database.get_db)):
+def read_markets(request: Request, db: Session = Depends(database.get_db)):
     # Asumiendo que MarketBase incluye lógica de relación con grados
-    markets = db.query(models.Market).all()
-    return markets
+    return cached_response(request, "registry_markets", List[schemas.MarketBase], lambda: db.query(models.Market).all())
 
-@router.get("/inspections", response_model=List[schemas.InspectionResponse])
-def read_inspections(skip: int = 0, limit: int = 100, db: Session = Depends(database.get_db)):
-    inspections = db.query(models.Inspection).options(joinedload(models.Inspection.market)).offset(skip).limit(limit).all()
-    return inspections
+from datetime import datetime, date
 
-from datetime import datetime
+def encode_inspection_cursor(inspection):
+    # Fecha vacía en el cursor = inspección sin fecha (NULL)
+    raw = f"{inspection.date.isoformat() if inspection.date else ''}|{inspection.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_inspection_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        cursor_date, cursor_id = raw.split("|")
+        return (date.fromisoformat(cursor_date) if cursor_date else None), int(cursor_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+@router.get("/inspections", response_model=schemas.InspectionPage)
+def read_inspections(
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    order: str = "desc",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    type: Optional[str] = None,
+    lot: Optional[str] = None,
+    area: Optional[str] = None,
+    machine: Optional[str] = None,
+    shift: Optional[str] = None,
+    market_id: Optional[int] = None,
+    q: Optional[str] = None,
+    db: Session = Depends(database.get_db)
+):
+    limit = max(1, min(limit, 500))
+    query = db.query(models.Inspection).options(
+        joinedload(models.Inspection.market),
+        joinedload(models.Inspection.totals)
+    )
+
+    # Filtros de igualdad primero para que SQLite elija el índice compuesto (filtro, date, id)
+    if type and type != 'all':
+        query = query.filter(models.Inspection.type == type)
+    if lot:
+        # lot != '' repite la condición del índice parcial ux_inspections_lot; sin ella SQLite recorre la tabla
+        query = query.filter(models.Inspection.lot == lot, models.Inspection.lot != "")
+    if area:
+        query = query.filter(models.Inspection.area == area)
+    if machine:
+        query = query.filter(models.Inspection.machine == machine)
+    if shift:
+        query = query.filter(models.Inspection.shift == shift)
+    if market_id is not None:
+        query = query.filter(models.Inspection.market_id == market_id)
+    if date_from:
+        query = query.filter(models.Inspection.date >= date_from)
+    if date_to:
+        query = query.filter(models.Inspection.date <= date_to)
+    if q:
+        # Búsqueda de texto en producto o lote (LIKE de SQLite no distingue mayúsculas ASCII)
+        pattern = "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        query = query.filter(or_(
+            models.Inspection.product_name.like(pattern, escape="\\"),
+            models.Inspection.lot.like(pattern, escape="\\")
+        ))
+
+    # Paginación por llave (date, id): cada página cuesta lo mismo sin importar cuán atrás esté
+    if order == "asc":
+        sort = (models.Inspection.date.asc(), models.Inspection.id.asc())
+    else:
+        sort = (models.Inspection.date.desc(), models.Inspection.id.desc())
+
+    if cursor:
+        # SQLite ordena las fechas NULL primero en orden ascendente y al final en descendente
+        cursor_date, cursor_id = decode_inspection_cursor(cursor)
+        date_col, id_col = models.Inspection.date, models.Inspection.id
+        if order == "asc":
+            if cursor_date is None:
+                query = query.filter(or_(date_col.isnot(None), and_(date_col.is_(None), id_col > cursor_id)))
+            else:
+                query = query.filter(or_(
+                    date_col > cursor_date,
+                    and_(date_col == cursor_date, id_col > cursor_id)
+                ))
+        else:
+            if cursor_date is None:
+                query = query.filter(date_col.is_(None), id_col < cursor_id)
+            else:
+                query = query.filter(or_(
+                    date_col < cursor_date,
+                    and_(date_col == cursor_date, id_col < cursor_id),
+                    date_col.is_(None)
+                ))
+
+    # Se pide una fila extra para saber si existe una página siguiente
+    inspections = query.order_by(*sort).limit(limit + 1).all()
+    next_cursor = None
+    if len(inspections) > limit:
+        inspections = inspections[:limit]
+        next_cursor = encode_inspection_cursor(inspections[-1])
+
+    return {"items": inspections, "next_cursor": next_cursor}
+
+def is_duplicate_lot_error(error: IntegrityError) -> bool:
+    return "inspections.lot" in str(error.orig)
+
+@router.get("/lots", response_model=List[schemas.LotLookup])
+def lookup_lots(prefix: str, limit: int = 20, db: Session = Depends(database.get_db)):
+    """Búsqueda de lotes por prefijo (escáner de códigos / autocompletado)."""
+    limit = max(1, min(limit, 100))
+    if not prefix:
+        return []
+
+    # Rango [prefijo, prefijo siguiente) en lugar de LIKE para que SQLite recorra ux_inspections_lot;
+    # la condición lot != '' coincide con la del índice parcial
+    query = db.query(models.Inspection).filter(
+        models.Inspection.lot != "",
+        models.Inspection.lot >= prefix
+    )
+    upper = prefix_upper_bound(prefix)
+    if upper is not None:
+        query = query.filter(models.Inspection.lot < upper)
+    return query.order_by(models.Inspection.lot).limit(limit).all()
 
 @router.post("/inspections", response_model=schemas.InspectionResponse)
 def create_inspection(inspection: schemas.InspectionCreate, db: Session = Depends(database.get_db)):
     print(f"DEBUG: Creating inspection with: {inspection}")
     
-    # Validación: Verificar Lote duplicado
-    if inspection.lot:
-        existing_lot = db.query(models.Inspection).filter(models.Inspection.lot == inspection.lot).first()
-        if existing_lot:
-             raise HTTPException(status_code=400, detail=f"El número de lote '{inspection.lot}' ya existe.")
-
     try:
         data = inspection.model_dump()
         
@@ -47,14 +162,33 @@ def create_inspection(inspection: schemas.InspectionCreate, db: Session = Depend
         db.refresh(db_inspection)
         print(f"DEBUG: Created inspection ID: {db_inspection.id}")
         return db_inspection
+    except IntegrityError as e:
+        db.rollback()
+        # El índice único ux_inspections_lot detecta el lote duplicado, sin lectura previa
+        if is_duplicate_lot_error(e):
+            raise HTTPException(status_code=400, detail=f"El número de lote '{inspection.lot}' ya existe.")
+        print(f"ERROR creating inspection: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
         print(f"ERROR creating inspection: {e}")
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/inspections/import")
+def import_inspections(file: UploadFile = File(...), chunk_size: int = inspection_import.DEFAULT_CHUNK_SIZE, db: Session = Depends(database.get_db), current_user = Depends(get_current_admin_user)):
+    """
+    Carga masiva de historial (CSV o XLSX): una fila por celda de resultado con las columnas de
+    InspectionCreate más grade_id, defect_id y pieces_count. Retorna conteos y errores por fila.
+    """
+    chunk_size = max(100, min(chunk_size, inspection_import.MAX_CHUNK_SIZE))
+    return inspection_import.import_inspections(db, file.file, file.filename or "", chunk_size=chunk_size)
+
 @router.get("/inspections/{inspection_id}", response_model=schemas.InspectionResponse)
 def get_inspection(inspection_id: int, db: Session = Depends(database.get_db)):
-    inspection = db.query(models.Inspection).options(joinedload(models.Inspection.market)).filter(models.Inspection.id == inspection_id).first()
+    inspection = db.query(models.Inspection).options(
+        joinedload(models.Inspection.market),
+        joinedload(models.Inspection.totals)
+    ).filter(models.Inspection.id == inspection_id).first()
     if not inspection:
          raise HTTPException(status_code=404, detail="Inspection not found")
     return inspection
@@ -65,8 +199,9 @@ def delete_inspection(inspection_id: int, db: Session = Depends(database.get_db)
     if not inspection:
         raise HTTPException(status_code=404, detail="Inspection not found")
     
-    # Eliminar resultados relacionados primero
+    # Eliminar resultados y totales relacionados primero
     db.query(models.InspectionResult).filter(models.InspectionResult.inspection_id == inspection_id).delete()
+    inspection_totals.delete_inspection_totals(db, inspection_id)
     
     db.delete(inspection)
     db.commit()
@@ -89,40 +224,47 @@ def update_inspection(inspection_id: int, inspection_data: schemas.InspectionUpd
     for key, value in data.items():
         setattr(inspection, key, value)
     
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        if is_duplicate_lot_error(e):
+            raise HTTPException(status_code=400, detail=f"El número de lote '{data.get('lot')}' ya existe.")
+        raise HTTPException(status_code=500, detail=str(e))
     db.refresh(inspection)
     return inspection
 
 @router.post("/inspections/{inspection_id}/results", response_model=schemas.InspectionResultResponse)
 def add_inspection_result(inspection_id: int, result: schemas.InspectionResultCreate, db: Session = Depends(database.get_db)):
-    print(f"DEBUG: Add Result for Inspection {inspection_id}, Grade {result.grade_id}, Defect {result.defect_id}")
-    
-    # constructor de consulta
-    query = db.query(models.InspectionResult).filter(
-        models.InspectionResult.inspection_id == inspection_id,
-        models.InspectionResult.grade_id == result.grade_id
+    # Incremento atómico en el servidor: una sola sentencia crea la celda o suma sobre el valor actual,
+    # así dos clasificadores marcando la misma celda no se pisan el conteo
+    stmt = sqlite_insert(models.InspectionResult).values(
+        inspection_id=inspection_id,
+        grade_id=result.grade_id,
+        defect_id=result.defect_id,
+        pieces_count=result.pieces_count
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(models.INSPECTION_RESULT_CELL),
+        set_={"pieces_count": models.InspectionResult.pieces_count + stmt.excluded.pieces_count}
+    ).returning(
+        models.InspectionResult.id,
+        models.InspectionResult.inspection_id,
+        models.InspectionResult.grade_id,
+        models.InspectionResult.defect_id,
+        models.InspectionResult.pieces_count
     )
-    
-    if result.defect_id is not None:
-        query = query.filter(models.InspectionResult.defect_id == result.defect_id)
-    else:
-        query = query.filter(models.InspectionResult.defect_id == None)
-        
-    existing = query.first()
 
-    if existing:
-        print(f"DEBUG: Actualizando conteo existente desde {existing.pieces_count}")
-        existing.pieces_count += result.pieces_count
-        db.commit()
-        db.refresh(existing)
-        return existing
-    else:
-        print("DEBUG: Creando nueva entrada de resultado")
-        new_result = models.InspectionResult(inspection_id=inspection_id, **result.model_dump())
-        db.add(new_result)
+    try:
+        row = db.execute(stmt).mappings().one()
+        inspection_totals.apply_result_delta(db, inspection_id, result.grade_id, result.pieces_count)
         db.commit()
-        db.refresh(new_result)
-        return new_result
+    except Exception as e:
+        db.rollback()
+        print(f"ERROR adding result: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return dict(row)
 
 
 @router.put("/inspection-results/{result_id}", response_model=schemas.InspectionResultResponse)
@@ -131,7 +273,9 @@ def update_inspection_result(result_id: int, update: schemas.InspectionResultUpd
     if not result:
         raise HTTPException(status_code=404, detail="Result not found")
     
+    delta = update.pieces_count - (result.pieces_count or 0)
     result.pieces_count = update.pieces_count
+    inspection_totals.apply_result_delta(db, result.inspection_id, result.grade_id, delta)
     db.commit()
     db.refresh(result)
     
@@ -149,38 +293,46 @@ def update_inspection_result(result_id: int, update: schemas.InspectionResultUpd
 @router.post("/inspections/{inspection_id}/sync_results")
 def sync_inspection_results(inspection_id: int, results: List[schemas.InspectionResultSync], db: Session = Depends(database.get_db)):
     print(f"DEBUG: Syncing {len(results)} results for inspection {inspection_id}")
-    
+
+    # La grilla completa se escribe de una vez; si una celda llega repetida gana la última
+    rows = {}
     for r in results:
-        query = db.query(models.InspectionResult).filter(
-            models.InspectionResult.inspection_id == inspection_id,
-            models.InspectionResult.grade_id == r.grade_id
-        )
-        if r.defect_id is not None:
-            query = query.filter(models.InspectionResult.defect_id == r.defect_id)
-        else:
-            query = query.filter(models.InspectionResult.defect_id == None)
-            
-        existing = query.first()
-        
-        if existing:
-            existing.pieces_count = r.pieces_count
-        else:
-            new_result = models.InspectionResult(
-                inspection_id=inspection_id,
-                grade_id=r.grade_id,
-                defect_id=r.defect_id,
-                pieces_count=r.pieces_count
-            )
-            db.add(new_result)
-            
+        rows[(r.grade_id, r.defect_id)] = {
+            "inspection_id": inspection_id,
+            "grade_id": r.grade_id,
+            "defect_id": r.defect_id,
+            "pieces_count": r.pieces_count,
+        }
+
+    if not rows:
+        return {"status": "success", "inserted": 0, "updated": 0}
+
     try:
+        # Una sola lectura de las celdas existentes, indexadas por (grado, defecto)
+        existing = {
+            (grade_id, defect_id)
+            for grade_id, defect_id in db.query(
+                models.InspectionResult.grade_id,
+                models.InspectionResult.defect_id
+            ).filter(models.InspectionResult.inspection_id == inspection_id)
+        }
+
+        stmt = sqlite_insert(models.InspectionResult)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(models.INSPECTION_RESULT_CELL),
+            set_={"pieces_count": stmt.excluded.pieces_count}
+        )
+        db.execute(stmt, list(rows.values()))
+        inspection_totals.refresh_inspection_totals(db, inspection_id)
         db.commit()
-        return {"status": "success"}
     except Exception as e:
         db.rollback()
         print(f"ERROR syncing results: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+    inserted = sum(1 for key in rows if key not in existing)
+    return {"status": "success", "inserted": inserted, "updated": len(rows) - inserted}
+
 
 
 @router.get("/inspections/{inspection_id}/results")
@@ -210,3 +362,71 @@ def get_inspection_results(inspection_id: int, db: Session = Depends(database.ge
     except Exception as e:
         print(f"ERROR fetching results: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+def percentage(count, total):
+    return (count / total * 100) if total else 0.0
+
+@router.get("/inspections/{inspection_id}/summary", response_model=schemas.InspectionSummary)
+def get_inspection_summary(inspection_id: int, db: Session = Depends(database.get_db)):
+    exists = db.query(models.Inspection.id).filter(models.Inspection.id == inspection_id).first()
+    if not exists:
+        raise HTTPException(status_code=404, detail="Inspection not found")
+
+    pieces = func.sum(models.InspectionResult.pieces_count)
+
+    # Resumen por grado
+    grade_rows = db.query(
+        models.Grade.id, models.Grade.name, models.Grade.grade_rank, pieces
+    ).join(
+        models.InspectionResult, models.InspectionResult.grade_id == models.Grade.id
+    ).filter(
+        models.InspectionResult.inspection_id == inspection_id
+    ).group_by(models.Grade.id).order_by(pieces.desc()).all()
+
+    # Resumen por defecto (las piezas sin defecto no cuentan aquí)
+    defect_rows = db.query(
+        models.Defect.id, models.Defect.name, pieces
+    ).join(
+        models.InspectionResult, models.InspectionResult.defect_id == models.Defect.id
+    ).filter(
+        models.InspectionResult.inspection_id == inspection_id
+    ).group_by(models.Defect.id).order_by(pieces.desc()).all()
+
+    # Defectos dentro de cada grado
+    grade_defect_rows = db.query(
+        models.Grade.id, models.Grade.name, models.Defect.id, models.Defect.name, pieces
+    ).select_from(models.InspectionResult).join(
+        models.Grade, models.InspectionResult.grade_id == models.Grade.id
+    ).join(
+        models.Defect, models.InspectionResult.defect_id == models.Defect.id
+    ).filter(
+        models.InspectionResult.inspection_id == inspection_id
+    ).group_by(models.Grade.id, models.Defect.id).order_by(models.Grade.id, pieces.desc()).all()
+
+    grade_totals = {grade_id: count or 0 for grade_id, _, _, count in grade_rows}
+    total = sum(grade_totals.values())
+    rejected = sum(count or 0 for _, name, _, count in grade_rows if name == inspection_totals.REJECTION_GRADE_NAME)
+
+    return {
+        "inspection_id": inspection_id,
+        "total_pieces": total,
+        "rejected_pieces": rejected,
+        "rejection_percentage": percentage(rejected, total),
+        "grades": [
+            {"grade_id": grade_id, "name": name, "grade_rank": rank, "count": count or 0, "percentage": percentage(count or 0, total)}
+            for grade_id, name, rank, count in grade_rows
+        ],
+        "defects": [
+            {"defect_id": defect_id, "name": name, "count": count or 0, "percentage": percentage(count or 0, total)}
+            for defect_id, name, count in defect_rows
+        ],
+        "grade_defects": [
+            {
+                "grade_id": grade_id, "grade_name": grade_name,
+                "defect_id": defect_id, "defect_name": defect_name,
+                "count": count or 0, "percentage": percentage(count or 0, grade_totals.get(grade_id, 0))
+            }
+            for grade_id, grade_name, defect_id, defect_name, count in grade_defect_rows
+        ],
+    }
@@ -1,9 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session, joinedload
-from typing import List
+from typing import List, Optional
 from database import database, models
 import schemas
-from datetime import datetime
+from datetime import datetime, date, time, timedelta
+import asyncio
+import base64
+from collections import Counter, deque
+from sqlalchemy import insert, select, func, case, and_, or_
+from services import scanner_stats, scanner_value, scanner_import, scanner_rollups, scanner_live, cut_optimizer
+from services.grade_ranks import grade_ranks
+from routers.auth import get_current_admin_user
 
 router = APIRouter(
     prefix="/api/scanner",
@@ -33,6 +42,75 @@ def read_scanner_steps(skip: int = 0, limit: int = 100, db: Session = Depends(da
     steps = db.query(models.ScannerStep).order_by(models.ScannerStep.date.desc()).offset(skip).limit(limit).all()
     return steps
 
+def encode_step_cursor(step_date: Optional[datetime], step_id: int):
+    # Fecha vacía en el cursor = estudio sin fecha (NULL)
+    raw = f"{step_date.isoformat() if step_date else ''}|{step_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_step_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        cursor_date, cursor_id = raw.split("|")
+        return (datetime.fromisoformat(cursor_date) if cursor_date else None), int(cursor_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+@router.get("/steps/summary", response_model=schemas.ScannerStepSummaryPage)
+def read_scanner_step_summaries(
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    machine: Optional[str] = None,
+    supervisor: Optional[str] = None,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: Session = Depends(database.get_db)
+):
+    """Listado liviano de estudios: encabezado y conteos por estado, sin cargar las piezas."""
+    limit = max(1, min(limit, 200))
+    step, item = models.ScannerStep, models.ScannerItem
+
+    criteria = step_range_criteria(machine, date_from, date_to, supervisor=supervisor)
+    if cursor:
+        # En orden descendente SQLite deja las fechas NULL al final
+        cursor_date, cursor_id = decode_step_cursor(cursor)
+        if cursor_date is None:
+            criteria.append(and_(step.date.is_(None), step.id < cursor_id))
+        else:
+            criteria.append(or_(
+                step.date < cursor_date,
+                and_(step.date == cursor_date, step.id < cursor_id),
+                step.date.is_(None)
+            ))
+
+    # Primero la página de estudios por llave (date, id); luego los conteos solo de esas filas,
+    # todo en una sentencia. Se pide una fila extra para saber si existe una página siguiente.
+    page = select(step).where(*criteria).order_by(step.date.desc(), step.id.desc()).limit(limit + 1).subquery()
+    header_columns = [page.c[name] for name in (
+        "id", "date", "market_id", "supervisor", "shift", "area", "machine", "responsible", "product_name"
+    )]
+    rows = db.execute(
+        select(
+            *header_columns,
+            func.count(item.id).label("pieces_evaluated"),
+            func.count(case((item.winner == scanner_stats.STATUS_MATCH, 1))).label("pieces_in_grade"),
+            func.count(case((item.winner == scanner_stats.STATUS_OVERGRADE, 1))).label("pieces_over_grade"),
+            func.count(case((item.winner == scanner_stats.STATUS_UNDERGRADE, 1))).label("pieces_under_grade"),
+        ).select_from(page).outerjoin(item, item.step_id == page.c.id)
+        .group_by(page.c.id)
+        .order_by(page.c.date.desc(), page.c.id.desc())
+    ).mappings().all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_step_cursor(rows[-1]["date"], rows[-1]["id"])
+
+    items = [
+        {**row, "assertiveness": (row["pieces_in_grade"] / row["pieces_evaluated"]) if row["pieces_evaluated"] else 0.0}
+        for row in rows
+    ]
+    return {"items": items, "next_cursor": next_cursor}
+
 @router.get("/steps/{step_id}", response_model=schemas.ScannerStepResponse)
 def read_scanner_step(step_id: int, db: Session = Depends(database.get_db)):
     step = db.query(models.ScannerStep).options(
@@ -42,108 +120,288 @@ def read_scanner_step(step_id: int, db: Session = Depends(database.get_db)):
         raise HTTPException(status_code=404, detail="Scanner Step not found")
     return step
 
+def build_scanner_item_rows(step_id: int, items: List[schemas.ScannerItemCreate], db: Session):
+    """Arma las filas a insertar con su estado calculado en memoria desde el mapa de rangos en caché."""
+    grade_ids = {i.inspector_grade_id for i in items} | {i.scanner_grade_id for i in items}
+    ranks = grade_ranks.get_ranks(db, grade_ids)
+
+    missing = sorted(grade_id for grade_id in grade_ids if grade_id not in ranks)
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Invalid Grade IDs: {missing}")
+    # Sin rango no se puede calcular el estado de la pieza
+    unranked = sorted(grade_id for grade_id in grade_ids if ranks[grade_id] is None)
+    if unranked:
+        raise HTTPException(status_code=400, detail=f"Grades without grade_rank: {unranked}")
+
+    return [
+        {
+            "step_id": step_id,
+            "item_number": item.item_number,
+            "inspector_grade_id": item.inspector_grade_id,
+            "scanner_grade_id": item.scanner_grade_id,
+            # La columna 'winner' guarda el estado: "Match", "Overgrade" o "Undergrade"
+            "winner": scanner_stats.classify(ranks[item.inspector_grade_id], ranks[item.scanner_grade_id]),
+            "thickness": item.thickness,
+            "width": item.width,
+            "length": item.length,
+        }
+        for item in items
+    ]
+
 @router.post("/steps/{step_id}/items", response_model=schemas.ScannerItemResponse)
 def add_scanner_item(step_id: int, item: schemas.ScannerItemCreate, db: Session = Depends(database.get_db)):
     try:
-        # Determinar Ganador y Sobre/Bajo Grado
-        inspector_grade = db.query(models.Grade).filter(models.Grade.id == item.inspector_grade_id).first()
-        scanner_grade = db.query(models.Grade).filter(models.Grade.id == item.scanner_grade_id).first()
-        
-        if not inspector_grade or not scanner_grade:
-             raise HTTPException(status_code=400, detail="Invalid Grade IDs")
-             
-        winner = "Tie"
-        # Lógica: 1 es mejor. 
-        # Si Inspector=1 (Mejor), Escáner=2 (Peor). Rango Escáner > Rango Inspector. 
-        # Esto significa que el Escáner dio un grado peor que la realidad. Bajo Grado?
-        # Espera, si tengo una tabla limpia (1) y el escáner dice que tiene nudos (2). Lo degradó. "Bajo Grado".
-        # Si tengo una tabla con nudos (2) y el escáner dice que está limpia (1). Rango Escáner < Rango Inspector.
-        # Lo Sobregraduó (Sobre Grado).
-        
-        # Verifiquemos términos estándar de la industria.
-        # Sobre Grado / Overgrade: Dar a una pieza un valor mayor al que tiene.
-        # Bajo Grado / Undergrade: Dar a una pieza un valor menor al que tiene.
-        
-        if scanner_grade.grade_rank < inspector_grade.grade_rank:
-            winner = "Scanner" # Escáner dice que es mejor. Sobregraduado.
-            # Pero usualmente ganador significa quién tiene la razón?
-            # En Models.py: winner = Column(String) # "Inspector", "Escáner", "Empate"
-            # Si difieren, usualmente el Inspector es la Verdad. Así que el Escáner está EQUIVOCADO.
-            # Quizás la columna "winner" significaba quién "ganó" en un contexto diferente.
-            # Revisemos simplemente si coinciden.
-            pass
-        elif scanner_grade.grade_rank > inspector_grade.grade_rank:
-            winner = "Scanner" # Escáner dice que es peor. Subgraduado.
-            pass
-        else:
-            winner = "Tie"
-        
-        # De hecho, solo guardemos el ítem. Calculamos estadísticas en agregado.
-        # Pero podemos guardar "winner" como una clasificación del error si es necesario.
-        # Models tiene columna 'winner'. Usémosla para guardar "Coincidencia", "Sobregrado", "Subgrado".
-        
-        status = "Match"
-        if scanner_grade.grade_rank < inspector_grade.grade_rank:
-            status = "Overgrade"
-        elif scanner_grade.grade_rank > inspector_grade.grade_rank:
-            status = "Undergrade"
-            
-        db_item = models.ScannerItem(
-            step_id=step_id,
-            item_number=item.item_number,
-            inspector_grade_id=item.inspector_grade_id,
-            scanner_grade_id=item.scanner_grade_id,
-            winner=status, # Reutilizando esta columna para estado
-            thickness=item.thickness,
-            width=item.width,
-            length=item.length
-        )
-        
+        row = build_scanner_item_rows(step_id, [item], db)[0]
+        db_item = models.ScannerItem(**row)
         db.add(db_item)
+        scanner_rollups.apply_status_counts(db, step_id, {row["winner"]: 1})
         db.commit()
+        scanner_stats.mark_items_changed()
         db.refresh(db_item)
+        scanner_live.hub.publish(db, step_id, {db_item.winner: 1}, [db_item.id])
         return db_item
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"ERROR adding scanner item: {e}")
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/steps/{step_id}/items/batch", response_model=schemas.ScannerItemBatchResponse)
+def add_scanner_items_batch(step_id: int, items: List[schemas.ScannerItemCreate], db: Session = Depends(database.get_db)):
+    """Carga todas las piezas de un estudio en una transacción y retorna las estadísticas actualizadas."""
+    step = db.query(models.ScannerStep.id).filter(models.ScannerStep.id == step_id).first()
+    if not step:
+        raise HTTPException(status_code=404, detail="Scanner Step not found")
+
+    rows = build_scanner_item_rows(step_id, items, db) if items else []
+    try:
+        new_counts = Counter(row["winner"] for row in rows)
+        item_ids = []
+        if rows:
+            # Los ids propios de esta alta (no el máximo del estudio, que puede incluir altas concurrentes)
+            item_ids = db.execute(insert(models.ScannerItem).returning(models.ScannerItem.id), rows).scalars().all()
+            scanner_rollups.apply_status_counts(db, step_id, new_counts)
+        db.commit()
+        scanner_stats.mark_items_changed()
+    except Exception as e:
+        print(f"ERROR adding scanner items batch: {e}")
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+    scanner_live.hub.publish(db, step_id, new_counts, item_ids)
+    counts = scanner_stats.status_counts(db, models.ScannerItem.step_id == step_id)
+    return {"inserted": len(rows), "stats": scanner_stats.stats_from_status_counts(counts)}
+
+@router.post("/steps/{step_id}/import")
+def import_scanner_file(step_id: int, file: UploadFile = File(...), db: Session = Depends(database.get_db)):
+    """Carga el archivo de piezas exportado por el escáner (CSV/TSV) en el estudio."""
+    step = db.query(models.ScannerStep).filter(models.ScannerStep.id == step_id).first()
+    if not step:
+        raise HTTPException(status_code=404, detail="Scanner Step not found")
+
+    try:
+        report = scanner_import.import_scanner_pieces(db, step, file.file)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"ERROR importing scanner file: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    scanner_live.hub.reload(db, step_id)
+    counts = scanner_stats.status_counts(db, models.ScannerItem.step_id == step_id)
+    report["stats"] = scanner_stats.stats_from_status_counts(counts)
+    return report
+
+@router.get("/steps/{step_id}/live")
+async def stream_scanner_stats(step_id: int, request: Request):
+    """Estadísticas del estudio en vivo (Server-Sent Events): se emiten tras cada pieza agregada.
+
+    Los eventos traen conteos y precisión sin `weighted` (ver StepFeed.snapshot).
+    """
+    def subscribe():
+        db = database.SessionLocal()
+        try:
+            if not db.query(models.ScannerStep.id).filter(models.ScannerStep.id == step_id).first():
+                raise HTTPException(status_code=404, detail="Scanner Step not found")
+            return scanner_live.hub.subscribe(db, step_id, loop)
+        finally:
+            db.close()
+
+    loop = asyncio.get_running_loop()
+    subscription = await run_in_threadpool(subscribe)
+    if subscription is None:
+        raise HTTPException(status_code=503, detail="Demasiados espectadores en vivo")
+    queue, initial = subscription
+
+    async def events():
+        try:
+            async for event in scanner_live.stream_events(request, queue, initial):
+                yield event
+        finally:
+            scanner_live.hub.unsubscribe(step_id, queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 @router.get("/steps/{step_id}/stats", response_model=schemas.ScannerStats)
 def get_scanner_stats(step_id: int, db: Session = Depends(database.get_db)):
-    step = db.query(models.ScannerStep).options(
-        joinedload(models.ScannerStep.items).joinedload(models.ScannerItem.inspector_grade),
-        joinedload(models.ScannerStep.items).joinedload(models.ScannerItem.scanner_grade)
-    ).filter(models.ScannerStep.id == step_id).first()
-    
+    step = db.query(models.ScannerStep.id).filter(models.ScannerStep.id == step_id).first()
     if not step:
          raise HTTPException(status_code=404, detail="Scanner Step not found")
-         
-    total = len(step.items)
-    if total == 0:
-        return schemas.ScannerStats(
-            pieces_evaluated=0, pieces_in_grade=0, pieces_over_grade=0, pieces_under_grade=0,
-            assertiveness=0.0, error=0.0
-        )
-    
-    in_grade = 0
-    over_grade = 0
-    under_grade = 0
-    
-    for item in step.items:
-        # Calcular al vuelo o confiar en la columna 'winner' si está poblada correctamente
-        if item.inspector_grade.grade_rank == item.scanner_grade.grade_rank:
-            in_grade += 1
-        elif item.scanner_grade.grade_rank < item.inspector_grade.grade_rank:
-            over_grade += 1
-        else:
-            under_grade += 1
-            
-    return schemas.ScannerStats(
-        pieces_evaluated=total,
-        pieces_in_grade=in_grade,
-        pieces_over_grade=over_grade,
-        pieces_under_grade=under_grade,
-        assertiveness=(in_grade / total),
-        error=((over_grade + under_grade) / total)
-    )
+
+    # Conteo por el estado ya guardado en cada pieza ("Match"/"Overgrade"/"Undergrade")
+    counts = scanner_stats.status_counts(db, models.ScannerItem.step_id == step_id)
+    stats = scanner_stats.stats_from_status_counts(counts)
+    stats.weighted = scanner_value.weighted_stats(db, models.ScannerItem.step_id == step_id)
+    return stats
+
+def step_range_criteria(
+    machine: Optional[str],
+    date_from: Optional[date],
+    date_to: Optional[date],
+    product_name: Optional[str] = None,
+    area: Optional[str] = None,
+    supervisor: Optional[str] = None,
+):
+    criteria = []
+    if machine:
+        criteria.append(models.ScannerStep.machine == machine)
+    if product_name:
+        criteria.append(models.ScannerStep.product_name == product_name)
+    if area:
+        criteria.append(models.ScannerStep.area == area)
+    if supervisor:
+        criteria.append(models.ScannerStep.supervisor == supervisor)
+    if date_from:
+        criteria.append(models.ScannerStep.date >= datetime.combine(date_from, time.min))
+    if date_to:
+        criteria.append(models.ScannerStep.date < datetime.combine(date_to + timedelta(days=1), time.min))
+    return criteria
+
+@router.get("/stats", response_model=schemas.ScannerStats)
+def get_scanner_stats_range(
+    machine: Optional[str] = None,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: Session = Depends(database.get_db)
+):
+    """Precisión del escáner sobre todos los estudios de una máquina/rango de fechas en una sola consulta."""
+    criteria = step_range_criteria(machine, date_from, date_to)
+    counts = scanner_stats.status_counts(db, *criteria, join_steps=True)
+    stats = scanner_stats.stats_from_status_counts(counts)
+    stats.weighted = scanner_value.weighted_stats(db, *criteria)
+    return stats
+
+@router.get("/confusion-matrix", response_model=schemas.ConfusionMatrix)
+def get_confusion_matrix(
+    product_name: Optional[str] = None,
+    machine: Optional[str] = None,
+    area: Optional[str] = None,
+    supervisor: Optional[str] = None,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: Session = Depends(database.get_db)
+):
+    """Matriz grado inspector x grado escáner de los estudios filtrados, con precisión y recall por grado."""
+    criteria = step_range_criteria(machine, date_from, date_to, product_name, area, supervisor)
+    filters = (product_name, machine, area, supervisor, date_from, date_to)
+    counts = scanner_stats.confusion_cache.get(db, filters, *criteria)
+
+    grade_ids = {gid for i, s, _ in counts for gid in (i, s)}
+    grade_filter = models.Grade.id.in_(grade_ids)
+    if product_name:
+        # Incluir todos los grados del producto aunque no tengan piezas, para que la matriz sea completa
+        product_ids = db.query(models.Product.id).filter(models.Product.name == product_name)
+        grade_filter = or_(grade_filter, models.Grade.product_id.in_(product_ids))
+    grades = db.query(models.Grade).filter(grade_filter).order_by(
+        models.Grade.grade_rank, models.Grade.id
+    ).all()
+    return scanner_stats.build_confusion_matrix(counts, grades)
+
+@router.get("/trends", response_model=schemas.ScannerTrends)
+def get_scanner_trends(
+    machine: Optional[str] = None,
+    product_name: Optional[str] = None,
+    shift: Optional[str] = None,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    window: int = 7,
+    db: Session = Depends(database.get_db)
+):
+    """Serie diaria de precisión del escáner con promedio móvil de `window` días, desde scanner_rollups.
+
+    El costo depende del rango pedido (por defecto 90 días), no del largo del historial.
+    """
+    window = max(1, min(window, 90))
+    date_to = date_to or date.today()
+    date_from = date_from or (date_to - timedelta(days=89))
+    rollup = models.ScannerRollup
+
+    # Se leen también los días previos al rango para que la primera media móvil sea completa
+    criteria = [rollup.day >= date_from - timedelta(days=window - 1), rollup.day <= date_to]
+    if machine:
+        criteria.append(rollup.machine == machine)
+    if product_name:
+        criteria.append(rollup.product_name == product_name)
+    if shift:
+        criteria.append(rollup.shift == shift)
+
+    rows = db.query(
+        rollup.day,
+        func.sum(rollup.pieces_evaluated),
+        func.sum(rollup.pieces_in_grade),
+        func.sum(rollup.pieces_over_grade),
+        func.sum(rollup.pieces_under_grade),
+    ).filter(*criteria).group_by(rollup.day).order_by(rollup.day).all()
+
+    points = []
+    trailing = deque()
+    trailing_evaluated = trailing_in_grade = 0
+    for day, evaluated, in_grade, over_grade, under_grade in rows:
+        trailing.append((day, evaluated, in_grade))
+        trailing_evaluated += evaluated
+        trailing_in_grade += in_grade
+        while trailing[0][0] <= day - timedelta(days=window):
+            _, old_evaluated, old_in_grade = trailing.popleft()
+            trailing_evaluated -= old_evaluated
+            trailing_in_grade -= old_in_grade
+        if day < date_from:
+            continue
+
+        stats = scanner_stats.build_stats(evaluated, in_grade, over_grade, under_grade)
+        points.append({
+            "day": day,
+            "pieces_evaluated": evaluated,
+            "pieces_in_grade": in_grade,
+            "pieces_over_grade": over_grade,
+            "pieces_under_grade": under_grade,
+            "assertiveness": stats.assertiveness,
+            "rolling_assertiveness": (trailing_in_grade / trailing_evaluated) if trailing_evaluated else 0.0,
+        })
+
+    return {"window": window, "date_from": date_from, "date_to": date_to, "points": points}
+
+@router.post("/optimize", response_model=schemas.CutOptimizationReport)
+def optimize_scanner_cuts(
+    step_id: Optional[int] = None,
+    machine: Optional[str] = None,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    max_steps: int = cut_optimizer.MAX_UPGRADE_STEPS,
+    db: Session = Depends(database.get_db),
+    current_user = Depends(get_current_admin_user)
+):
+    """Recalcula grado optimizado y largo de corte de un estudio o de un rango de estudios (p. ej. al cambiar precios)."""
+    if step_id is not None:
+        criteria = [models.ScannerItem.step_id == step_id]
+    elif date_from or date_to or machine:
+        criteria = step_range_criteria(machine, date_from, date_to)
+    else:
+        raise HTTPException(status_code=400, detail="Indique step_id o un rango de fechas")
+
+    try:
+        return cut_optimizer.run_optimization(db, *criteria, max_steps=max(1, min(max_steps, 10)))
+    except Exception as e:
+        print(f"ERROR optimizing scanner cuts: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import date, datetime
+from datetime import date as Date # the `date` field name shadows the type inside some models
 
 # --- Base Models ---
 
@@ -72,15 +73,40 @@ class InspectionUpdate(BaseModel):
     class Config:
         from_attributes = True
 
+class InspectionTotalsResponse(BaseModel):
+    total_pieces: int
+    rejected_pieces: int
+    best_grade_pieces: int
+    rejection_percentage: float
+    best_grade_percentage: float
+
+    class Config:
+        from_attributes = True
+
 class InspectionResponse(InspectionBase):
     id: int
-    date: date
-    production_date: Optional[date] = None
+    date: Optional[Date] = None # Legacy rows may lack a date; they sort after dated rows (desc)
+    production_date: Optional[Date] = None
     market: MarketBase # Adjust if MarketBase is not fully compatible or circular
+    totals: Optional[InspectionTotalsResponse] = None # Progress figures, None until results are recorded
     
     class Config:
         from_attributes = True
 
+class InspectionPage(BaseModel):
+    items: List[InspectionResponse]
+    next_cursor: Optional[str] = None # None when there are no more pages
+
+class LotLookup(BaseModel):
+    id: int
+    lot: str
+    type: Optional[str] = None
+    date: Optional[Date] = None
+    product_name: str
+
+    class Config:
+        from_attributes = True
+
 class InspectionResultBase(BaseModel):
     grade_id: int
     defect_id: Optional[int] = None
@@ -112,6 +138,53 @@ class InspectionResultResponse(InspectionResultBase):
     class Config:
         from_attributes = True
 
+class GradeSummaryRow(BaseModel):
+    grade_id: int
+    name: str
+    grade_rank: Optional[int] = None
+    count: int
+    percentage: float
+
+class DefectSummaryRow(BaseModel):
+    defect_id: int
+    name: str
+    count: int
+    percentage: float
+
+class GradeDefectSummaryRow(BaseModel):
+    grade_id: int
+    grade_name: str
+    defect_id: int
+    defect_name: str
+    count: int
+    percentage: float # Relative to the grade total
+
+class InspectionSummary(BaseModel):
+    inspection_id: int
+    total_pieces: int
+    rejected_pieces: int
+    rejection_percentage: float
+    grades: List[GradeSummaryRow] = []
+    defects: List[DefectSummaryRow] = []
+    grade_defects: List[GradeDefectSummaryRow] = []
+
+class DefectParetoRow(BaseModel):
+    defect_id: int
+    name: str
+    count: int
+    percentage: float # Of all pieces in the filtered inspections
+    share_of_defects: float
+    cumulative_percentage: float
+
+class DefectParetoResponse(BaseModel):
+    total_pieces: int
+    defect_pieces: int
+    items: List[DefectParetoRow] = []
+
+class GradeDistributionResponse(BaseModel):
+    total_pieces: int
+    items: List[GradeSummaryRow] = []
+
 # --- User Schemas ---
 
 class UserBase(BaseModel):
@@ -168,6 +241,9 @@ class ScannerItemResponse(ScannerItemBase):
     inspector_grade: Optional[GradeBase] = None
     scanner_grade: Optional[GradeBase] = None
     winner: Optional[str] = None
+    original_length: Optional[float] = None
+    optimized_grade_id: Optional[int] = None
+    cut_length: Optional[float] = None
     
     class Config:
         from_attributes = True
@@ -191,13 +267,70 @@ class ScannerStepCreate(ScannerStepBase):
 
 class ScannerStepResponse(ScannerStepBase):
     id: int
-    date: datetime
+    date: Optional[datetime] = None
     items: List[ScannerItemResponse] = []
     market: Optional[MarketBase] = None
     
     class Config:
         from_attributes = True
 
+class ScannerStepSummary(BaseModel):
+    id: int
+    date: Optional[datetime] = None # Estudios antiguos pueden no tener fecha
+    market_id: Optional[int] = None
+    supervisor: Optional[str] = None
+    shift: Optional[str] = None
+    area: Optional[str] = None
+    machine: Optional[str] = None
+    responsible: Optional[str] = None
+    product_name: Optional[str] = None
+    pieces_evaluated: int
+    pieces_in_grade: int
+    pieces_over_grade: int
+    pieces_under_grade: int
+    assertiveness: float
+
+class ScannerStepSummaryPage(BaseModel):
+    items: List[ScannerStepSummary]
+    next_cursor: Optional[str] = None # None when there are no more pages
+
+class ScannerTrendPoint(BaseModel):
+    day: date
+    pieces_evaluated: int
+    pieces_in_grade: int
+    pieces_over_grade: int
+    pieces_under_grade: int
+    assertiveness: float
+    rolling_assertiveness: float
+
+class ScannerTrends(BaseModel):
+    window: int
+    date_from: date
+    date_to: date
+    points: List[ScannerTrendPoint]
+
+class CutOptimizationReport(BaseModel):
+    items: int
+    items_evaluated: int  # piezas con grado, dimensiones y precio
+    items_upgraded: int
+    value_before: float
+    value_after: float
+    value_recovered: float
+    recovery_ratio: float
+
+class ScannerWeightedStats(BaseModel):
+    volume_evaluated: float  # m³
+    volume_in_grade: float
+    volume_over_grade: float
+    volume_under_grade: float
+    volume_assertiveness: float
+    value_inspector: float  # $$ según el grado del inspector
+    value_scanner: float    # $$ según el grado del escáner
+    value_overgrade_loss: float
+    value_undergrade_loss: float
+    pieces_without_dimensions: int
+    pieces_without_price: int
+
 class ScannerStats(BaseModel):
     pieces_evaluated: int
     pieces_in_grade: int
@@ -205,5 +338,25 @@ class ScannerStats(BaseModel):
     pieces_under_grade: int
     assertiveness: float
     error: float
+    weighted: Optional[ScannerWeightedStats] = None
+
+class ScannerItemBatchResponse(BaseModel):
+    inserted: int
+    stats: ScannerStats
+
+class ConfusionMatrixGrade(BaseModel):
+    id: int
+    name: Optional[str] = None
+    grade_rank: Optional[int] = None
+    inspector_pieces: int
+    scanner_pieces: int
+    precision: float
+    recall: float
+
+class ConfusionMatrix(BaseModel):
+    grades: List[ConfusionMatrixGrade]
+    matrix: List[List[int]]  # filas: grado del inspector, columnas: grado del escáner
+    pieces_evaluated: int
+    assertiveness: float
 
 
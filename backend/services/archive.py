@@ -0,0 +1,223 @@
+import os
+import glob
+import re
+from datetime import date
+from sqlalchemy import create_engine, select, delete, func
+from sqlalchemy.orm import Session
+from database import models
+from config import settings
+from services import scanner_stats
+
+# Retención: las inspecciones (con sus resultados y totales) y los estudios de escáner (con sus
+# piezas) anteriores a la fecha de corte se mueven a una base SQLite por año en ARCHIVE_DIR.
+# Cada bloque se copia y confirma en el archivo antes de borrarse de la base activa, en
+# transacciones cortas para no bloquear a los clasificadores.
+
+DEFAULT_CHUNK_SIZE = 200
+
+ARCHIVE_TABLES = [
+    models.Inspection.__table__,
+    models.InspectionResult.__table__,
+    models.InspectionTotals.__table__,
+    models.ScannerStep.__table__,
+    models.ScannerItem.__table__,
+]
+
+_writers = {}
+
+
+def archive_path(year: int) -> str:
+    return os.path.join(settings.ARCHIVE_DIR, f"grading_archive_{year}.db")
+
+
+def archive_years():
+    """Años con archivo disponible, ascendente."""
+    years = []
+    for path in glob.glob(os.path.join(settings.ARCHIVE_DIR, "grading_archive_*.db")):
+        match = re.search(r"grading_archive_(\d{4})\.db$", path)
+        if match:
+            years.append(int(match.group(1)))
+    return sorted(years)
+
+
+def _writer_engine(year: int):
+    if year not in _writers:
+        os.makedirs(settings.ARCHIVE_DIR, exist_ok=True)
+        engine = create_engine(f"sqlite:///{archive_path(year)}")
+        models.Base.metadata.create_all(bind=engine, tables=ARCHIVE_TABLES)
+        _writers[year] = engine
+    return _writers[year]
+
+
+def open_archive_readonly(year: int):
+    """Engine de solo lectura sobre el archivo de un año (el archivo no se modifica desde consultas)."""
+    path = os.path.abspath(archive_path(year)).replace("\\", "/")
+    return create_engine(f"sqlite:///file:{path}?mode=ro&uri=true")
+
+
+def _copy_rows(conn, table, rows):
+    if rows:
+        # OR REPLACE: si un bloque se copió pero no alcanzó a borrarse, reintentar es seguro
+        conn.execute(table.insert().prefix_with("OR REPLACE"), rows)
+
+
+def _fetch(db: Session, table, column, ids):
+    return [dict(row) for row in db.execute(select(table).where(column.in_(ids))).mappings()]
+
+
+def _archive_inspection_chunk(db: Session, rows):
+    by_year = {}
+    for row in rows:
+        by_year.setdefault(row["date"].year, []).append(row)
+
+    for year, year_rows in by_year.items():
+        ids = [row["id"] for row in year_rows]
+        results = _fetch(db, models.InspectionResult.__table__, models.InspectionResult.inspection_id, ids)
+        totals = _fetch(db, models.InspectionTotals.__table__, models.InspectionTotals.inspection_id, ids)
+        with _writer_engine(year).begin() as conn:
+            _copy_rows(conn, models.Inspection.__table__, year_rows)
+            _copy_rows(conn, models.InspectionResult.__table__, results)
+            _copy_rows(conn, models.InspectionTotals.__table__, totals)
+
+    ids = [row["id"] for row in rows]
+    db.execute(delete(models.InspectionResult).where(models.InspectionResult.inspection_id.in_(ids)))
+    db.execute(delete(models.InspectionTotals).where(models.InspectionTotals.inspection_id.in_(ids)))
+    db.execute(delete(models.Inspection).where(models.Inspection.id.in_(ids)))
+    db.commit()
+
+
+def _archive_step_chunk(db: Session, rows):
+    by_year = {}
+    for row in rows:
+        by_year.setdefault(row["date"].year, []).append(row)
+
+    for year, year_rows in by_year.items():
+        ids = [row["id"] for row in year_rows]
+        items = _fetch(db, models.ScannerItem.__table__, models.ScannerItem.step_id, ids)
+        with _writer_engine(year).begin() as conn:
+            _copy_rows(conn, models.ScannerStep.__table__, year_rows)
+            _copy_rows(conn, models.ScannerItem.__table__, items)
+
+    ids = [row["id"] for row in rows]
+    db.execute(delete(models.ScannerItem).where(models.ScannerItem.step_id.in_(ids)))
+    db.execute(delete(models.ScannerStep).where(models.ScannerStep.id.in_(ids)))
+    db.commit()
+    scanner_stats.mark_items_changed()
+
+
+def run_archive(db: Session, cutoff: date, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """Mueve al archivo todo lo anterior a `cutoff`. Retorna conteos de inspecciones y estudios movidos.
+
+    Las inspecciones no tienen un estado de cierre: una inspección queda cerrada cuando termina su día,
+    por eso el corte no puede ser posterior a hoy (la jornada en curso nunca se archiva).
+    """
+    if cutoff > date.today():
+        raise ValueError("La fecha de corte no puede ser posterior a hoy: solo se archivan jornadas cerradas")
+    report = {"inspections": 0, "scanner_steps": 0, "years": set()}
+
+    inspections = models.Inspection.__table__
+    while True:
+        rows = [dict(row) for row in db.execute(
+            select(inspections)
+            .where(inspections.c.date < cutoff)
+            .order_by(inspections.c.id)
+            .limit(chunk_size)
+        ).mappings()]
+        db.rollback()  # Liberar la transacción de lectura entre bloques
+        if not rows:
+            break
+        _archive_inspection_chunk(db, rows)
+        report["inspections"] += len(rows)
+        report["years"].update(row["date"].year for row in rows)
+
+    steps = models.ScannerStep.__table__
+    while True:
+        rows = [dict(row) for row in db.execute(
+            select(steps)
+            .where(steps.c.date < cutoff)
+            .order_by(steps.c.id)
+            .limit(chunk_size)
+        ).mappings()]
+        db.rollback()
+        if not rows:
+            break
+        _archive_step_chunk(db, rows)
+        report["scanner_steps"] += len(rows)
+        report["years"].update(row["date"].year for row in rows)
+
+    report["years"] = sorted(report["years"])
+    return report
+
+
+def _years_in_range(start_date=None, end_date=None):
+    for year in archive_years():
+        if start_date and year < date.fromisoformat(str(start_date)[:10]).year:
+            continue
+        if end_date and year > date.fromisoformat(str(end_date)[:10]).year:
+            continue
+        yield year
+
+
+def _iter_archive_query(query, start_date=None, end_date=None):
+    """Ejecuta `query` (solo lectura) en los archivos de los años que cruzan el rango pedido."""
+    for year in _years_in_range(start_date, end_date):
+        engine = open_archive_readonly(year)
+        try:
+            with engine.connect() as conn:
+                for row in conn.execute(query):
+                    yield row
+        finally:
+            engine.dispose()
+
+
+def _inspection_criteria(start_date=None, end_date=None, type=None):
+    inspections = models.Inspection.__table__
+    criteria = []
+    if start_date:
+        criteria.append(inspections.c.date >= start_date)
+    if end_date:
+        criteria.append(inspections.c.date <= end_date)
+    if type and type != 'all':
+        criteria.append(inspections.c.type == type)
+    return criteria
+
+
+def _step_criteria(start_date=None, end_date=None):
+    steps = models.ScannerStep.__table__
+    criteria = []
+    if start_date:
+        criteria.append(func.date(steps.c.date) >= str(start_date))
+    if end_date:
+        criteria.append(func.date(steps.c.date) <= str(end_date))
+    return criteria
+
+
+def iter_archived_inspections(start_date=None, end_date=None, type=None):
+    """Recorre inspecciones archivadas (solo lectura) de los años que cruzan el rango pedido."""
+    inspections = models.Inspection.__table__
+    query = select(inspections).where(*_inspection_criteria(start_date, end_date, type)).order_by(
+        inspections.c.date, inspections.c.id
+    )
+    return _iter_archive_query(query, start_date, end_date)
+
+
+def iter_archived_inspection_results(start_date=None, end_date=None, type=None):
+    """Celdas archivadas con la fecha, tipo, producto y lote de su inspección."""
+    inspections, results = models.Inspection.__table__, models.InspectionResult.__table__
+    query = select(
+        results, inspections.c.date, inspections.c.type, inspections.c.product_name, inspections.c.lot
+    ).join(inspections, results.c.inspection_id == inspections.c.id).where(
+        *_inspection_criteria(start_date, end_date, type)
+    ).order_by(inspections.c.date, inspections.c.id, results.c.id)
+    return _iter_archive_query(query, start_date, end_date)
+
+
+def iter_archived_scanner_items(start_date=None, end_date=None):
+    """Piezas de escáner archivadas con el encabezado de su estudio."""
+    steps, items = models.ScannerStep.__table__, models.ScannerItem.__table__
+    query = select(
+        items, steps.c.date, steps.c.supervisor, steps.c.machine, steps.c.product_name
+    ).join(steps, items.c.step_id == steps.c.id).where(
+        *_step_criteria(start_date, end_date)
+    ).order_by(steps.c.date, steps.c.id, items.c.item_number)
+    return _iter_archive_query(query, start_date, end_date)
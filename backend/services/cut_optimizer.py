@@ -0,0 +1,164 @@
+import numpy as np
+from sqlalchemy import select, func, update
+from sqlalchemy.orm import Session
+from database import models
+from services import scanner_value
+
+# Recuperación de valor por despunte: una pieza puede recortarse a un largo habilitado menor para
+# subir de grado. Sin la posición de los defectos, el modelo supone que cada paso hacia el largo
+# habilitado inmediatamente menor quita el defecto de punta y mejora el grado en un rango
+# (hasta MAX_UPGRADE_STEPS). Para cada pieza se elige la alternativa de mayor valor según la tabla
+# de precios por grado y mercado; el grado del inspector es el grado real de la pieza.
+LENGTH_CATALOG = "length"
+MAX_UPGRADE_STEPS = 3
+# Largos de catálogo menores a este valor están en metros; las piezas se guardan en mm
+MAX_LENGTH_IN_METERS = 100
+UPDATE_CHUNK_SIZE = 5000
+
+
+def allowed_lengths(db: Session):
+    """Largos habilitados (mm, ordenados) desde el catálogo 'length'."""
+    lengths = set()
+    for (name,) in db.query(models.CatalogItem.name).filter(
+        models.CatalogItem.category == LENGTH_CATALOG, models.CatalogItem.active == True
+    ):
+        try:
+            value = float(str(name).replace(",", "."))
+        except ValueError:
+            continue
+        lengths.add(value * 1000 if value < MAX_LENGTH_IN_METERS else value)
+    return np.array(sorted(lengths), dtype=float)
+
+
+def grade_rank_table(db: Session):
+    """Matrices densas para resolver grados en bloque: rank[grade_id], product[grade_id] y
+    grade_id[product_id, rank] (-1 donde no existe)."""
+    grades = db.query(models.Grade.id, models.Grade.product_id, models.Grade.grade_rank).all()
+    size = max((g[0] for g in grades), default=0) + 1
+    ranks = np.full(size, -1)
+    products = np.full(size, -1)
+    max_product = max((g[1] or 0 for g in grades), default=0) + 1
+    max_rank = max((g[2] or 0 for g in grades), default=0) + 1
+    by_rank = np.full((max_product, max_rank), -1)
+    for grade_id, product_id, grade_rank in grades:
+        if product_id is None or grade_rank is None:
+            continue
+        ranks[grade_id] = grade_rank
+        products[grade_id] = product_id
+        # Con rangos repetidos en un producto se usa el de menor id
+        if by_rank[product_id, grade_rank] == -1:
+            by_rank[product_id, grade_rank] = grade_id
+    return ranks, products, by_rank
+
+
+def _item_columns(db: Session, *criteria):
+    item, step = models.ScannerItem, models.ScannerStep
+    stmt = select(
+        item.id,
+        step.market_id,
+        item.inspector_grade_id,
+        func.coalesce(item.thickness, step.default_thickness),
+        func.coalesce(item.width, step.default_width),
+        # El largo original se conserva en la primera corrida; las siguientes parten de él
+        func.coalesce(item.original_length, item.length, step.default_length),
+    ).select_from(item).join(step, item.step_id == step.id).where(*criteria)
+    rows = db.execute(stmt).all()
+    data = np.array(rows, dtype=float).reshape(len(rows), 6)
+    return {
+        "id": data[:, 0].astype(int),
+        "market_id": data[:, 1],
+        "grade_id": data[:, 2],
+        "thickness": data[:, 3],
+        "width": data[:, 4],
+        "original_length": data[:, 5],
+    }
+
+
+def optimize(columns, lengths, ranks, products, by_rank, prices, max_steps: int = MAX_UPGRADE_STEPS):
+    """Evalúa todas las piezas a la vez. Retorna (grado optimizado, largo de corte, valor base, valor optimizado);
+    el grado es -1 y el largo nan en piezas sin datos suficientes."""
+    n = len(columns["id"])
+    grade_ids = columns["grade_id"]
+    original = columns["original_length"]
+    section = columns["thickness"] * columns["width"]
+
+    known = ~np.isnan(grade_ids) & ~np.isnan(original) & ~np.isnan(section)
+    safe_grade = np.where(known & (grade_ids < len(ranks)), grade_ids, 0).astype(int)
+    rank = np.where(known, ranks[safe_grade], -1)
+    product = np.where(known, products[safe_grade], -1)
+    known &= rank > 0
+
+    def value(grade, length):
+        price = scanner_value.lookup_prices(prices, grade.astype(float), columns["market_id"])
+        return np.nan_to_num(section * length * price / scanner_value.MM3_PER_M3, nan=0.0)
+
+    # Sin precio para el grado real no hay valor base contra el cual comparar
+    base_price = scanner_value.lookup_prices(prices, np.where(known, grade_ids, -1.0), columns["market_id"])
+    known &= ~np.isnan(base_price)
+    base_value = np.where(known, value(np.where(known, grade_ids, -1), original), 0.0)
+    best_grade = np.where(known, grade_ids, -1).astype(int)
+    best_length = np.where(known, original, np.nan)
+    best_value = base_value.copy()
+
+    if len(lengths):
+        # Índice del mayor largo habilitado que cabe en la pieza
+        top = np.searchsorted(lengths, np.nan_to_num(original, nan=-1.0), side="right") - 1
+        for steps in range(1, max_steps + 1):
+            index = top - steps
+            target_rank = rank - steps
+            valid = known & (index >= 0) & (target_rank >= 1)
+            if not valid.any():
+                continue
+            candidate_grade = np.full(n, -1)
+            candidate_grade[valid] = by_rank[product[valid], target_rank[valid]]
+            valid &= candidate_grade >= 0
+            candidate_length = np.where(valid, lengths[np.clip(index, 0, None)], np.nan)
+            candidate_value = np.where(valid, value(candidate_grade, candidate_length), 0.0)
+            better = valid & (candidate_value > best_value)
+            best_grade = np.where(better, candidate_grade, best_grade)
+            best_length = np.where(better, candidate_length, best_length)
+            best_value = np.where(better, candidate_value, best_value)
+
+    return best_grade, best_length, base_value, best_value
+
+
+def run_optimization(db: Session, *criteria, max_steps: int = MAX_UPGRADE_STEPS) -> dict:
+    """Optimiza y guarda optimized_grade_id/cut_length/original_length de las piezas que cumplen `criteria`."""
+    columns = _item_columns(db, *criteria)
+    ranks, products, by_rank = grade_rank_table(db)
+    best_grade, best_length, base_value, best_value = optimize(
+        columns, allowed_lengths(db), ranks, products, by_rank, scanner_value.price_table(db), max_steps
+    )
+
+    evaluated = best_grade >= 0
+    upgraded = evaluated & (best_grade != np.nan_to_num(columns["grade_id"], nan=-1).astype(int))
+    rows = [
+        {
+            "id": int(item_id),
+            "optimized_grade_id": int(grade) if grade >= 0 else None,
+            "cut_length": float(length) if grade >= 0 else None,
+            "original_length": float(original) if not np.isnan(original) else None,
+        }
+        for item_id, grade, length, original in zip(
+            columns["id"], best_grade, best_length, columns["original_length"]
+        )
+    ]
+    try:
+        for start in range(0, len(rows), UPDATE_CHUNK_SIZE):
+            db.execute(update(models.ScannerItem), rows[start:start + UPDATE_CHUNK_SIZE])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    value_before = float(base_value.sum())
+    value_after = float(best_value.sum())
+    return {
+        "items": len(rows),
+        "items_evaluated": int(evaluated.sum()),
+        "items_upgraded": int(upgraded.sum()),
+        "value_before": value_before,
+        "value_after": value_after,
+        "value_recovered": value_after - value_before,
+        "recovery_ratio": (value_after / value_before) if value_before else 0.0,
+    }
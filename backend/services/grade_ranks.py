@@ -0,0 +1,64 @@
+import threading
+from sqlalchemy.orm import Session
+from database import models
+
+
+def normalize_grade_name(name) -> str:
+    return str(name).strip().upper()
+
+
+class GradeRankCache:
+    """Mapas en memoria de los grados (grade_id -> grade_rank y nombre -> grade_id por producto).
+
+    Se invalida cuando cambian los datos maestros de grados.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ranks = None
+        self._ids_by_name = None
+        # Cambia en cada invalidación: una carga iniciada antes no se guarda
+        self._generation = 0
+
+    def _load(self, db: Session):
+        with self._lock:
+            generation = self._generation
+        ranks = {}
+        ids_by_name = {}
+        for grade_id, product_id, name, grade_rank in db.query(
+            models.Grade.id, models.Grade.product_id, models.Grade.name, models.Grade.grade_rank
+        ):
+            ranks[grade_id] = grade_rank
+            if name is not None:
+                ids_by_name.setdefault(product_id, {})[normalize_grade_name(name)] = grade_id
+        with self._lock:
+            if self._generation == generation:
+                self._ranks = ranks
+                self._ids_by_name = ids_by_name
+        return ranks, ids_by_name
+
+    def get_ranks(self, db: Session, grade_ids=()):
+        """Retorna el mapa completo; recarga una vez si falta algún id pedido (grado creado en otro proceso)."""
+        ranks = self._ranks
+        if ranks is None or any(grade_id not in ranks for grade_id in grade_ids):
+            ranks = self._load(db)[0]
+        return ranks
+
+    def get_ids_by_name(self, db: Session, product_id: int, names=()):
+        """Nombre normalizado -> grade_id para los grados de un producto; recarga una vez si falta algún
+        nombre pedido (grado creado en otro proceso)."""
+        ids_by_name = self._ids_by_name
+        if ids_by_name is None or any(
+            normalize_grade_name(name) not in ids_by_name.get(product_id, {}) for name in names
+        ):
+            ids_by_name = self._load(db)[1]
+        return ids_by_name.get(product_id, {})
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._ranks = None
+            self._ids_by_name = None
+
+
+grade_ranks = GradeRankCache()
@@ -0,0 +1,244 @@
+import csv
+import io
+from datetime import datetime, date
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from database import models
+from services import inspection_totals
+import schemas
+
+# Formato del archivo: una fila por celda de resultado. Las columnas de la inspección se repiten en
+# cada fila y el lote agrupa las filas de una misma inspección; la primera aparición del lote la crea.
+INSPECTION_FIELDS = list(schemas.InspectionCreate.model_fields.keys())
+RESULT_FIELDS = list(schemas.InspectionResultCreate.model_fields.keys())
+INT_FIELDS = {"market_id", "pieces_inspected", "grade_id", "defect_id", "pieces_count"}
+
+DEFAULT_CHUNK_SIZE = 5000
+# Los lotes de un bloque van como parámetros de un IN (...): SQLite admite hasta 32766 por sentencia
+MAX_CHUNK_SIZE = 30000
+MAX_REPORTED_ERRORS = 1000
+
+
+def iter_csv_rows(binary_file):
+    """Genera dicts fila a fila desde un CSV binario sin cargarlo completo en memoria."""
+    text = io.TextIOWrapper(binary_file, encoding="utf-8-sig", newline="")
+    try:
+        for row in csv.DictReader(text):
+            yield row
+    finally:
+        text.detach()
+
+
+def iter_xlsx_rows(binary_file):
+    """Genera dicts desde la primera hoja de un XLSX usando openpyxl en modo de solo lectura (streaming)."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(binary_file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = [str(h).strip() if h is not None else "" for h in header]
+        for values in rows:
+            if values is None or all(v is None for v in values):
+                continue
+            yield dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+def iter_rows(binary_file, filename: str):
+    if filename.lower().endswith((".xlsx", ".xlsm")):
+        return iter_xlsx_rows(binary_file)
+    return iter_csv_rows(binary_file)
+
+
+def _normalize(field, value):
+    """Convierte valores de celda (Excel entrega números y fechas) al tipo que esperan los esquemas."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        if value == "":
+            return None
+        return value
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if field in INT_FIELDS:
+        return value
+    return str(value)
+
+
+def _parse_row(raw):
+    inspection_data = {f: _normalize(f, raw.get(f)) for f in INSPECTION_FIELDS}
+    inspection_data = {k: v for k, v in inspection_data.items() if v is not None}
+    # Los lotes vacíos no pueden agrupar resultados
+    if not inspection_data.get("lot"):
+        raise ValueError("lot: requerido para agrupar los resultados")
+    inspection = schemas.InspectionCreate(**inspection_data)
+
+    result_data = {f: _normalize(f, raw.get(f)) for f in RESULT_FIELDS}
+    result = schemas.InspectionResultCreate(**{k: v for k, v in result_data.items() if v is not None})
+    return inspection, result
+
+
+def _format_error(error):
+    if isinstance(error, ValidationError):
+        return "; ".join(f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in error.errors())
+    return str(error)
+
+
+class InspectionImporter:
+    """Carga masiva de inspecciones históricas con sus resultados, en transacciones por bloques."""
+
+    def __init__(self, db: Session, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.db = db
+        self.chunk_size = max(1, min(chunk_size, MAX_CHUNK_SIZE))
+        self.report = {
+            "rows_read": 0,
+            "inspections_created": 0,
+            "results_written": 0,
+            "error_count": 0,
+            "errors": [],
+        }
+        # lote -> id de las inspecciones creadas por esta carga
+        self.created_lots = {}
+        self.existing_lots = set()
+        self.market_ids = set()
+        self.grade_ids = set()
+        self.defect_ids = set()
+
+    def _load_reference_data(self):
+        db = self.db
+        self.market_ids = {row[0] for row in db.query(models.Market.id)}
+        self.grade_ids = {row[0] for row in db.query(models.Grade.id)}
+        self.defect_ids = {row[0] for row in db.query(models.Defect.id)}
+
+    def _error(self, row_number, message):
+        self.report["error_count"] += 1
+        if len(self.report["errors"]) < MAX_REPORTED_ERRORS:
+            self.report["errors"].append({"row": row_number, "error": message})
+
+    def run(self, rows):
+        self._load_reference_data()
+        chunk = []
+        # La fila 1 es el encabezado
+        for row_number, raw in enumerate(rows, start=2):
+            self.report["rows_read"] += 1
+            chunk.append((row_number, raw))
+            if len(chunk) >= self.chunk_size:
+                self._process_chunk(chunk)
+                chunk = []
+        if chunk:
+            self._process_chunk(chunk)
+        return self.report
+
+    def _validate_chunk(self, chunk):
+        valid = []
+        for row_number, raw in chunk:
+            try:
+                inspection, result = _parse_row(raw)
+            except (ValidationError, ValueError) as e:
+                self._error(row_number, _format_error(e))
+                continue
+
+            if inspection.market_id not in self.market_ids:
+                self._error(row_number, f"market_id: mercado {inspection.market_id} no existe")
+            elif result.grade_id not in self.grade_ids:
+                self._error(row_number, f"grade_id: grado {result.grade_id} no existe")
+            elif result.defect_id is not None and result.defect_id not in self.defect_ids:
+                self._error(row_number, f"defect_id: defecto {result.defect_id} no existe")
+            else:
+                valid.append((row_number, inspection, result))
+        return valid
+
+    def _process_chunk(self, chunk):
+        db = self.db
+        valid = self._validate_chunk(chunk)
+        if not valid:
+            return
+
+        # Lotes que ya existían antes de la carga: una consulta por bloque sobre el índice único de lote
+        # (lot != '' repite la condición del índice parcial ux_inspections_lot; sin ella SQLite recorre la tabla)
+        new_lots = {inspection.lot for _, inspection, _ in valid if inspection.lot not in self.created_lots}
+        if new_lots:
+            self.existing_lots.update(
+                lot for (lot,) in db.execute(
+                    select(models.Inspection.lot).where(models.Inspection.lot.in_(new_lots), models.Inspection.lot != "")
+                )
+            )
+
+        inspection_rows = {}
+        result_rows = []
+        for row_number, inspection, result in valid:
+            if inspection.lot in self.existing_lots:
+                self._error(row_number, f"lot: el número de lote '{inspection.lot}' ya existe")
+                continue
+            if inspection.lot not in self.created_lots and inspection.lot not in inspection_rows:
+                try:
+                    inspection_rows[inspection.lot] = self._inspection_values(inspection)
+                except ValueError as e:
+                    self._error(row_number, str(e))
+                    continue
+            result_rows.append((row_number, inspection.lot, result))
+
+        try:
+            if inspection_rows:
+                db.execute(insert(models.Inspection.__table__), list(inspection_rows.values()))
+                created = dict(db.execute(
+                    select(models.Inspection.lot, models.Inspection.id)
+                    .where(models.Inspection.lot.in_(list(inspection_rows)), models.Inspection.lot != "")
+                ).all())
+            else:
+                created = {}
+
+            lot_ids = {**self.created_lots, **created}
+            # Celdas repetidas dentro del bloque se suman antes de escribir
+            cells = {}
+            for _, lot, result in result_rows:
+                key = (lot_ids[lot], result.grade_id, result.defect_id)
+                cells[key] = cells.get(key, 0) + result.pieces_count
+
+            if cells:
+                stmt = sqlite_insert(models.InspectionResult)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=list(models.INSPECTION_RESULT_CELL),
+                    set_={"pieces_count": models.InspectionResult.pieces_count + stmt.excluded.pieces_count}
+                )
+                db.execute(stmt, [
+                    {"inspection_id": inspection_id, "grade_id": grade_id, "defect_id": defect_id, "pieces_count": count}
+                    for (inspection_id, grade_id, defect_id), count in cells.items()
+                ])
+                inspection_totals.refresh_totals_for(db, {key[0] for key in cells})
+
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            for row_number, _, _ in valid:
+                self._error(row_number, f"bloque revertido: {e}")
+            return
+
+        self.created_lots.update(created)
+        self.report["inspections_created"] += len(created)
+        self.report["results_written"] += len(result_rows)
+
+    @staticmethod
+    def _inspection_values(inspection):
+        data = inspection.model_dump()
+        try:
+            data["date"] = datetime.strptime(data["date"], "%Y-%m-%d").date()
+            data["production_date"] = datetime.strptime(data["production_date"], "%Y-%m-%d").date()
+        except ValueError:
+            raise ValueError("date/production_date: formato esperado AAAA-MM-DD")
+        return data
+
+
+def import_inspections(db: Session, binary_file, filename: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    return InspectionImporter(db, chunk_size=chunk_size).run(iter_rows(binary_file, filename))
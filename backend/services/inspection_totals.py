@@ -0,0 +1,115 @@
+from sqlalchemy import select, case, func, literal, delete
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from database import models
+
+# Nombre del grado que agrupa las piezas rechazadas (igual que en los reportes del frontend)
+REJECTION_GRADE_NAME = "RECHAZO"
+# grade_rank 1 es el mejor grado
+BEST_GRADE_RANK = 1
+
+TOTAL_COLUMNS = ["inspection_id", "total_pieces", "rejected_pieces", "best_grade_pieces"]
+
+
+def _totals_select():
+    """SELECT agregado de inspection_results por inspección, con las mismas columnas que inspection_totals."""
+    pieces = func.coalesce(models.InspectionResult.pieces_count, 0)
+    return select(
+        models.InspectionResult.inspection_id,
+        func.coalesce(func.sum(pieces), 0),
+        func.coalesce(func.sum(case((models.Grade.name == REJECTION_GRADE_NAME, pieces), else_=0)), 0),
+        func.coalesce(func.sum(case((models.Grade.grade_rank == BEST_GRADE_RANK, pieces), else_=0)), 0),
+    ).select_from(models.InspectionResult).outerjoin(
+        models.Grade, models.InspectionResult.grade_id == models.Grade.id
+    ).group_by(models.InspectionResult.inspection_id)
+
+
+def apply_result_delta(db: Session, inspection_id: int, grade_id: int, delta: int):
+    """Suma `delta` piezas del grado indicado a los totales de la inspección (una sola sentencia).
+
+    No hace commit: debe ejecutarse en la misma transacción que el cambio en inspection_results.
+    """
+    if not delta:
+        return
+
+    def by_grade(condition):
+        # Subconsulta escalar: sin fila de grado (id inexistente o NULL) aporta 0, igual que el LEFT JOIN de
+        # _totals_select, y total_pieces se suma de todas formas
+        return func.coalesce(
+            select(case((condition, delta), else_=0)).where(models.Grade.id == grade_id).scalar_subquery(), 0
+        )
+
+    source = select(
+        literal(inspection_id),
+        literal(delta),
+        by_grade(models.Grade.name == REJECTION_GRADE_NAME),
+        by_grade(models.Grade.grade_rank == BEST_GRADE_RANK),
+    )
+
+    stmt = sqlite_insert(models.InspectionTotals).from_select(TOTAL_COLUMNS, source)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.InspectionTotals.inspection_id],
+        set_={
+            "total_pieces": models.InspectionTotals.total_pieces + stmt.excluded.total_pieces,
+            "rejected_pieces": models.InspectionTotals.rejected_pieces + stmt.excluded.rejected_pieces,
+            "best_grade_pieces": models.InspectionTotals.best_grade_pieces + stmt.excluded.best_grade_pieces,
+        }
+    )
+    db.execute(stmt)
+
+
+def refresh_inspection_totals(db: Session, inspection_id: int):
+    """Recalcula los totales de una inspección desde sus celdas (para reemplazos completos de la grilla).
+
+    No hace commit.
+    """
+    refresh_totals_for(db, [inspection_id])
+
+
+def refresh_totals_for(db: Session, inspection_ids):
+    """Igual que refresh_inspection_totals para un conjunto de inspecciones (cargas masivas). No hace commit."""
+    inspection_ids = list(inspection_ids)
+    if not inspection_ids:
+        return
+    db.execute(delete(models.InspectionTotals).where(models.InspectionTotals.inspection_id.in_(inspection_ids)))
+    source = _totals_select().where(models.InspectionResult.inspection_id.in_(inspection_ids))
+    db.execute(sqlite_insert(models.InspectionTotals).from_select(TOTAL_COLUMNS, source))
+
+
+def delete_inspection_totals(db: Session, inspection_id: int):
+    db.execute(delete(models.InspectionTotals).where(models.InspectionTotals.inspection_id == inspection_id))
+
+
+def rebuild_all_totals(db: Session) -> int:
+    """Vacía inspection_totals y la reconstruye completa desde inspection_results. Retorna filas escritas."""
+    db.execute(delete(models.InspectionTotals))
+    result = db.execute(
+        sqlite_insert(models.InspectionTotals).from_select(
+            TOTAL_COLUMNS,
+            _totals_select().where(models.InspectionResult.inspection_id.isnot(None))
+        )
+    )
+    db.commit()
+    return result.rowcount
+
+
+def find_totals_mismatches(db: Session):
+    """Compara inspection_totals con el agregado de las filas crudas.
+
+    Retorna una lista de (inspection_id, almacenado, esperado) donde cada valor es una tupla
+    (total, rechazadas, mejor grado) o None si falta la fila.
+    """
+    expected = {
+        row[0]: tuple(row[1:])
+        for row in db.execute(_totals_select().where(models.InspectionResult.inspection_id.isnot(None)))
+    }
+    stored = {
+        row.inspection_id: (row.total_pieces, row.rejected_pieces, row.best_grade_pieces)
+        for row in db.query(models.InspectionTotals).all()
+    }
+
+    mismatches = []
+    for inspection_id in sorted(set(expected) | set(stored)):
+        if expected.get(inspection_id) != stored.get(inspection_id):
+            mismatches.append((inspection_id, stored.get(inspection_id), expected.get(inspection_id)))
+    return mismatches
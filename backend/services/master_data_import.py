@@ -0,0 +1,345 @@
+import codecs
+import csv
+import io
+import itertools
+import unicodedata
+from sqlalchemy import insert, update, select
+from sqlalchemy.orm import Session
+from database import models
+from services import inspection_totals
+from services.grade_ranks import normalize_grade_name
+
+# Carga masiva de datos maestros (ver /api/exports/template/csv). Una fila por registro; la columna
+# `category` indica qué se carga:
+#   market        -> name
+#   product       -> name
+#   grade         -> product, name, grade_rank
+#   defect        -> name, description (opcional)
+#   grade_defect  -> product, grade, defect
+#   otra          -> ítem de catálogo (category, name, active), ej. area, machine, shift
+# Si el archivo no trae la columna `category`, se usa la del parámetro `type` del endpoint; con
+# type=catalog cada fila debe traer su categoría (area, machine, ...), no hay una categoría "catalog".
+COLUMNS = ("category", "name", "active", "product", "grade_rank", "description", "grade", "defect")
+TYPE_CATEGORIES = {
+    "markets": "market",
+    "market": "market",
+    "products": "product",
+    "product": "product",
+    "grades": "grade",
+    "grade": "grade",
+    "defects": "defect",
+    "defect": "defect",
+    "grade_defects": "grade_defect",
+    "grade_defect": "grade_defect",
+    "catalogs": "catalog",
+    "catalog": "catalog",
+}
+TRUE_VALUES = ("true", "1", "si", "yes", "x", "activo")
+FALSE_VALUES = ("false", "0", "no", "inactivo")
+EXCEL_EXTENSIONS = (".xlsx", ".xlsm")
+
+CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+
+
+def _text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _normalize_header(value) -> str:
+    text = unicodedata.normalize("NFKD", _text(value)).encode("ascii", "ignore").decode("ascii")
+    return text.lower().replace(" ", "_")
+
+
+def _rows_from_table(rows):
+    """(número de fila, dict columna -> texto) a partir de filas de valores con encabezado en la primera."""
+    header = [_normalize_header(h) for h in next(rows, [])]
+    # La fila 1 es el encabezado
+    for row_number, values in enumerate(rows, start=2):
+        record = {h: _text(v) for h, v in zip(header, values) if h in COLUMNS}
+        if any(record.values()):
+            yield row_number, record
+
+
+def _csv_encoding(binary_file) -> str:
+    """utf-8-sig si todo el archivo es UTF-8 válido; si no, cp1252 (CSV guardado por Excel en Windows).
+
+    Se valida por bloques antes de leer las filas, así la memoria no depende del tamaño del archivo.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        for chunk in iter(lambda: binary_file.read(1 << 16), b""):
+            decoder.decode(chunk)
+        decoder.decode(b"", final=True)
+        return "utf-8-sig"
+    except UnicodeDecodeError:
+        return "cp1252"
+    finally:
+        binary_file.seek(0)
+
+
+def iter_csv_rows(binary_file):
+    text = io.TextIOWrapper(binary_file, encoding=_csv_encoding(binary_file), newline="")
+    try:
+        header_line = text.readline()
+        delimiter = ";" if header_line.count(";") > header_line.count(",") else ","
+        yield from _rows_from_table(csv.reader(itertools.chain([header_line], text), delimiter=delimiter))
+    finally:
+        text.detach()
+
+
+def iter_excel_rows(binary_file):
+    from openpyxl import load_workbook
+
+    # Modo de solo lectura: las filas se leen de a una desde el archivo
+    workbook = load_workbook(binary_file, read_only=True, data_only=True)
+    try:
+        yield from _rows_from_table(workbook.worksheets[0].iter_rows(values_only=True))
+    finally:
+        workbook.close()
+
+
+def iter_upload_rows(filename: str, binary_file):
+    if (filename or "").lower().endswith(EXCEL_EXTENSIONS):
+        return iter_excel_rows(binary_file)
+    return iter_csv_rows(binary_file)
+
+
+class MasterDataImporter:
+    """Valida las filas y crea o actualiza catálogos, mercados, productos, grados, defectos y asociaciones
+    grado-defecto con inserciones/actualizaciones por bloques, todo en una transacción.
+
+    Las filas se deduplican por su llave natural (la última gana); los grados y asociaciones pueden referirse
+    a productos, grados y defectos creados en el mismo archivo.
+    """
+
+    def __init__(self, db: Session, default_category: str = None):
+        self.db = db
+        self.default_category = TYPE_CATEGORIES.get((default_category or "").lower(), default_category)
+        self.report = {
+            "rows_read": 0,
+            "created": {},
+            "updated": {},
+            "error_count": 0,
+            "errors": [],
+        }
+        # Llave natural -> valores validados, en orden de llegada
+        self.catalogs = {}
+        self.markets = {}
+        self.products = {}
+        self.defects = {}
+        self.grades = {}
+        self.links = {}
+
+    def _error(self, row_number, message):
+        self.report["error_count"] += 1
+        if len(self.report["errors"]) < MAX_REPORTED_ERRORS:
+            self.report["errors"].append({"row": row_number, "error": message})
+
+    def _count(self, kind, action, n):
+        if n:
+            self.report[action][kind] = self.report[action].get(kind, 0) + n
+
+    # --- Validación ---
+    def _add_row(self, row_number, raw):
+        category = raw.get("category") or self.default_category
+        if not category:
+            self._error(row_number, "falta la categoría (columna 'category')")
+            return
+        category = TYPE_CATEGORIES.get(category.lower(), category)
+        if category == "catalog":
+            self._error(row_number, "falta la categoría del catálogo (columna 'category', ej. area, machine, shift)")
+            return
+        name = raw.get("name", "")
+
+        if category == "grade_defect":
+            missing = [f for f in ("product", "grade", "defect") if not raw.get(f)]
+            if missing:
+                self._error(row_number, f"faltan columnas: {', '.join(missing)}")
+                return
+            key = (raw["product"], normalize_grade_name(raw["grade"]), raw["defect"])
+            self.links[key] = {"row": row_number, "grade": raw["grade"]}
+            return
+
+        if not name:
+            self._error(row_number, "falta el nombre (columna 'name')")
+            return
+
+        if category == "market":
+            self.markets[name] = row_number
+        elif category == "product":
+            self.products[name] = row_number
+        elif category == "defect":
+            self.defects[name] = {"row": row_number, "description": raw.get("description") or None}
+        elif category == "grade":
+            if not raw.get("product"):
+                self._error(row_number, "falta el producto (columna 'product')")
+                return
+            try:
+                grade_rank = int(float(raw.get("grade_rank", "").replace(",", ".")))
+            except (ValueError, OverflowError):
+                self._error(row_number, f"grade_rank inválido: '{raw.get('grade_rank', '')}'")
+                return
+            if grade_rank < 1:
+                self._error(row_number, "grade_rank debe ser 1 o mayor (1 es el mejor grado)")
+                return
+            key = (raw["product"], normalize_grade_name(name))
+            self.grades[key] = {"row": row_number, "name": name, "grade_rank": grade_rank}
+        else:
+            active = raw.get("active", "").lower()
+            if active and active not in TRUE_VALUES and active not in FALSE_VALUES:
+                self._error(row_number, f"active inválido: '{raw.get('active')}'")
+                return
+            # Vacío: activo al crear y sin cambios si ya existe
+            self.catalogs[(category, name)] = (active in TRUE_VALUES) if active else None
+
+    # --- Escritura ---
+    def _execute(self, statement, rows):
+        for start in range(0, len(rows), CHUNK_SIZE):
+            self.db.execute(statement, rows[start:start + CHUNK_SIZE])
+
+    def _ids_by_name(self, model, names):
+        """Nombre -> id, consultando en bloques para no superar el límite de parámetros de SQLite."""
+        ids = {}
+        names = list(names)
+        for start in range(0, len(names), CHUNK_SIZE):
+            ids.update(self.db.execute(
+                select(model.name, model.id).where(model.name.in_(names[start:start + CHUNK_SIZE]))
+            ).all())
+        return ids
+
+    def _upsert_names(self, kind, model, names):
+        """Crea los nombres que no existen; retorna nombre -> id de todos."""
+        ids = self._ids_by_name(model, names)
+        new = [{"name": name} for name in names if name not in ids]
+        if new:
+            self._execute(insert(model), new)
+            ids.update(self._ids_by_name(model, [row["name"] for row in new]))
+        self._count(kind, "created", len(new))
+        return ids
+
+    def _write_catalogs(self):
+        if not self.catalogs:
+            return
+        existing = {
+            (category, name): (item_id, active)
+            for item_id, category, name, active in self.db.query(
+                models.CatalogItem.id, models.CatalogItem.category, models.CatalogItem.name, models.CatalogItem.active
+            ).filter(models.CatalogItem.category.in_({category for category, _ in self.catalogs}))
+        }
+        inserts, updates = [], []
+        for (category, name), active in self.catalogs.items():
+            if (category, name) not in existing:
+                inserts.append({"category": category, "name": name, "active": active is not False})
+            elif active is not None and existing[(category, name)][1] != active:
+                updates.append({"id": existing[(category, name)][0], "active": active})
+        self._execute(insert(models.CatalogItem), inserts)
+        self._execute(update(models.CatalogItem), updates)
+        self._count("catalog", "created", len(inserts))
+        self._count("catalog", "updated", len(updates))
+
+    def _write_defects(self):
+        existing = {
+            name: (defect_id, description)
+            for defect_id, name, description in self.db.query(models.Defect.id, models.Defect.name, models.Defect.description)
+        }
+        inserts, updates = [], []
+        for name, values in self.defects.items():
+            if name not in existing:
+                inserts.append({"name": name, "description": values["description"] or ""})
+            elif values["description"] and existing[name][1] != values["description"]:
+                updates.append({"id": existing[name][0], "description": values["description"]})
+        self._execute(insert(models.Defect), inserts)
+        self._execute(update(models.Defect), updates)
+        self._count("defect", "created", len(inserts))
+        self._count("defect", "updated", len(updates))
+
+    def _write_grades(self, product_ids):
+        existing = {
+            (product_id, normalize_grade_name(name)): (grade_id, grade_rank)
+            for grade_id, product_id, name, grade_rank in self.db.query(
+                models.Grade.id, models.Grade.product_id, models.Grade.name, models.Grade.grade_rank
+            ).filter(models.Grade.product_id.in_(set(product_ids.values())))
+        }
+        inserts, updates = [], []
+        for (product_name, grade_key), values in self.grades.items():
+            product_id = product_ids.get(product_name)
+            if product_id is None:
+                self._error(values["row"], f"producto '{product_name}' no existe")
+                continue
+            if (product_id, grade_key) not in existing:
+                inserts.append({"product_id": product_id, "name": values["name"], "grade_rank": values["grade_rank"]})
+            elif existing[(product_id, grade_key)][1] != values["grade_rank"]:
+                updates.append({"id": existing[(product_id, grade_key)][0], "grade_rank": values["grade_rank"]})
+        self._execute(insert(models.Grade), inserts)
+        self._execute(update(models.Grade), updates)
+        self._refresh_totals_for_grades([row["id"] for row in updates])
+        self._count("grade", "created", len(inserts))
+        self._count("grade", "updated", len(updates))
+
+    def _refresh_totals_for_grades(self, grade_ids):
+        """Un cambio de grade_rank cambia best_grade_pieces de las inspecciones con resultados de esos grados:
+        se recalculan sus totales en la misma transacción."""
+        inspection_ids = set()
+        for start in range(0, len(grade_ids), CHUNK_SIZE):
+            inspection_ids.update(self.db.execute(
+                select(models.InspectionResult.inspection_id).where(
+                    models.InspectionResult.grade_id.in_(grade_ids[start:start + CHUNK_SIZE]),
+                    models.InspectionResult.inspection_id.isnot(None)
+                ).distinct()
+            ).scalars())
+        inspection_ids = sorted(inspection_ids)
+        for start in range(0, len(inspection_ids), CHUNK_SIZE):
+            inspection_totals.refresh_totals_for(self.db, inspection_ids[start:start + CHUNK_SIZE])
+
+    def _write_links(self, product_ids):
+        defect_ids = dict(self.db.query(models.Defect.name, models.Defect.id))
+        grade_ids = {
+            (product_id, normalize_grade_name(name)): grade_id
+            for grade_id, product_id, name in self.db.query(models.Grade.id, models.Grade.product_id, models.Grade.name)
+        }
+        existing = set(self.db.execute(select(models.grade_defects.c.grade_id, models.grade_defects.c.defect_id)).all())
+        inserts = []
+        for (product_name, grade_key, defect_name), values in self.links.items():
+            grade_id = grade_ids.get((product_ids.get(product_name), grade_key))
+            defect_id = defect_ids.get(defect_name)
+            if grade_id is None:
+                self._error(values["row"], f"grado '{values['grade']}' no existe para el producto '{product_name}'")
+            elif defect_id is None:
+                self._error(values["row"], f"defecto '{defect_name}' no existe")
+            elif (grade_id, defect_id) not in existing:
+                existing.add((grade_id, defect_id))
+                inserts.append({"grade_id": grade_id, "defect_id": defect_id})
+        self._execute(insert(models.grade_defects), inserts)
+        self._count("grade_defect", "created", len(inserts))
+
+    def run(self, rows):
+        for row_number, raw in rows:
+            self.report["rows_read"] += 1
+            self._add_row(row_number, raw)
+
+        db = self.db
+        try:
+            self._write_catalogs()
+            self._upsert_names("market", models.Market, list(self.markets))
+            self._write_defects()
+            # Productos del archivo más los referidos por grados y asociaciones (deben existir)
+            product_ids = self._upsert_names("product", models.Product, list(self.products))
+            referenced = {name for name, _ in self.grades} | {name for name, _, _ in self.links}
+            product_ids.update(self._ids_by_name(models.Product, referenced - set(product_ids)))
+            self._write_grades(product_ids)
+            self._write_links(product_ids)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        self.report["errors"].sort(key=lambda e: e["row"])
+        return self.report
+
+
+def import_master_data(db: Session, filename: str, binary_file, default_category: str = None):
+    return MasterDataImporter(db, default_category).run(iter_upload_rows(filename, binary_file))
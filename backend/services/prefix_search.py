@@ -0,0 +1,16 @@
+MAX_CODE_POINT = 0x10FFFF
+SURROGATES = range(0xD800, 0xE000)
+
+
+def prefix_upper_bound(prefix: str):
+    """Menor texto mayor que todos los que empiezan con `prefix`, para buscar por rango [prefijo, cota)
+    sobre un índice en lugar de LIKE. Retorna None si no existe cota (el rango queda abierto arriba)."""
+    # Un último carácter U+10FFFF no tiene siguiente: se acorta el prefijo
+    stripped = prefix.rstrip(chr(MAX_CODE_POINT))
+    if not stripped:
+        return None
+    following = ord(stripped[-1]) + 1
+    # Los sustitutos UTF-16 no se pueden codificar en UTF-8; el siguiente carácter válido es U+E000
+    if following in SURROGATES:
+        following = SURROGATES.stop
+    return stripped[:-1] + chr(following)
@@ -0,0 +1,215 @@
+import os
+import unicodedata
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, date, time
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from database import models
+from services import scanner_stats, scanner_rollups
+from services.grade_ranks import grade_ranks, normalize_grade_name
+
+# Planillas históricas "ÍNDICE DE CLASIFICACIÓN" (ver estudio escaner.xlsx):
+# - Bloque de encabezado con etiquetas (TURNO:, FECHA:, HORA:, Supervisor:, Operador:, Inspector:,
+#   PRODUCTO :, MERCADO:) y el valor en la primera celda no vacía a su derecha.
+# - Tablas de piezas lado a lado (Inspector | Scanner Finscan | Comparación salida), cada una con
+#   Pieza, Espesor, Ancho, Largo, Grado; las filas de piezas terminan en "Total Volumen".
+HEADER_LABELS = {
+    "turno": "shift",
+    "fecha": "date",
+    "hora": "time",
+    "supervisor": "supervisor",
+    "operador": "operator",
+    "inspector": "inspector",
+    "producto": "product_name",
+    "mercado": "market",
+}
+EXCEL_EXTENSIONS = (".xlsx", ".xlsm")
+# Largos menores a este valor vienen en metros en las planillas; en la aplicación se guardan en mm
+MAX_LENGTH_IN_METERS = 100
+
+
+def _label(value) -> str:
+    text = unicodedata.normalize("NFKD", str(value)).encode("ascii", "ignore").decode("ascii")
+    return text.replace(":", "").strip().lower()
+
+
+def _number(value):
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        value = value.strip().replace(",", ".")
+    return float(value)
+
+
+def _find_blocks(row):
+    """Columnas (pieza, espesor, ancho, largo, grado) de cada tabla en la fila de subtítulos."""
+    labels = [_label(v) if v is not None else "" for v in row]
+    blocks = []
+    for i, label in enumerate(labels):
+        if label == "espesor" and "grado" in labels[i:]:
+            grade = labels.index("grado", i)
+            blocks.append((i - 1, i, i + 1, i + 2, grade))
+    return blocks
+
+
+def parse_workbook(path: str) -> dict:
+    """Lee una planilla en modo de solo lectura (fila a fila) y retorna encabezado y piezas como datos simples.
+
+    Se ejecuta en los procesos del pool, por eso no toca la base de datos.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        header = {}
+        blocks = None
+        items = []
+        for row in workbook.worksheets[0].iter_rows(values_only=True):
+            if blocks is None:
+                for i, value in enumerate(row):
+                    if isinstance(value, str) and _label(value) in HEADER_LABELS:
+                        field = HEADER_LABELS[_label(value)]
+                        following = next((v for v in row[i + 1:] if v is not None), None)
+                        header.setdefault(field, following)
+                found = _find_blocks(row)
+                if len(found) >= 2:
+                    blocks = found
+                continue
+
+            first = row[blocks[0][0]] if blocks[0][0] < len(row) else None
+            if isinstance(first, str) and _label(first).startswith("total"):
+                break
+            if first is None or isinstance(first, str):
+                continue
+
+            inspector, scanner = blocks[0], blocks[1]
+            length = _number(row[inspector[3]])
+            if length is not None and length < MAX_LENGTH_IN_METERS:
+                length = length * 1000
+            items.append({
+                "item_number": int(_number(first)),
+                "inspector_grade": row[inspector[4]],
+                "scanner_grade": row[scanner[4]],
+                "thickness": _number(row[inspector[1]]),
+                "width": _number(row[inspector[2]]),
+                "length": length,
+            })
+    finally:
+        workbook.close()
+
+    if blocks is None:
+        raise ValueError("no se encontró la tabla de piezas (Espesor/Ancho/Largo/Grado)")
+    return {"path": path, "header": header, "items": items}
+
+
+def _step_date(header):
+    day = header.get("date")
+    if isinstance(day, datetime):
+        day = day.date()
+    elif isinstance(day, str):
+        day = date.fromisoformat(day.strip()[:10])
+    if not isinstance(day, date):
+        raise ValueError("FECHA: falta o no es una fecha")
+    hour = header.get("time")
+    return datetime.combine(day, hour if isinstance(hour, time) else time.min)
+
+
+def save_study(db: Session, study: dict) -> dict:
+    """Crea el ScannerStep y sus piezas de una planilla ya leída, en una transacción."""
+    header = study["header"]
+    step_date = _step_date(header)
+    product_name = str(header.get("product_name") or "").strip()
+    supervisor = str(header.get("supervisor") or "").strip()
+
+    market = db.query(models.Market.id).filter(models.Market.name == str(header.get("market") or "").strip()).first()
+    if not market:
+        raise ValueError(f"MERCADO: '{header.get('market')}' no existe")
+    product = db.query(models.Product.id).filter(models.Product.name == product_name).first()
+    if not product:
+        raise ValueError(f"PRODUCTO: '{product_name}' no existe")
+
+    duplicate = db.query(models.ScannerStep.id).filter(
+        models.ScannerStep.date == step_date,
+        models.ScannerStep.supervisor == supervisor,
+        models.ScannerStep.product_name == product_name
+    ).first()
+    if duplicate:
+        return {"status": "skipped", "step_id": duplicate.id, "items": 0, "errors": []}
+
+    names = {item[column] for item in study["items"] for column in ("inspector_grade", "scanner_grade")}
+    grade_ids = grade_ranks.get_ids_by_name(db, product.id, names)
+    ranks = grade_ranks.get_ranks(db, grade_ids.values())
+
+    rows, errors = [], []
+    for item in study["items"]:
+        inspector_grade_id = grade_ids.get(normalize_grade_name(item["inspector_grade"]))
+        scanner_grade_id = grade_ids.get(normalize_grade_name(item["scanner_grade"]))
+        if inspector_grade_id is None or scanner_grade_id is None:
+            errors.append(f"pieza {item['item_number']}: grado '{item['inspector_grade']}'/'{item['scanner_grade']}' no existe")
+            continue
+        if ranks.get(inspector_grade_id) is None or ranks.get(scanner_grade_id) is None:
+            errors.append(f"pieza {item['item_number']}: grado '{item['inspector_grade']}'/'{item['scanner_grade']}' sin grade_rank")
+            continue
+        rows.append({
+            "item_number": item["item_number"],
+            "inspector_grade_id": inspector_grade_id,
+            "scanner_grade_id": scanner_grade_id,
+            "winner": scanner_stats.classify(ranks[inspector_grade_id], ranks[scanner_grade_id]),
+            "thickness": item["thickness"],
+            "width": item["width"],
+            "length": item["length"],
+        })
+
+    try:
+        step = models.ScannerStep(
+            date=step_date,
+            supervisor=supervisor,
+            market_id=market.id,
+            shift=header.get("shift"),
+            responsible=header.get("inspector"),
+            product_name=product_name,
+        )
+        db.add(step)
+        db.flush()
+        if rows:
+            db.execute(insert(models.ScannerItem), [{**row, "step_id": step.id} for row in rows])
+            scanner_rollups.apply_status_counts(db, step.id, Counter(row["winner"] for row in rows))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return {"status": "created", "step_id": step.id, "items": len(rows), "errors": errors}
+
+
+def find_workbooks(directory: str):
+    return sorted(
+        os.path.join(root, name)
+        for root, _, names in os.walk(directory)
+        for name in names
+        # Los temporales de Excel (~$archivo.xlsx) no son planillas
+        if name.lower().endswith(EXCEL_EXTENSIONS) and not name.startswith("~$")
+    )
+
+
+def load_directory(db: Session, directory: str, workers: int = None):
+    """Lee las planillas del directorio en paralelo (pool de procesos) y las guarda en orden de llegada.
+
+    La escritura queda en el proceso principal: SQLite admite un solo escritor.
+    """
+    paths = find_workbooks(directory)
+    report = {"workbooks": len(paths), "created": 0, "skipped": 0, "items": 0, "failed": []}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {path: pool.submit(parse_workbook, path) for path in paths}
+        for path, future in futures.items():
+            try:
+                result = save_study(db, future.result())
+            except Exception as e:
+                report["failed"].append({"path": path, "error": str(e)})
+                continue
+            report[result["status"]] += 1
+            report["items"] += result["items"]
+            for error in result["errors"]:
+                report["failed"].append({"path": path, "error": error})
+    scanner_stats.mark_items_changed()
+    return report
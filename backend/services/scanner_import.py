@@ -0,0 +1,213 @@
+import csv
+import io
+import itertools
+import unicodedata
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+from database import models
+from services import scanner_stats, scanner_rollups
+from services.grade_ranks import grade_ranks, normalize_grade_name
+
+# Archivo de piezas exportado por el escáner: una fila por pieza, separado por tabulador, punto y coma o coma.
+# Los encabezados se comparan sin mayúsculas ni tildes; se aceptan los nombres en español del equipo.
+COLUMN_ALIASES = {
+    "item_number": ("item_number", "pieza", "piece", "nro", "numero", "n"),
+    "scanner_grade": ("scanner_grade", "grado", "grade", "grado escaner", "grado software"),
+    "inspector_grade": ("inspector_grade", "grado inspector", "grado estimado"),
+    "thickness": ("thickness", "espesor"),
+    "width": ("width", "ancho"),
+    "length": ("length", "largo"),
+}
+DIMENSIONS = ("thickness", "width", "length")
+
+CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+
+
+def _normalize_header(value) -> str:
+    text = unicodedata.normalize("NFKD", str(value or "")).encode("ascii", "ignore").decode("ascii")
+    return " ".join(text.replace("_", " ").lower().split())
+
+
+def _detect_delimiter(header_line: str) -> str:
+    if "\t" in header_line:
+        return "\t"
+    if header_line.count(";") > header_line.count(","):
+        return ";"
+    return ","
+
+
+def iter_piece_rows(binary_file):
+    """Genera (número de fila, dict con las columnas reconocidas) sin cargar el archivo en memoria."""
+    text = io.TextIOWrapper(binary_file, encoding="utf-8-sig", newline="")
+    try:
+        header_line = text.readline()
+        reader = csv.reader(itertools.chain([header_line], text), delimiter=_detect_delimiter(header_line))
+        header = [_normalize_header(h) for h in next(reader, [])]
+
+        positions = {}
+        for field, aliases in COLUMN_ALIASES.items():
+            for alias in aliases:
+                if _normalize_header(alias) in header:
+                    positions[field] = header.index(_normalize_header(alias))
+                    break
+        missing = [f for f in ("item_number", "scanner_grade") if f not in positions]
+        if missing:
+            raise ValueError(f"Columnas requeridas no encontradas: {', '.join(missing)}")
+
+        # La fila 1 es el encabezado
+        for row_number, values in enumerate(reader, start=2):
+            if not any(v.strip() for v in values):
+                continue
+            yield row_number, {
+                field: (values[pos].strip() if pos < len(values) else "")
+                for field, pos in positions.items()
+            }
+    finally:
+        text.detach()
+
+
+def _parse_number(value: str):
+    if value == "":
+        return None
+    return float(value.replace(",", "."))
+
+
+class ScannerPieceImporter:
+    """Carga el archivo de piezas del escáner en un estudio: completa el grado del escáner de las piezas
+    ya registradas (por item_number) y crea las que falten, todo en una transacción."""
+
+    def __init__(self, db: Session, step: models.ScannerStep):
+        self.db = db
+        self.step = step
+        self.report = {
+            "rows_read": 0,
+            "items_updated": 0,
+            "items_created": 0,
+            "error_count": 0,
+            "errors": [],
+        }
+        self.product_id = None
+        self.grade_ids = {}
+        self.grade_ids_reloaded = False
+        self.ranks = {}
+        # item_number -> (id, inspector_grade_id) de las piezas existentes del estudio
+        self.existing = {}
+        self.seen = set()
+
+    def _error(self, row_number, message):
+        self.report["error_count"] += 1
+        if len(self.report["errors"]) < MAX_REPORTED_ERRORS:
+            self.report["errors"].append({"row": row_number, "error": message})
+
+    def _load_reference_data(self):
+        db = self.db
+        product = db.query(models.Product.id).filter(models.Product.name == self.step.product_name).first()
+        if product:
+            self.product_id = product.id
+            self.grade_ids = grade_ranks.get_ids_by_name(db, product.id)
+        self.existing = {
+            item_number: (item_id, inspector_grade_id)
+            for item_id, item_number, inspector_grade_id in db.query(
+                models.ScannerItem.id, models.ScannerItem.item_number, models.ScannerItem.inspector_grade_id
+            ).filter(models.ScannerItem.step_id == self.step.id)
+        }
+        # También los grados del inspector de las piezas ya registradas, para recalcular su estado
+        inspector_ids = {grade_id for _, grade_id in self.existing.values() if grade_id is not None}
+        self.ranks = grade_ranks.get_ranks(db, set(self.grade_ids.values()) | inspector_ids)
+
+    def _grade_id(self, name):
+        key = normalize_grade_name(name)
+        if key not in self.grade_ids and self.product_id is not None and not self.grade_ids_reloaded:
+            # Un nombre desconocido puede ser un grado creado en otro proceso: se recarga una sola vez
+            self.grade_ids_reloaded = True
+            self.grade_ids = grade_ranks.get_ids_by_name(self.db, self.product_id, [key])
+            self.ranks = grade_ranks.get_ranks(self.db, self.grade_ids.values())
+        return self.grade_ids.get(key)
+
+    def _build_row(self, row_number, raw):
+        """Retorna ("update" | "insert", valores) o None si la fila tiene errores."""
+        try:
+            item_number = int(_parse_number(raw["item_number"]))
+            dimensions = {d: _parse_number(raw[d]) for d in DIMENSIONS if d in raw}
+        except (TypeError, ValueError):
+            self._error(row_number, "pieza/dimensiones: valor numérico inválido")
+            return None
+
+        if item_number in self.seen:
+            self._error(row_number, f"pieza {item_number} repetida en el archivo")
+            return None
+        self.seen.add(item_number)
+
+        scanner_grade_id = self._grade_id(raw["scanner_grade"])
+        if scanner_grade_id is None:
+            self._error(row_number, f"grado '{raw['scanner_grade']}' no existe para el producto '{self.step.product_name}'")
+            return None
+
+        if item_number in self.existing:
+            item_id, inspector_grade_id = self.existing[item_number]
+            values = {"id": item_id, "scanner_grade_id": scanner_grade_id}
+            values.update({d: v for d, v in dimensions.items() if v is not None})
+            kind = "update"
+        else:
+            inspector_grade_id = self._grade_id(raw["inspector_grade"]) if raw.get("inspector_grade") else None
+            if inspector_grade_id is None:
+                self._error(row_number, f"pieza {item_number}: no está registrada y el archivo no trae grado del inspector válido")
+                return None
+            values = {
+                "step_id": self.step.id,
+                "item_number": item_number,
+                "inspector_grade_id": inspector_grade_id,
+                "scanner_grade_id": scanner_grade_id,
+                **{d: dimensions.get(d) for d in DIMENSIONS},
+            }
+            kind = "insert"
+
+        # Sin los dos rangos el estado guardado quedaría desactualizado: la fila se rechaza
+        inspector_rank, scanner_rank = self.ranks.get(inspector_grade_id), self.ranks.get(scanner_grade_id)
+        if inspector_rank is None or scanner_rank is None:
+            self._error(row_number, f"pieza {item_number}: grado del inspector o del escáner sin grade_rank")
+            return None
+        values["winner"] = scanner_stats.classify(inspector_rank, scanner_rank)
+        return kind, values
+
+    def run(self, rows):
+        self._load_reference_data()
+        db = self.db
+        updates, inserts = [], []
+        try:
+            for row_number, raw in rows:
+                self.report["rows_read"] += 1
+                built = self._build_row(row_number, raw)
+                if built is None:
+                    continue
+                kind, values = built
+                (updates if kind == "update" else inserts).append(values)
+                # Escritura por bloques dentro de la misma transacción para acotar la memoria
+                if len(updates) + len(inserts) >= CHUNK_SIZE:
+                    self._flush(updates, inserts)
+                    updates, inserts = [], []
+            self._flush(updates, inserts)
+            # Hay piezas que cambian de estado: se recalculan las llaves de rollup del estudio
+            scanner_rollups.refresh_rollups_for_steps(db, [self.step.id])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        scanner_stats.mark_items_changed()
+        return self.report
+
+    def _flush(self, updates, inserts):
+        db = self.db
+        # Las filas se agrupan por columnas presentes para que cada executemany use una sola sentencia
+        for _, group in itertools.groupby(sorted(updates, key=lambda v: sorted(v)), key=lambda v: sorted(v)):
+            group = list(group)
+            db.execute(update(models.ScannerItem), group)
+            self.report["items_updated"] += len(group)
+        if inserts:
+            db.execute(insert(models.ScannerItem), inserts)
+            self.report["items_created"] += len(inserts)
+
+
+def import_scanner_pieces(db: Session, step: models.ScannerStep, binary_file):
+    return ScannerPieceImporter(db, step).run(iter_piece_rows(binary_file))
@@ -0,0 +1,125 @@
+import asyncio
+import threading
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from database import models
+from services import scanner_stats
+
+# Transmisión en vivo de las estadísticas de un estudio (SSE).
+# Solo los estudios con espectadores tienen contadores en memoria; cada espectador tiene una cola de
+# tamaño 1 que guarda únicamente la última instantánea, así la memoria no crece con espectadores lentos.
+MAX_VIEWERS = 1000
+HEARTBEAT_SECONDS = 15
+
+
+class StepFeed:
+    def __init__(self, counts: dict, loaded_through_id: int):
+        self.counts = dict(counts)
+        # Piezas con id <= a este valor ya estaban en los contadores al cargarlos
+        self.loaded_through_id = loaded_through_id
+        self.subscribers = set()  # (loop, queue)
+
+    def snapshot(self):
+        """Conteos y precisión del estudio. Sin `weighted`: las estadísticas ponderadas por valor recorren
+        todas las piezas del estudio y no se mantienen en O(1); se consultan en /steps/{id}/stats."""
+        return scanner_stats.stats_from_status_counts(self.counts)
+
+
+class LiveFeedHub:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._feeds = {}
+        self._viewers = 0
+
+    @staticmethod
+    def _load(db: Session, step_id: int):
+        counts = scanner_stats.status_counts(db, models.ScannerItem.step_id == step_id)
+        max_id = db.query(func.max(models.ScannerItem.id)).filter(models.ScannerItem.step_id == step_id).scalar()
+        return counts, max_id or 0
+
+    def subscribe(self, db: Session, step_id: int, loop):
+        """Registra un espectador. Retorna (cola, instantánea inicial) o None si se alcanzó MAX_VIEWERS."""
+        queue = asyncio.Queue(maxsize=1)
+        with self._lock:
+            if self._viewers >= MAX_VIEWERS:
+                return None
+            feed = self._feeds.get(step_id)
+            if feed is None:
+                # Se carga bajo el lock para que ninguna publicación quede entre la lectura y el registro
+                feed = StepFeed(*self._load(db, step_id))
+                self._feeds[step_id] = feed
+            feed.subscribers.add((loop, queue))
+            self._viewers += 1
+            return queue, feed.snapshot()
+
+    def unsubscribe(self, step_id: int, queue):
+        with self._lock:
+            feed = self._feeds.get(step_id)
+            if feed is None:
+                return
+            remaining = {s for s in feed.subscribers if s[1] is not queue}
+            self._viewers -= len(feed.subscribers) - len(remaining)
+            feed.subscribers = remaining
+            if not remaining:
+                del self._feeds[step_id]
+
+    def publish(self, db: Session, step_id: int, counts: dict, item_ids):
+        """Suma piezas ya confirmadas (estado -> cantidad) a los contadores en O(1) y notifica a los espectadores.
+
+        item_ids son los ids insertados. Si alguno no es posterior a lo ya contado (el feed se cargó después
+        del commit, o otra alta con ids mayores publicó antes) no se sabe qué parte ya está incluida y se
+        recargan los contadores desde la base.
+        """
+        if not item_ids:
+            return
+        with self._lock:
+            feed = self._feeds.get(step_id)
+            if feed is None:
+                return
+            if min(item_ids) <= feed.loaded_through_id:
+                feed.counts, feed.loaded_through_id = self._load(db, step_id)
+            else:
+                for status, pieces in counts.items():
+                    feed.counts[status] = feed.counts.get(status, 0) + pieces
+                feed.loaded_through_id = max(item_ids)
+            self._notify(feed)
+
+    def reload(self, db: Session, step_id: int):
+        """Recarga los contadores desde la base (cuando cambian estados de piezas existentes)."""
+        with self._lock:
+            feed = self._feeds.get(step_id)
+            if feed is None:
+                return
+            feed.counts, feed.loaded_through_id = self._load(db, step_id)
+            self._notify(feed)
+
+    @staticmethod
+    def _notify(feed: StepFeed):
+        snapshot = feed.snapshot()
+        for loop, queue in feed.subscribers:
+            loop.call_soon_threadsafe(_offer_latest, queue, snapshot)
+
+
+def _offer_latest(queue: asyncio.Queue, snapshot):
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(snapshot)
+
+
+async def stream_events(request, queue: asyncio.Queue, initial):
+    """Genera eventos SSE: la instantánea inicial, luego cada actualización y un latido periódico."""
+    yield _format_event(initial)
+    while not await request.is_disconnected():
+        try:
+            snapshot = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+        except asyncio.TimeoutError:
+            yield ": keepalive\n\n"
+            continue
+        yield _format_event(snapshot)
+
+
+def _format_event(stats):
+    return f"event: stats\ndata: {stats.model_dump_json()}\n\n"
+
+
+hub = LiveFeedHub()
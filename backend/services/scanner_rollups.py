@@ -0,0 +1,122 @@
+from sqlalchemy import select, func, case, literal, delete, tuple_
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from database import models
+from services import scanner_stats
+
+ROLLUP_COLUMNS = [
+    "day", "shift", "machine", "product_name",
+    "pieces_evaluated", "pieces_in_grade", "pieces_over_grade", "pieces_under_grade",
+]
+KEY_COLUMNS = ROLLUP_COLUMNS[:4]
+COUNT_COLUMNS = ROLLUP_COLUMNS[4:]
+
+
+def _key_expressions():
+    """Llave del rollup calculada desde el encabezado del estudio.
+
+    Los estudios sin fecha no tienen día y quedan fuera de los rollups (ver _has_day).
+    """
+    step = models.ScannerStep
+    return [
+        func.date(step.date),
+        func.coalesce(step.shift, ""),
+        func.coalesce(step.machine, ""),
+        func.coalesce(step.product_name, ""),
+    ]
+
+
+def _has_day():
+    # Un day NULL en la llave primaria no choca en el upsert y duplicaría filas
+    return models.ScannerStep.date.isnot(None)
+
+
+def _hot_days():
+    """Días con estudios en la base activa. Los días ya archivados (services/archive.py mueve días completos)
+    no tienen piezas de dónde recalcular: sus filas de rollup se conservan como historial de tendencias."""
+    return select(func.date(models.ScannerStep.date)).where(_has_day()).distinct()
+
+
+def _rollup_select():
+    """SELECT agregado de scanner_items por llave de rollup, con las mismas columnas que scanner_rollups."""
+    item = models.ScannerItem
+    keys = _key_expressions()
+    return select(
+        *keys,
+        func.count(item.id),
+        func.count(case((item.winner == scanner_stats.STATUS_MATCH, 1))),
+        func.count(case((item.winner == scanner_stats.STATUS_OVERGRADE, 1))),
+        func.count(case((item.winner == scanner_stats.STATUS_UNDERGRADE, 1))),
+    ).select_from(item).join(models.ScannerStep, item.step_id == models.ScannerStep.id).where(
+        _has_day()
+    ).group_by(*keys)
+
+
+def _upsert_adding(stmt):
+    return stmt.on_conflict_do_update(
+        index_elements=[getattr(models.ScannerRollup, c) for c in KEY_COLUMNS],
+        set_={c: getattr(models.ScannerRollup, c) + getattr(stmt.excluded, c) for c in COUNT_COLUMNS}
+    )
+
+
+def apply_status_counts(db: Session, step_id: int, counts: dict):
+    """Suma al rollup del estudio las piezas nuevas (estado -> cantidad) en una sola sentencia.
+
+    No hace commit: debe ejecutarse en la misma transacción que el alta de las piezas.
+    """
+    evaluated = sum(counts.values())
+    if not evaluated:
+        return
+    source = select(
+        *_key_expressions(),
+        literal(evaluated),
+        literal(counts.get(scanner_stats.STATUS_MATCH, 0)),
+        literal(counts.get(scanner_stats.STATUS_OVERGRADE, 0)),
+        literal(counts.get(scanner_stats.STATUS_UNDERGRADE, 0)),
+    ).where(models.ScannerStep.id == step_id, _has_day())
+    db.execute(_upsert_adding(sqlite_insert(models.ScannerRollup).from_select(ROLLUP_COLUMNS, source)))
+
+
+def refresh_rollups_for_steps(db: Session, step_ids):
+    """Recalcula las llaves de rollup que tocan estos estudios (para cambios de estado de piezas existentes).
+
+    Los estudios están en la base activa, así que sus llaves son de días que no se han archivado. No hace commit.
+    """
+    step_ids = list(step_ids)
+    if not step_ids:
+        return
+    keys = db.execute(
+        select(*_key_expressions()).where(models.ScannerStep.id.in_(step_ids), _has_day()).distinct()
+    ).all()
+    if not keys:
+        return
+    keys = [tuple(k) for k in keys]
+    rollup_key = tuple_(*[getattr(models.ScannerRollup, c) for c in KEY_COLUMNS])
+    db.execute(delete(models.ScannerRollup).where(rollup_key.in_(keys)))
+    source = _rollup_select().where(tuple_(*_key_expressions()).in_(keys))
+    db.execute(sqlite_insert(models.ScannerRollup).from_select(ROLLUP_COLUMNS, source))
+
+
+def rebuild_all_rollups(db: Session) -> int:
+    """Reconstruye scanner_rollups desde scanner_items para los días con estudios en la base activa; las filas
+    de días archivados se conservan. Retorna filas escritas."""
+    db.execute(delete(models.ScannerRollup).where(models.ScannerRollup.day.in_(_hot_days())))
+    result = db.execute(sqlite_insert(models.ScannerRollup).from_select(ROLLUP_COLUMNS, _rollup_select()))
+    db.commit()
+    return result.rowcount
+
+
+def find_rollup_mismatches(db: Session):
+    """Compara scanner_rollups con el agregado de scanner_items en los días con estudios en la base activa
+    (los días archivados no tienen piezas contra qué comparar). Retorna [(llave, almacenado, esperado)]."""
+    expected = {tuple(row[:4]): tuple(row[4:]) for row in db.execute(_rollup_select())}
+    stored = {
+        (row.day.isoformat(), row.shift, row.machine, row.product_name):
+            (row.pieces_evaluated, row.pieces_in_grade, row.pieces_over_grade, row.pieces_under_grade)
+        for row in db.query(models.ScannerRollup).filter(models.ScannerRollup.day.in_(_hot_days()))
+    }
+    return [
+        (key, stored.get(key), expected.get(key))
+        for key in sorted(set(expected) | set(stored))
+        if expected.get(key) != stored.get(key)
+    ]
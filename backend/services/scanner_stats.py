@@ -0,0 +1,163 @@
+import threading
+from collections import OrderedDict
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from database import models
+import schemas
+
+# Estado guardado en ScannerItem.winner al comparar el grado del escáner con el del inspector
+# (grade_rank 1 es el mejor grado)
+STATUS_MATCH = "Match"
+STATUS_OVERGRADE = "Overgrade"    # El escáner asignó un grado mejor que el real
+STATUS_UNDERGRADE = "Undergrade"  # El escáner asignó un grado peor que el real
+
+
+def classify(inspector_rank: int, scanner_rank: int) -> str:
+    if scanner_rank < inspector_rank:
+        return STATUS_OVERGRADE
+    if scanner_rank > inspector_rank:
+        return STATUS_UNDERGRADE
+    return STATUS_MATCH
+
+
+def build_stats(evaluated: int, in_grade: int, over_grade: int, under_grade: int) -> schemas.ScannerStats:
+    if evaluated == 0:
+        return schemas.ScannerStats(
+            pieces_evaluated=0, pieces_in_grade=0, pieces_over_grade=0, pieces_under_grade=0,
+            assertiveness=0.0, error=0.0
+        )
+    return schemas.ScannerStats(
+        pieces_evaluated=evaluated,
+        pieces_in_grade=in_grade,
+        pieces_over_grade=over_grade,
+        pieces_under_grade=under_grade,
+        assertiveness=(in_grade / evaluated),
+        error=((over_grade + under_grade) / evaluated)
+    )
+
+
+def stats_from_status_counts(counts: dict) -> schemas.ScannerStats:
+    """counts: estado -> piezas. Estados desconocidos cuentan como evaluados sin clasificar."""
+    return build_stats(
+        sum(counts.values()),
+        counts.get(STATUS_MATCH, 0),
+        counts.get(STATUS_OVERGRADE, 0),
+        counts.get(STATUS_UNDERGRADE, 0),
+    )
+
+
+def status_counts(db: Session, *criteria, join_steps: bool = False) -> dict:
+    """Un GROUP BY sobre el estado guardado de las piezas que cumplen `criteria`.
+
+    Con join_steps=True los criterios pueden filtrar columnas de ScannerStep (máquina, fecha, ...).
+    """
+    query = db.query(models.ScannerItem.winner, func.count(models.ScannerItem.id))
+    if join_steps:
+        query = query.join(models.ScannerStep, models.ScannerItem.step_id == models.ScannerStep.id)
+    return dict(query.filter(*criteria).group_by(models.ScannerItem.winner).all())
+
+
+# Versión en proceso de las piezas: todo camino que inserta, modifica o borra piezas la incrementa
+_items_version = 0
+_items_version_lock = threading.Lock()
+
+
+def mark_items_changed():
+    global _items_version
+    with _items_version_lock:
+        _items_version += 1
+
+
+def data_stamp(db: Session):
+    """(versión, id máximo) de scanner_items: cambia cuando llegan, se modifican o se borran piezas.
+
+    MAX(id) se resuelve con la llave primaria sin recorrer la tabla y detecta altas hechas por otro proceso;
+    la versión cubre lo demás (incluido un id reutilizado tras borrar las últimas piezas).
+    """
+    max_id = db.query(func.max(models.ScannerItem.id)).scalar()
+    return (_items_version, max_id)
+
+
+def confusion_counts(db: Session, *criteria):
+    """Un GROUP BY (grado inspector, grado escáner) sobre las piezas de los estudios que cumplen `criteria`."""
+    return db.query(
+        models.ScannerItem.inspector_grade_id,
+        models.ScannerItem.scanner_grade_id,
+        func.count(models.ScannerItem.id)
+    ).join(
+        models.ScannerStep, models.ScannerItem.step_id == models.ScannerStep.id
+    ).filter(*criteria).group_by(
+        models.ScannerItem.inspector_grade_id, models.ScannerItem.scanner_grade_id
+    ).all()
+
+
+class ConfusionCountsCache:
+    """Conteos de la matriz de confusión por conjunto de filtros, válidos mientras no cambien las piezas."""
+
+    def __init__(self, max_entries: int = 128):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.max_entries = max_entries
+
+    def get(self, db: Session, filters: tuple, *criteria):
+        stamp = data_stamp(db)
+        with self._lock:
+            entry = self._entries.get(filters)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(filters)
+                return entry[1]
+
+        counts = confusion_counts(db, *criteria)
+        with self._lock:
+            self._entries[filters] = (stamp, counts)
+            self._entries.move_to_end(filters)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return counts
+
+
+confusion_cache = ConfusionCountsCache()
+
+
+def build_confusion_matrix(counts, grades) -> schemas.ConfusionMatrix:
+    """Matriz densa filas=grado del inspector, columnas=grado del escáner, en el orden de `grades`.
+
+    `grades` ya viene ordenado por grade_rank; los ids de `counts` que no estén en la lista se agregan al final.
+    """
+    grades = list(grades)
+    known = {grade.id for grade in grades}
+    extra_ids = sorted({gid for i, s, _ in counts for gid in (i, s) if gid not in known and gid is not None})
+    axis = [(grade.id, grade.name, grade.grade_rank) for grade in grades] + [(gid, None, None) for gid in extra_ids]
+    position = {gid: n for n, (gid, _, _) in enumerate(axis)}
+
+    size = len(axis)
+    matrix = [[0] * size for _ in range(size)]
+    for inspector_id, scanner_id, pieces in counts:
+        if inspector_id in position and scanner_id in position:
+            matrix[position[inspector_id]][position[scanner_id]] += pieces
+
+    inspector_totals = [sum(row) for row in matrix]
+    scanner_totals = [sum(matrix[r][c] for r in range(size)) for c in range(size)]
+    evaluated = sum(inspector_totals)
+    correct = sum(matrix[n][n] for n in range(size))
+
+    rows = []
+    for n, (grade_id, name, grade_rank) in enumerate(axis):
+        hits = matrix[n][n]
+        rows.append(schemas.ConfusionMatrixGrade(
+            id=grade_id,
+            name=name,
+            grade_rank=grade_rank,
+            inspector_pieces=inspector_totals[n],
+            scanner_pieces=scanner_totals[n],
+            # Precisión: de lo que el escáner llamó este grado, cuánto lo era. Recall: de lo que era, cuánto detectó.
+            precision=(hits / scanner_totals[n]) if scanner_totals[n] else 0.0,
+            recall=(hits / inspector_totals[n]) if inspector_totals[n] else 0.0,
+        ))
+
+    return schemas.ConfusionMatrix(
+        grades=rows,
+        matrix=matrix,
+        pieces_evaluated=evaluated,
+        assertiveness=(correct / evaluated) if evaluated else 0.0,
+    )
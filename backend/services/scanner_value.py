@@ -0,0 +1,108 @@
+import numpy as np
+from sqlalchemy import select, func, case
+from sqlalchemy.orm import Session
+from database import models
+from services import scanner_stats
+import schemas
+
+# Dimensiones de las piezas en mm (espesor x ancho x largo), igual que en los formularios del estudio
+MM3_PER_M3 = 1e9
+
+STATUS_CODES = {
+    scanner_stats.STATUS_MATCH: 0,
+    scanner_stats.STATUS_OVERGRADE: 1,
+    scanner_stats.STATUS_UNDERGRADE: 2,
+}
+
+
+def _item_columns(db: Session, *criteria):
+    """Columnas numéricas de las piezas de los estudios que cumplen `criteria`, en una sola consulta.
+
+    Las dimensiones faltantes en la pieza se toman de los valores por defecto del estudio.
+    """
+    item, step = models.ScannerItem, models.ScannerStep
+    stmt = select(
+        step.market_id,
+        item.inspector_grade_id,
+        item.scanner_grade_id,
+        func.coalesce(item.thickness, step.default_thickness),
+        func.coalesce(item.width, step.default_width),
+        func.coalesce(item.length, step.default_length),
+        case(*[(item.winner == status, code) for status, code in STATUS_CODES.items()], else_=-1),
+    ).select_from(item).join(step, item.step_id == step.id).where(*criteria)
+
+    rows = db.execute(stmt).all()
+    # None -> nan al convertir a float
+    data = np.array(rows, dtype=float).reshape(len(rows), 7)
+    return {
+        "market_id": data[:, 0],
+        "inspector_grade_id": data[:, 1],
+        "scanner_grade_id": data[:, 2],
+        "volume": data[:, 3] * data[:, 4] * data[:, 5] / MM3_PER_M3,
+        "status": data[:, 6],
+    }
+
+
+def price_table(db: Session):
+    """Matriz densa precio[grade_id, market_id] (nan donde no hay precio cargado)."""
+    prices = db.query(models.GradePrice.grade_id, models.GradePrice.market_id, models.GradePrice.price).all()
+    if not prices:
+        return np.full((1, 1), np.nan)
+    table = np.full((max(p[0] for p in prices) + 1, max(p[1] for p in prices) + 1), np.nan)
+    for grade_id, market_id, price in prices:
+        table[grade_id, market_id] = price
+    return table
+
+
+def lookup_prices(table, grade_ids, market_ids):
+    """Precio por pieza; nan si falta el grado, el mercado o el precio."""
+    valid = (
+        ~np.isnan(grade_ids) & ~np.isnan(market_ids)
+        & (grade_ids >= 0) & (grade_ids < table.shape[0])
+        & (market_ids >= 0) & (market_ids < table.shape[1])
+    )
+    result = np.full(grade_ids.shape, np.nan)
+    result[valid] = table[grade_ids[valid].astype(int), market_ids[valid].astype(int)]
+    return result
+
+
+def compute_weighted_stats(columns, prices) -> schemas.ScannerWeightedStats:
+    """Precisión por volumen y pérdida monetaria por sobre/bajo grado, vectorizado sobre todas las piezas."""
+    volume = columns["volume"]
+    status = columns["status"]
+    has_volume = ~np.isnan(volume)
+    volume = np.where(has_volume, volume, 0.0)
+
+    inspector_price = lookup_prices(prices, columns["inspector_grade_id"], columns["market_id"])
+    scanner_price = lookup_prices(prices, columns["scanner_grade_id"], columns["market_id"])
+    has_price = ~np.isnan(inspector_price) & ~np.isnan(scanner_price)
+
+    # Igual que la planilla: piezas sin precio valen 0
+    inspector_value = np.where(has_price, volume * np.nan_to_num(inspector_price), 0.0)
+    scanner_value = np.where(has_price, volume * np.nan_to_num(scanner_price), 0.0)
+
+    over = status == STATUS_CODES[scanner_stats.STATUS_OVERGRADE]
+    under = status == STATUS_CODES[scanner_stats.STATUS_UNDERGRADE]
+    match = status == STATUS_CODES[scanner_stats.STATUS_MATCH]
+
+    volume_evaluated = float(volume.sum())
+    volume_in_grade = float(volume[match].sum())
+    return schemas.ScannerWeightedStats(
+        volume_evaluated=volume_evaluated,
+        volume_in_grade=volume_in_grade,
+        volume_over_grade=float(volume[over].sum()),
+        volume_under_grade=float(volume[under].sum()),
+        volume_assertiveness=(volume_in_grade / volume_evaluated) if volume_evaluated else 0.0,
+        value_inspector=float(inspector_value.sum()),
+        value_scanner=float(scanner_value.sum()),
+        # Sobregrado: el escáner valoriza por encima de lo real. Bajo grado: valor que se deja de percibir.
+        value_overgrade_loss=float((scanner_value - inspector_value)[over].clip(min=0).sum()),
+        value_undergrade_loss=float((inspector_value - scanner_value)[under].clip(min=0).sum()),
+        pieces_without_dimensions=int((~has_volume).sum()),
+        pieces_without_price=int((~has_price).sum()),
+    )
+
+
+def weighted_stats(db: Session, *criteria) -> schemas.ScannerWeightedStats:
+    """criteria filtra columnas de ScannerItem/ScannerStep (un estudio o un mes de estudios)."""
+    return compute_weighted_stats(_item_columns(db, *criteria), price_table(db))
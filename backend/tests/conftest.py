@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# Base de datos temporal para no tocar grading.db; debe fijarse antes de importar `database`
+TEST_DIR = tempfile.mkdtemp()
+DB_FILE = os.path.join(TEST_DIR, "tests.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_FILE}"
+os.environ["ARCHIVE_DIR"] = os.path.join(TEST_DIR, "archive")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
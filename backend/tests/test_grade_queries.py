@@ -0,0 +1,69 @@
+import json
+import pytest
+from sqlalchemy import event
+from starlette.requests import Request
+from database import database, models
+from routers.master_data import get_grades_by_product, get_bootstrap, master_cache
+
+# Cantidad de grados por producto; las sentencias SQL deben ser las mismas para todos
+GRADE_COUNTS = (1, 10, 100)
+DEFECTS_PER_GRADE = 3
+
+
+@pytest.fixture(scope="module")
+def product_ids():
+    models.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    try:
+        defects = [models.Defect(name=f"Defecto {i}", description="") for i in range(DEFECTS_PER_GRADE)]
+        db.add_all(defects)
+        ids = []
+        for count in GRADE_COUNTS:
+            product = models.Product(name=f"Producto {count}")
+            db.add(product)
+            db.flush()
+            # Rangos en orden inverso al de inserción para verificar el orden de la respuesta
+            for rank in range(count, 0, -1):
+                db.add(models.Grade(product_id=product.id, name=f"G{rank}", grade_rank=rank, defects=defects))
+            ids.append(product.id)
+        db.commit()
+    finally:
+        db.close()
+    master_cache.bump()
+    yield ids
+    models.Base.metadata.drop_all(bind=database.engine)
+
+
+def count_statements(call):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(database.engine, "before_cursor_execute", before_cursor_execute)
+    db = database.SessionLocal()
+    try:
+        response = call(db, Request({"type": "http", "headers": []}))
+    finally:
+        db.close()
+        event.remove(database.engine, "before_cursor_execute", before_cursor_execute)
+    return len(statements), response
+
+
+def test_grades_by_product_has_no_n_plus_one(product_ids):
+    counts = []
+    for grades, product_id in zip(GRADE_COUNTS, product_ids):
+        # Cada producto es una clave distinta de la caché de datos maestros: siempre se consulta la base
+        statements, response = count_statements(lambda db, request: get_grades_by_product(product_id, request, db))
+        assert response.body.count(b'"defects"') == grades
+        counts.append(statements)
+    assert len(set(counts)) == 1, f"la cantidad de sentencias crece con los grados (N+1): {counts}"
+
+
+def test_bootstrap_uses_fixed_queries_and_orders_grades(product_ids):
+    statements, response = count_statements(lambda db, request: get_bootstrap(request, db))
+    # Productos, grados, defectos (selectinload), mercados y catálogos
+    assert statements == 5
+    for product in json.loads(response.body)["products"]:
+        ranks = [grade["grade_rank"] for grade in product["grades"]]
+        assert ranks == sorted(ranks)
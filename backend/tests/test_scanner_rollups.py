@@ -0,0 +1,69 @@
+from collections import Counter
+from datetime import date, datetime
+import pytest
+from database import database, models
+from routers.scanner import get_scanner_trends
+from services import archive, scanner_rollups, scanner_stats
+
+
+@pytest.fixture
+def db():
+    models.Base.metadata.create_all(bind=database.engine)
+    session = database.SessionLocal()
+    yield session
+    session.close()
+    models.Base.metadata.drop_all(bind=database.engine)
+
+
+def add_step(db, market_id, grades, when, statuses):
+    """Estudio con una pieza por estado de `statuses`, sumada al rollup como lo hace el endpoint de carga."""
+    step = models.ScannerStep(date=when, supervisor="S", market_id=market_id, shift="A", machine="M1", product_name="P")
+    db.add(step)
+    db.flush()
+    best, worst = grades
+    pairs = {
+        scanner_stats.STATUS_MATCH: (best, best),
+        scanner_stats.STATUS_OVERGRADE: (worst, best),
+        scanner_stats.STATUS_UNDERGRADE: (best, worst),
+    }
+    for number, status in enumerate(statuses, start=1):
+        inspector, scanner = pairs[status]
+        db.add(models.ScannerItem(
+            step_id=step.id, item_number=number, inspector_grade_id=inspector.id, scanner_grade_id=scanner.id, winner=status
+        ))
+    scanner_rollups.apply_status_counts(db, step.id, Counter(statuses))
+    db.commit()
+    return step
+
+
+def trend_points(db, date_from, date_to):
+    return get_scanner_trends(
+        machine=None, product_name=None, shift=None, date_from=date_from, date_to=date_to, window=7, db=db
+    )["points"]
+
+
+def test_rebuild_after_archive_keeps_archived_days(db):
+    market = models.Market(name="Mercado")
+    product = models.Product(name="P")
+    db.add_all([market, product])
+    db.flush()
+    grades = (models.Grade(product_id=product.id, name="A", grade_rank=1),
+              models.Grade(product_id=product.id, name="B", grade_rank=2))
+    db.add_all(grades)
+    db.commit()
+
+    match, under = scanner_stats.STATUS_MATCH, scanner_stats.STATUS_UNDERGRADE
+    add_step(db, market.id, grades, datetime(2020, 3, 2, 8), [match, match, under])
+    add_step(db, market.id, grades, datetime(2026, 3, 2, 8), [match, under])
+
+    report = archive.run_archive(db, date(2021, 1, 1))
+    assert report["scanner_steps"] == 1
+    assert db.query(models.ScannerItem).count() == 2
+
+    scanner_rollups.rebuild_all_rollups(db)
+    assert scanner_rollups.find_rollup_mismatches(db) == []
+
+    archived = trend_points(db, date(2020, 3, 1), date(2020, 3, 31))
+    assert [(p["day"], p["pieces_evaluated"], p["pieces_in_grade"]) for p in archived] == [(date(2020, 3, 2), 3, 2)]
+    hot = trend_points(db, date(2026, 3, 1), date(2026, 3, 31))
+    assert [(p["day"], p["pieces_evaluated"], p["pieces_in_grade"]) for p in hot] == [(date(2026, 3, 2), 2, 1)]
@@ -60,8 +60,16 @@ export const deleteUser = async (id) => {
 
 // --- Datos Maestros ---
 
-export const getCatalogItems = async (category) => {
-    const response = await api.get(`/master-data/catalogs/${category}`);
+export const getCatalogItems = async (category, includeInactive = false) => {
+    const response = await api.get(`/master-data/catalogs/${category}`, {
+        params: includeInactive ? { include_inactive: true } : {},
+    });
+    return response.data;
+};
+
+// Autocompletado: ítems activos que empiezan con el texto (sin distinguir mayúsculas ni tildes)
+export const searchCatalogItems = async (category, q, limit = 20) => {
+    const response = await api.get(`/master-data/catalogs/${category}/search`, { params: { q, limit } });
     return response.data;
 };
 
@@ -123,6 +131,12 @@ export const getGradesByProduct = async (productId) => {
     return response.data;
 };
 
+// Jerarquía completa (productos -> grados -> defectos), mercados y catálogos activos en una sola solicitud
+export const getMasterDataBootstrap = async () => {
+    const response = await api.get('/master-data/bootstrap');
+    return response.data;
+};
+
 export const createGrade = async (data) => {
     const response = await api.post('/master-data/grades', data);
     return response.data;
@@ -167,8 +181,30 @@ export const getInspectionResults = async (inspectionId) => {
     return response.data;
 };
 
-export const getInspectionsList = async () => {
-    const response = await api.get('/api/inspections');
+export const importInspections = async (file) => {
+    const formData = new FormData();
+    formData.append('file', file);
+    const response = await api.post('/api/inspections/import', formData, {
+        headers: {
+            'Content-Type': 'multipart/form-data',
+        },
+    });
+    return response.data;
+};
+
+export const lookupLots = async (prefix, limit = 20) => {
+    const response = await api.get('/api/lots', { params: { prefix, limit } });
+    return response.data;
+};
+
+export const getInspectionSummary = async (inspectionId) => {
+    const response = await api.get(`/api/inspections/${inspectionId}/summary`);
+    return response.data;
+};
+
+// Devuelve una página { items, next_cursor }; pasar next_cursor como `cursor` para la siguiente
+export const getInspectionsList = async (params = {}) => {
+    const response = await api.get('/api/inspections', { params });
     return response.data;
 };
 
@@ -204,9 +240,10 @@ export const createScannerStep = async (data) => {
     return response.data;
 };
 
-export const getScannerSteps = async () => {
-    const response = await api.get('/api/scanner/steps');
-    return response.data;
+export const getScannerSteps = async (params = {}) => {
+    // Listado liviano (encabezado + conteos); el detalle con piezas se pide con getScannerStep
+    const response = await api.get('/api/scanner/steps/summary', { params });
+    return response.data.items;
 };
 
 export const getScannerStep = async (id) => {
@@ -224,6 +261,25 @@ export const getScannerStats = async (stepId) => {
     return response.data;
 };
 
+// Estadísticas en vivo del estudio (Server-Sent Events). Retorna una función para cerrar la conexión.
+// Los eventos no traen `weighted` (estadísticas ponderadas por valor): para eso usar getScannerStats.
+export const subscribeScannerStats = (stepId, onStats) => {
+    const source = new EventSource(`${api.defaults.baseURL}/api/scanner/steps/${stepId}/live`);
+    source.addEventListener('stats', (event) => onStats(JSON.parse(event.data)));
+    return () => source.close();
+};
+
+export const importScannerFile = async (stepId, file) => {
+    const formData = new FormData();
+    formData.append('file', file);
+    const response = await api.post(`/api/scanner/steps/${stepId}/import`, formData, {
+        headers: {
+            'Content-Type': 'multipart/form-data',
+        },
+    });
+    return response.data;
+};
+
 export const downloadInspectionsCsv = async (filters) => {
     try {
         const response = await api.get('/api/exports/inspections/csv', {
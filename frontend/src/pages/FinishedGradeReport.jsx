@@ -2,7 +2,7 @@
 // Importacion de librerias y componentes necesarios
 import { useState, useEffect } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
-import { getInspection, getInspectionResults } from '../api';
+import { getInspection, getInspectionSummary } from '../api';
 import { ArrowLeft, Printer } from 'lucide-react';
 
 // Componente Principal: Reporte de Producto Terminado
@@ -23,51 +23,26 @@ export default function FinishedGradeReport() {
     // Función: loadData (Cargar Datos)
     const loadData = async () => {
         try {
-            const inspData = await getInspection(id);
-            const resData = await getInspectionResults(id);
+            const [inspData, summary] = await Promise.all([getInspection(id), getInspectionSummary(id)]);
             setInspection(inspData);
-            calculateStats(resData); // Procesa los datos una vez cargados
+            setStats(buildStats(summary));
         } catch (error) {
             console.error("Error loading report data", error);
         }
     };
 
-    // Función: calculateStats (Calcular Estadísticas)
-    const calculateStats = (data) => {
-        const total = data.reduce((acc, curr) => acc + curr.pieces_count, 0);
-
-        // Resumen de Grados (Grade Summary)
-        const gradeMap = {};
+    // Función: buildStats (Adaptar Resumen)
+    // El backend entrega los totales agregados; aquí solo se agrupan los defectos bajo su grado
+    const buildStats = (summary) => {
         const defectsByGradeMap = {};
-
-        data.forEach(item => {
-            const gName = item.grade?.name || 'Unknown';
-            if (!gradeMap[gName]) gradeMap[gName] = 0;
-            gradeMap[gName] += item.pieces_count;
-
-            // Inicializar estructura para defectos por grado
-            if (!defectsByGradeMap[gName]) {
-                defectsByGradeMap[gName] = { total: 0, defects: {} };
-            }
-            defectsByGradeMap[gName].total += item.pieces_count;
-
-            // Agrupar defectos dentro de este grado
-            if (item.defect && item.defect.name) {
-                const dName = item.defect.name;
-                if (!defectsByGradeMap[gName].defects[dName]) {
-                    defectsByGradeMap[gName].defects[dName] = 0;
-                }
-                defectsByGradeMap[gName].defects[dName] += item.pieces_count;
-            }
+        summary.grades.forEach(grade => {
+            defectsByGradeMap[grade.name] = { total: grade.count, defects: {} };
+        });
+        summary.grade_defects.forEach(row => {
+            defectsByGradeMap[row.grade_name].defects[row.defect_name] = row.count;
         });
 
-        const gradeSummary = Object.keys(gradeMap).map(name => ({
-            name,
-            count: gradeMap[name],
-            percentage: total ? (gradeMap[name] / total) * 100 : 0
-        })).sort((a, b) => b.count - a.count); // Ordena descendente por cantidad
-
-        setStats({ gradeSummary, defectsByGrade: defectsByGradeMap, totalPieces: total });
+        return { gradeSummary: summary.grades, defectsByGrade: defectsByGradeMap, totalPieces: summary.total_pieces };
     };
 
     if (!inspection) return <div className="ga-page u-center u-muted">Cargando reporte...</div>;
@@ -2,8 +2,8 @@
 import React, { useState, useEffect } from 'react';
 import { useAuth } from '../context/AuthContext';
 import {
-    getScannerSteps, createScannerStep, getScannerStep, addScannerItem, getScannerStats,
-    getProducts, getGradesByProduct, getCatalogItems, getMarkets
+    getScannerSteps, createScannerStep, getScannerStep, addScannerItem, getScannerStats, subscribeScannerStats,
+    getMasterDataBootstrap, searchCatalogItems
 } from '../api';
 import {
     Plus, Search, BarChart2, CheckCircle2, AlertTriangle, XCircle,
@@ -27,7 +27,6 @@ export default function FinscanStudy() {
     const [shifts, setShifts] = useState([]);
     const [areas, setAreas] = useState([]);
     const [machines, setMachines] = useState([]);
-    const [supervisors, setSupervisors] = useState([]);
     const [lengths, setLengths] = useState([]);
 
 
@@ -49,12 +48,12 @@ export default function FinscanStudy() {
         loadStudies();
     }, []);
 
-    // Load Grades when Active Study is set
+    // Grades of the active study's product (already included in the bootstrap payload)
     useEffect(() => {
         if (activeStudy?.product_name && products.length > 0) {
             const product = products.find(p => p.name === activeStudy.product_name);
             if (product) {
-                getGradesByProduct(product.id).then(setGrades);
+                setGrades(product.grades);
             }
         }
     }, [activeStudy, products]);
@@ -66,19 +65,21 @@ export default function FinscanStudy() {
         }
     }, [activeStudy, lastAdded]);
 
+    // Stats pushed by the server while the study is open (other devices adding pieces)
+    useEffect(() => {
+        if (!activeStudy?.id) return;
+        return subscribeScannerStats(activeStudy.id, setStats);
+    }, [activeStudy?.id]);
+
     const loadMasterData = async () => {
-        const [p, m, s, a, ma, sup, l] = await Promise.all([
-            getProducts(), getMarkets(), getCatalogItems('shift'),
-            getCatalogItems('area'), getCatalogItems('machine'), getCatalogItems('supervisor'),
-            getCatalogItems('length')
-        ]);
+        // Products (with grades), markets and active catalogs in a single request
+        const { products: p, markets: m, catalogs } = await getMasterDataBootstrap();
         setProducts(p);
         setMarkets(m);
-        setShifts(s);
-        setAreas(a);
-        setMachines(ma);
-        setSupervisors(sup);
-        setLengths(l.sort((a, b) => parseFloat(a.name) - parseFloat(b.name)));
+        setShifts(catalogs.shift || []);
+        setAreas(catalogs.area || []);
+        setMachines(catalogs.machine || []);
+        setLengths((catalogs.length || []).sort((a, b) => parseFloat(a.name) - parseFloat(b.name)));
     };
 
     const loadStudies = async () => {
@@ -196,7 +197,7 @@ export default function FinscanStudy() {
                                 <div>
                                     <h3 className="ga-card__title">{study.product_name}</h3>
                                     <div className="u-flex u-gap-4 u-muted u-mt-2" style={{ fontSize: '0.875rem' }}>
-                                        <span>📅 {new Date(study.date).toLocaleDateString()}</span>
+                                        <span>📅 {study.date ? new Date(study.date).toLocaleDateString() : 'Sin fecha'}</span>
                                         <span>👤 {study.responsible}</span>
                                         <span>🏭 {study.shift}</span>
                                     </div>
@@ -218,7 +219,7 @@ export default function FinscanStudy() {
                 {view === 'create' && (
                     <StudyCreateForm
                         onSubmit={handleCreateStudy}
-                        masterData={{ products, markets, shifts, areas, machines, supervisors, lengths }}
+                        masterData={{ products, markets, shifts, areas, machines, lengths }}
                         user={user}
                         onCancel={() => setView('list')}
                     />
@@ -282,7 +283,7 @@ function StudyCreateForm({ onSubmit, masterData, user, onCancel }) {
                             <SelectField label="Turno" name="shift" value={form.shift} onChange={(v) => setForm({ ...form, shift: v })} options={masterData.shifts} valueKey="name" />
                             <SelectField label="Area" name="area" value={form.area} onChange={(v) => setForm({ ...form, area: v })} options={masterData.areas} valueKey="name" />
                             <SelectField label="Máquina" name="machine" value={form.machine} onChange={(v) => setForm({ ...form, machine: v })} options={masterData.machines} valueKey="name" />
-                            <SelectField label="Supervisor" name="supervisor" value={form.supervisor} onChange={(v) => setForm({ ...form, supervisor: v })} options={masterData.supervisors} valueKey="name" />
+                            <CatalogSearchField label="Supervisor" category="supervisor" value={form.supervisor} onChange={(v) => setForm({ ...form, supervisor: v })} />
                         </div>
                     </div>
 
@@ -331,6 +332,44 @@ function SelectField({ label, name, value, onChange, options, valueKey = 'id' })
     );
 }
 
+// Text field with server-side suggestions, for catalogs too large to send whole in a dropdown
+function CatalogSearchField({ label, category, value, onChange }) {
+    const [options, setOptions] = useState([]);
+    const listId = `catalog-search-${category}`;
+
+    useEffect(() => {
+        let cancelled = false;
+        // Wait for a pause in typing before asking the server
+        const timer = setTimeout(() => {
+            searchCatalogItems(category, value)
+                .then(items => { if (!cancelled) setOptions(items); })
+                .catch(e => console.error("Error searching catalog", e));
+        }, 250);
+        return () => {
+            cancelled = true;
+            clearTimeout(timer);
+        };
+    }, [category, value]);
+
+    return (
+        <div>
+            <label className="ga-label">{label}</label>
+            <input
+                list={listId}
+                value={value}
+                placeholder="Buscar..."
+                onChange={(e) => onChange(e.target.value)}
+                className="ga-control"
+            />
+            <datalist id={listId}>
+                {options.map(o => (
+                    <option key={o.id} value={o.name} />
+                ))}
+            </datalist>
+        </div>
+    );
+}
+
 function InputField({ label, value, onChange, type = "text" }) {
     return (
         <div>
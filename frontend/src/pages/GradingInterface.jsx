@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
-import { getInspection, getGradesByProduct, addInspectionResult, getProducts, getInspectionResults, syncInspectionResults } from '../api'; // Asegurar que getInspectionResults esté importado
+import { getInspection, getMasterDataBootstrap, addInspectionResult, getInspectionResults, syncInspectionResults } from '../api'; // Asegurar que getInspectionResults esté importado
 import { motion, AnimatePresence } from 'framer-motion';
 import { CheckCircle, AlertTriangle, Activity, Database, ChevronRight, X, RotateCcw, Home, Search, Save } from 'lucide-react';
 
@@ -26,29 +26,20 @@ export default function GradingInterface() {
 
     const loadContext = async () => {
         try {
-            const insp = await getInspection(id);
+            // Inspección y datos maestros (productos -> grados -> defectos) en paralelo
+            const [insp, { products }] = await Promise.all([getInspection(id), getMasterDataBootstrap()]);
             setInspection(insp);
 
             // Obtener grados para el producto
             let productGrades = [];
 
             // Intentar product_id explícito si está disponible, de lo contrario buscar por nombre
-            let targetProductId = insp.product_id;
+            const product = insp.product_id
+                ? products.find(p => p.id === insp.product_id)
+                : products.find(p => p.name === insp.product_name);
 
-            if (!targetProductId && insp.product_name) {
-                try {
-                    const allProducts = await getProducts();
-                    const foundProduct = allProducts.find(p => p.name === insp.product_name);
-                    if (foundProduct) {
-                        targetProductId = foundProduct.id;
-                    }
-                } catch (e) {
-                    console.error("Error fetching products to find ID", e);
-                }
-            }
-
-            if (targetProductId) {
-                productGrades = await getGradesByProduct(targetProductId);
+            if (product) {
+                productGrades = product.grades;
             } else {
                 console.warn("No product_id found for inspection", insp);
             }
@@ -2,7 +2,7 @@
 // Importacion de librerias y componentes necesarios
 import { useState, useEffect } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
-import { getInspection, getInspectionResults } from '../api';
+import { getInspection, getInspectionSummary } from '../api';
 import { ArrowLeft, Printer } from 'lucide-react';
 
 // Componente Principal: Reporte de Inspección
@@ -13,8 +13,7 @@ export default function InspectionReport() {
 
     // Estados del componente (State)
     const [inspection, setInspection] = useState(null); // Almacena los datos generales de la inspección
-    const [results, setResults] = useState([]); // Almacena los resultados individuales (piezas)
-    const [stats, setStats] = useState({ gradeSummary: [], defectSummary: [], totalPieces: 0 }); // Almacena estadísticas calculadas
+    const [stats, setStats] = useState({ gradeSummary: [], defectSummary: [], totalPieces: 0 }); // Almacena estadísticas agregadas
 
     // Efecto de carga inicial
     // Se ejecuta cuando cambia el 'id' de la inspección
@@ -23,61 +22,21 @@ export default function InspectionReport() {
     }, [id]);
 
     // Función: loadData (Cargar Datos)
-    // Obtiene la información de la inspección y sus resultados desde el backend
+    // Obtiene la información de la inspección y su resumen ya agregado por el backend
     const loadData = async () => {
         try {
-            const inspData = await getInspection(id);
-            const resData = await getInspectionResults(id);
+            const [inspData, summary] = await Promise.all([getInspection(id), getInspectionSummary(id)]);
             setInspection(inspData);
-            setResults(resData);
-            calculateStats(resData); // Procesa los datos una vez cargados
+            setStats({
+                gradeSummary: summary.grades,
+                defectSummary: summary.defects,
+                totalPieces: summary.total_pieces
+            });
         } catch (error) {
             console.error("Error loading report data", error);
         }
     };
 
-    // Función: calculateStats (Calcular Estadísticas)
-    // Procesa los datos crudos para generar resúmenes por grado y defecto
-    const calculateStats = (data) => {
-        const total = data.reduce((acc, curr) => acc + curr.pieces_count, 0);
-
-        // Resumen de Grados (Grade Summary)
-        // Agrupa las piezas por nombre de grado
-        const gradeMap = {};
-        data.forEach(item => {
-            const gName = item.grade?.name || 'Unknown';
-            if (!gradeMap[gName]) gradeMap[gName] = 0;
-            gradeMap[gName] += item.pieces_count;
-        });
-
-        // Transforma el mapa en un array para facilitar el renderizado
-        const gradeSummary = Object.keys(gradeMap).map(name => ({
-            name,
-            count: gradeMap[name],
-            percentage: total ? (gradeMap[name] / total) * 100 : 0
-        })).sort((a, b) => b.count - a.count); // Ordena descendente por cantidad
-
-        // Resumen de Defectos (Defect Summary)
-        // Agrupa las piezas por nombre de defecto
-        const defectMap = {};
-
-        data.forEach(item => {
-            if (item.defect && item.defect.name) {
-                const dName = item.defect.name;
-                if (!defectMap[dName]) defectMap[dName] = 0;
-                defectMap[dName] += item.pieces_count;
-            }
-        });
-
-        const defectSummary = Object.keys(defectMap).map(name => ({
-            name,
-            count: defectMap[name],
-            percentage: total ? (defectMap[name] / total) * 100 : 0
-        })).sort((a, b) => b.count - a.count);
-
-        setStats({ gradeSummary, defectSummary, totalPieces: total });
-    };
-
     if (!inspection) return <div className="ga-page u-center u-muted">Cargando reporte...</div>;
 
     // Renderizado UI (User Interface)
@@ -8,6 +8,8 @@ import EditInspectionModal from '../components/EditInspectionModal';
 
 export default function InspectionsList() {
     const [inspections, setInspections] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [searchTerm, setSearchTerm] = useState('');
     const [showFilters, setShowFilters] = useState(false);
 
@@ -24,16 +26,42 @@ export default function InspectionsList() {
     const navigate = useNavigate();
     const { user } = useAuth(); // Get current user for permissions
 
+    // Filters and order are applied by the server; the search waits for a pause in typing
     useEffect(() => {
-        loadInspections();
-    }, []);
+        const timer = setTimeout(() => loadInspections(), searchTerm ? 300 : 0);
+        return () => clearTimeout(timer);
+    }, [startDate, endDate, typeFilter, sortOrder, searchTerm]);
 
+    const buildParams = () => {
+        const params = { order: sortOrder };
+        if (startDate) params.date_from = startDate;
+        if (endDate) params.date_to = endDate;
+        if (typeFilter !== 'all') params.type = typeFilter;
+        if (searchTerm.trim()) params.q = searchTerm.trim();
+        return params;
+    };
+
+    // First page for the current filters
     const loadInspections = async () => {
         try {
-            const data = await getInspectionsList();
-            setInspections(data);
+            const page = await getInspectionsList(buildParams());
+            setInspections(page.items);
+            setNextCursor(page.next_cursor);
+        } catch (error) {
+            console.error("Error loading inspections", error);
+        }
+    };
+
+    const loadMore = async () => {
+        setLoadingMore(true);
+        try {
+            const page = await getInspectionsList({ ...buildParams(), cursor: nextCursor });
+            setInspections(prev => [...prev, ...page.items]);
+            setNextCursor(page.next_cursor);
         } catch (error) {
             console.error("Error loading inspections", error);
+        } finally {
+            setLoadingMore(false);
         }
     };
 
@@ -68,28 +96,6 @@ export default function InspectionsList() {
         return map[type] || type;
     };
 
-    const filteredInspections = inspections
-        .filter(i => {
-            // Text Search
-            const matchesSearch = i.product_name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-                (i.lot && i.lot.toLowerCase().includes(searchTerm.toLowerCase()));
-
-            // Date Filter
-            const dateMatches = (!startDate || i.date >= startDate) &&
-                (!endDate || i.date <= endDate);
-
-            // Type Filter
-            const typeMatches = typeFilter === 'all' || i.type === typeFilter;
-
-            return matchesSearch && dateMatches && typeMatches;
-        })
-
-        .sort((a, b) => {
-            const dateA = new Date(a.date);
-            const dateB = new Date(b.date);
-            return sortOrder === 'asc' ? dateA - dateB : dateB - dateA;
-        });
-
     return (
         <div className="ga-page ga-stack">
             {/* Header / Actions Bar */}
@@ -162,7 +168,7 @@ export default function InspectionsList() {
                                         <Search size={16} style={{ position: 'absolute', left: '10px', top: '50%', transform: 'translateY(-50%)', color: 'var(--ga-muted)' }} />
                                         <input
                                             type="text"
-                                            placeholder="Buscar por producto..."
+                                            placeholder="Buscar por producto o lote..."
                                             value={searchTerm}
                                             onChange={(e) => setSearchTerm(e.target.value)}
                                             className="ga-control"
@@ -187,8 +193,8 @@ export default function InspectionsList() {
 
             {/* List */}
             <div className="ga-stack" style={{ flex: 1, overflowY: 'auto' }}>
-                {filteredInspections.length > 0 ? (
-                    filteredInspections.map((insp) => (
+                {inspections.length > 0 ? (
+                    inspections.map((insp) => (
                         <motion.div
                             key={insp.id}
                             initial={{ opacity: 0, y: 10 }}
@@ -265,6 +271,13 @@ export default function InspectionsList() {
                         <p className="u-muted">No se encontraron inspecciones que coincidan con los filtros.</p>
                     </div>
                 )}
+                {nextCursor && (
+                    <div className="u-center u-p-4">
+                        <button onClick={loadMore} disabled={loadingMore} className="ga-btn ga-btn--outline">
+                            {loadingMore ? 'Cargando...' : 'Cargar más'}
+                        </button>
+                    </div>
+                )}
             </div>
 
             <EditInspectionModal
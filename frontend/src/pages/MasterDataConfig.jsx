@@ -28,7 +28,7 @@ const ConfigSection = ({ title, category, type = 'catalog' }) => {
                 const data = await getMarkets();
                 setItems(data);
             } else {
-                const data = await getCatalogItems(category);
+                const data = await getCatalogItems(category, true);
                 setItems(data);
             }
         } catch (error) {